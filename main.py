@@ -10,22 +10,41 @@ from argparse import ArgumentParser
 args: ArgumentParser = ArgumentParser(prog = "Remarkets' trading interface", epilog = "AlmaGlobal test",
     description = "Simple strategy formulation framework and executor for trading strategies in Remarkets")
 
-args.add_argument("-s", "--symbols", type = str, help = "Symbols to be traded, separated by commas")
+# Derivados a operar: una lista fija, o un universo (ver "Manager.select_universe"), pero no ambos.
+target = args.add_mutually_exclusive_group()
+target.add_argument("-s", "--symbols", type = str, help = "Symbols to be traded, separated by commas")
+target.add_argument("-u", "--universe", type = str, default = None,
+    help = "Trade every symbol whose CFI code starts with any of these prefixes, separated by commas (e.g. \"F\" for all futures)")
+args.add_argument("-sg", "--segments", type = str, default = None, help = "Universe segments, separated by commas (e.g. \"DDF,DDA\")")
+args.add_argument("-mn", "--min_days", type = float, default = 0.0, help = "Universe minimum days to maturity")
+args.add_argument("-mx", "--max_days", type = float, default = None, help = "Universe maximum days to maturity")
 args.add_argument("-d", "--debug", action = "store_false", default = True, help = "Disable debug mode")
 args.add_argument("-rt", "--thr_rate_taker", type = float, default = 0.0001, help = "Minimum taker rate to place long trade")
 args.add_argument("-rp", "--thr_rate_payer", type = float, default = 0.0001, help = "Minimum payer rate to place short trade")
+args.add_argument("-mp", "--max_position", type = float, default = 1.0,
+    help = "Maximum absolute net position per symbol (negative for no limit)")
+args.add_argument("-cd", "--cooldown", type = float, default = 1.0,
+    help = "Minimum seconds between same-side signals per symbol (0 for no cooldown)")
 args.add_argument("-t", "--timeout", type = float, default = 60.0, help = "Amount of time for strategy to run, in seconds")
 
 values = args.parse_args()
 debug = values.debug
 symbols = values.symbols
+universe = values.universe
+segments = values.segments
+maturity = (values.min_days, values.max_days)
 thr_rate_taker = values.thr_rate_taker
 thr_rate_payer = values.thr_rate_payer
+max_position = values.max_position if (values.max_position >= 0) else None
+cooldown = values.cooldown
 timeout = values.timeout
 
-if symbols is None: symbols = [
+if symbols is not None: symbols = symbols.split(",")
+elif universe is None: symbols = [
     "YPFD/DIC23", "PAMP/DIC23", "GGAL/DIC23"
 ]
+if universe is not None: universe = universe.split(",")
+if segments is not None: segments = segments.split(",")
 
 #███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
 #███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
@@ -33,11 +52,15 @@ if symbols is None: symbols = [
 if (__name__ == "__main__"):
 
     interface = Interface(debug = debug)
+    # Modo universo: todos los derivados que cumplan los filtros (ver "Manager.select_universe").
+    if universe is not None: symbols = interface.select_universe(cfi = universe, segments = segments, maturity = maturity)
     test_strategy = Alma(name = "Alma_test",
         symbols = dict.fromkeys(symbols),
         thr_rate_payer = thr_rate_payer,
         thr_rate_taker = thr_rate_taker,
-        thr_spread_deriv = 0.005)
+        thr_spread_deriv = 0.005,
+        max_position = max_position,
+        cooldown = cooldown)
     
     interface.load_strategies(test_strategy)
     interface.toggle_strategies(**{test_strategy.name: True})
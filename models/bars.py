@@ -0,0 +1,210 @@
+import os, sys
+sys.path.append("./")
+
+import numpy, threading
+from math import floor
+from numpy import nan
+from pandas import DataFrame, DatetimeIndex, Timestamp
+
+from utils.constants import *
+
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+class BarRing:
+    """
+    Barras de un instrumento en un intervalo ("`timeframe`"): un "ring" de "`size`" barras cerradas, en columnas de
+    "`numpy`" preasignadas (ver "`BarBuilder.COLUMNS`"), mas la barra en curso ("`bar`", una lista, para
+    actualizarla en O(1) por tick). La barra "`n`" (contando desde la primera) ocupa la posición "`n % size`".
+    * "`timeframe`" ("`int`"): Intervalo de las barras, en segundos.
+    * "`ns`" ("`int`"): Intervalo de las barras, en nanosegundos.
+    * "`n`" ("`int`"): Cantidad de barras cerradas desde el inicio.
+    * "`bar`" ("`list`"): Barra en curso ("`[ts, open, high, low, close, volume, trades, bid, ask]`"), o "`None`".
+    * "`quote`" ("`list`"): BBO al cierre de la última barra ("`[bid, ask]`"), con el que empieza la siguiente.
+    """
+    __slots__ = ("timeframe", "ns", "columns", "n", "bar", "quote")
+
+    def __init__(self, timeframe: int, columns: dict):
+
+        self.timeframe, self.ns = timeframe, int(timeframe * 1e9)
+        self.columns, self.n, self.bar, self.quote = columns, 0, None, [nan, nan]
+
+    def open(self, start: int) -> list:
+        """
+        Inicia una barra en "`start`" (nanosegundos desde "epoch"), con el BBO de la anterior. Devuelve la barra.
+        """
+        self.bar = [start, nan, nan, nan, nan, 0.0, 0, *self.quote]
+        return self.bar
+
+    def close(self):
+        """
+        Guarda la barra en curso en el "ring", y la descarta (conservando su BBO para la próxima).
+        """
+        position = self.n % len(self.columns["ts"])
+        for values, value in zip(self.columns.values(), self.bar): values[position] = value
+        self.n += 1; self.quote = self.bar[7 :]; self.bar = None
+
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+class BarBuilder:
+    """
+    Barras OHLCV de los instrumentos suscriptos ("`subscribe`"), en varios intervalos a la vez, construidas tick a
+    tick ("`update`") en O(1) por tick e intervalo, sin re-muestrear el historial. Por barra:
+    - "`open`", "`high`", "`low`", "`close`": de las operaciones nuevas ("`price_last`") dentro de la barra. Sin
+        operaciones, quedan vacías ("`NaN`").
+    - "`volume`": diferencia del volumen operado del día ("`tv`") si está suscripto, o suma de "`size_last`" de las
+        operaciones nuevas. "`trades`": cantidad de operaciones nuevas.
+    - "`bid`", "`ask`": último BBO al cierre de la barra (el de la barra anterior, si no cambió).
+    El feed repite la última operación ("`LA`") en cada tick: una operación es nueva si cambia su precio, volumen
+    o momento ("`ts - dms_last`"). La primera vista de cada instrumento solo cuenta si ocurrió dentro de la barra.
+
+    Cada barra se cierra con el primer tick del instrumento posterior a ella, o con "`flush`" (ej: periódicamente,
+    para los instrumentos poco activos). Ambos devuelven las barras recién cerradas ("`[(symbol, timeframe)]`"),
+    para notificar a las estrategias (ver "`Strategy.on_bar`"). Los intervalos sin ticks no generan barras.
+
+    Inputs:
+    * "`size`" ("`int`"): Barras cerradas a retener por instrumento e intervalo.
+    """
+    COLUMNS = ["ts", "open", "high", "low", "close", "volume", "trades", "bid", "ask"]
+    DTYPES = {"ts": numpy.int64, **dict.fromkeys(COLUMNS[1 : 6], float), "trades": numpy.int32,
+        **dict.fromkeys(COLUMNS[7 :], float)}
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def __init__(self, size: int = 1000):
+
+        self.size = size
+        # Barras de cada instrumento ("{symbol: [BarRing]}"), y última operación y volumen del día vistos
+        # ("{symbol: [(price, size, ms), tv]}"). Un único "lock": los ticks y "flush" llegan de threads distintos.
+        self.symbols: dict[str, list[BarRing]] = dict()
+        self.trades: dict[str, list] = dict()
+        self.lock = threading.Lock()
+
+    def subscribe(self, symbol: str, timeframes: list):
+        """
+        Asigna los intervalos ("`timeframes`", en segundos) de las barras del instrumento "`symbol`". Los intervalos
+        que ya tenía conservan sus barras; sin intervalos, el instrumento deja de tener barras.
+        """
+        with self.lock:
+            rings = {ring.timeframe: ring for ring in self.symbols.get(symbol, list())}
+            rings = [rings.get(timeframe) or BarRing(timeframe, self.allocate()) for timeframe in sorted(timeframes)]
+            if rings: self.symbols[symbol] = rings; self.trades.setdefault(symbol, [None, None])
+            else: self.symbols.pop(symbol, None); self.trades.pop(symbol, None)
+
+    def allocate(self) -> dict:
+        """
+        Columnas vacías para "`size`" barras.
+        """
+        return {name: numpy.zeros(self.size, dtype) for name, dtype in self.DTYPES.items()}
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def update(self, symbol: str, ts, entry: dict) -> list:
+        """
+        Actualiza las barras en curso del instrumento "`symbol`" con un tick. Devuelve las barras que el tick cerró.
+
+        Inputs:
+        - "`symbol`" ("`str`"): Instrumento.
+        - "`ts`" ("`Timestamp`" o "`int`"): Momento del tick (o nanosegundos desde "epoch", UTC).
+        - "`entry`" ("`dict`"): Campos del tick (ver "`Interface.parse_data_market`").\n
+        Outputs:
+        - "`closed`" ("`list[tuple]`"): Barras cerradas, como "`(symbol, timeframe)`".
+        """
+        rings = self.symbols.get(symbol)
+        if rings is None: return list()
+        ts = ts if isinstance(ts, int) else ts.value
+        price, size, dms = entry.get("price_last"), entry.get("size_last"), entry.get("dms_last")
+        tv, bid, ask = entry.get("tv"), entry.get("price_bid_l1"), entry.get("price_ask_l1")
+        closed = list()
+        with self.lock:
+            state, ms_trade, volume = self.trades[symbol], None, 0.0
+            # Operación nueva: distinta a la última vista. "dms_last" está truncado a milisegundos enteros.
+            if (price is not None) and (dms is not None):
+                trade = (price, size, floor(ts / 1e6 - dms))
+                if (trade != state[0]):
+                    # La primera vista puede ser una operación vieja (ej: la del "snapshot" al suscribir).
+                    is_first, state[0] = (state[0] is None), trade
+                    if not is_first or (trade[2] * 10 ** 6 >= ts - ts % rings[0].ns): ms_trade = trade[2]
+            if isinstance(tv, (int, float)):
+                if state[1] is not None: volume = (tv - state[1]) if (tv >= state[1]) else tv # Nuevo día.
+                state[1] = tv
+            elif (ms_trade is not None): volume = size or 0.0
+
+            for ring in rings:
+                bar, start = ring.bar, ts - ts % ring.ns
+                if (bar is not None) and (bar[0] != start):
+                    ring.close(); closed.append((symbol, ring.timeframe))
+                    bar = ring.open(start)
+                elif bar is None: bar = ring.open(start)
+                if (ms_trade is not None):
+                    if (bar[1] != bar[1]): bar[1] = bar[2] = bar[3] = price
+                    elif (price > bar[2]): bar[2] = price
+                    elif (price < bar[3]): bar[3] = price
+                    bar[4] = price; bar[6] += 1
+                bar[5] += volume
+                if bid is not None: bar[7] = bid
+                if ask is not None: bar[8] = ask
+        return closed
+
+    def flush(self, ts) -> list:
+        """
+        Cierra las barras en curso ya vencidas al momento "`ts`" ("`Timestamp`" o nanosegundos desde "epoch", UTC),
+        aunque su instrumento no haya recibido ticks posteriores. Devuelve las barras cerradas (ver "`update`").
+        """
+        ts, closed = ts if isinstance(ts, int) else ts.value, list()
+        with self.lock:
+            for symbol, rings in self.symbols.items():
+                for ring in rings:
+                    if (ring.bar is None) or (ring.bar[0] + ring.ns > ts): continue
+                    ring.close(); closed.append((symbol, ring.timeframe))
+        return closed
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def frame(self, symbol: str, timeframe: int, n: int = None) -> DataFrame:
+        """
+        Últimas "`n`" barras cerradas (por defecto, todas las retenidas) del instrumento "`symbol`" en el intervalo
+        "`timeframe`", en orden cronológico e indexadas por su inicio ("`ts_bar`", UTC).
+        """
+        columns = self.COLUMNS[1 :]
+        with self.lock:
+            ring = next((ring for ring in self.symbols.get(symbol, list()) if ring.timeframe == timeframe), None)
+            count = 0 if ring is None else min(ring.n, self.size, self.size if (n is None) else n)
+            if count: positions = numpy.arange(ring.n - count, ring.n) % self.size
+            data = {name: values[positions] for name, values in ring.columns.items()} if count else dict()
+        if not count: return DataFrame(columns = columns, index = DatetimeIndex([], tz = "UTC", name = "ts_bar"))
+        index = DatetimeIndex(data.pop("ts").view("datetime64[ns]"), tz = "UTC", name = "ts_bar")
+        return DataFrame(data, index = index, columns = columns)
+
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+if (__name__ == "__main__"):
+
+    from time import perf_counter
+    from pandas import Series
+
+    # Ticks sintéticos: 10 por segundo durante 10 minutos, con una operación nueva cada 3 ticks.
+    numpy.random.seed(0)
+    n, ts0 = 6000, Timestamp("2024-01-02 14:00", tz = "UTC").value
+    prices = 2000 + numpy.cumsum(numpy.random.choice([-0.5, 0, 0.5], n))
+    builder, trades = BarBuilder(size = 1000), list()
+    builder.subscribe("GGAL/FEB24", [1, 10, 60])
+    ticks, ms_trade = list(), ts0 // 10 ** 6
+    for k in range(n):
+        ts = ts0 + k * 10 ** 8
+        if (k % 3 == 0): ms_trade = ts // 10 ** 6; trades.append((ts, prices[k], 1 + k % 4))
+        ticks.append((ts, {"price_last": trades[-1][1], "size_last": trades[-1][2],
+            "dms_last": (ts // 10 ** 6) - ms_trade, "price_bid_l1": prices[k] - 0.5, "price_ask_l1": prices[k] + 0.5}))
+
+    t0 = perf_counter(); n_closed = 0
+    for ts, entry in ticks: n_closed += len(builder.update("GGAL/FEB24", ts, entry))
+    n_closed += len(builder.flush(ts0 + n * 10 ** 8))
+    print(f"update: {(perf_counter() - t0) / n * 1e6:.1f} us per tick (3 timeframes), {n_closed} bars closed")
+
+    # Comparar contra "resample" de "pandas" sobre las operaciones.
+    bars = builder.frame("GGAL/FEB24", 60)
+    trades = DataFrame(trades, columns = ["ts", "price", "size"])
+    trades.index = DatetimeIndex(trades.pop("ts").to_numpy().view("datetime64[ns]"), tz = "UTC")
+    expected = trades["price"].resample("60s").ohlc().assign(volume = trades["size"].resample("60s").sum())
+    print(bars.tail(3).to_string())
+    print("equal to pandas resample:", numpy.allclose(bars[expected.columns].to_numpy(), expected.to_numpy()))
@@ -0,0 +1,135 @@
+import os, sys
+sys.path.append("./")
+
+from time import perf_counter_ns
+
+from utils.constants import *
+
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+class Budget:
+    """
+    Presupuesto de latencia de una estrategia: tiempo máximo de cada ejecución ("`on_tick`", "`on_bar`") y plazo de
+    sus señales. Quien ejecuta la estrategia ("`Interface`") mide cada ejecución ("`on_run`"), y según la proporción
+    reciente de excesos (media exponencial de las últimas ~"`WINDOW`" ejecuciones) la estrategia cambia de modo:
+    - "`inline`": se ejecuta en la etapa "strategies" con cada tick, como el resto.
+    - "`throttled`": se ejecuta con menor frecuencia ("`due`"): tras cada ejecución, espera "`(1 / DUTY - 1)`"
+        veces su duración media, de modo que no ocupe mas de "`DUTY`" del thread. Los derivados actualizados
+        mientras tanto se acumulan en "`pending`" y se entregan en la próxima ejecución.
+    - "`background`": se ejecuta en su propio thread (ver "`Interface._run_background`"), sin demorar a los demás.
+    Con mas de "`RATIO_UP`" de excesos se pasa al modo siguiente, y con menos de "`RATIO_DOWN`", al anterior; entre
+    cambios median al menos "`WINDOW`" ejecuciones.
+
+    Opcionalmente, las señales de una ejecución que terminó luego del plazo ("`deadline`", desde que se tomaron los
+    datos de mercado) son obsoletas ("`is_stale`"): se registran como "`STALE`" en lugar de enviarse. El plazo se
+    evalúa una vez por ejecución, antes de enviar ninguna señal (sin contar los envíos de las anteriores de la tanda).
+
+    Inputs:
+    * "`seconds`" ("`float`"): Tiempo máximo de cada ejecución, en segundos.
+    * "`deadline`" ("`float`"): Antigüedad máxima de las señales al enviarse, en segundos. "`None`" = sin plazo.
+    * "`adaptive`" ("`bool`"): Si cambiar de modo automáticamente. Si no, solo se contabilizan los excesos.
+    """
+    MODES = ["inline", "throttled", "background"]
+    WINDOW = 20 # Ejecuciones de la media exponencial de excesos, y mínimo entre cambios de modo.
+    RATIO_UP, RATIO_DOWN = 0.5, 0.1 # Proporción de excesos para pasar al modo siguiente, o al anterior.
+    DUTY = 0.25 # Fracción máxima del thread que ocupa una estrategia en modo "throttled".
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def __init__(self, seconds: float = 0.005, deadline: float = None, adaptive: bool = True):
+
+        self.seconds, self.deadline, self.adaptive = seconds, deadline, adaptive
+        self.budget_ns = int(seconds * 1e9)
+        self.deadline_ns = None if (deadline is None) else int(deadline * 1e9)
+        self.mode = self.MODES[0]
+        # Contadores: ejecuciones, excesos, ejecuciones omitidas ("throttled") y señales obsoletas.
+        self.n_runs = self.n_overruns = self.n_skipped = self.n_stale = 0
+        # Medias exponenciales de la proporción de excesos y de la duración (en ns), y duración máxima.
+        self.ratio, self.mean_ns, self.max_ns = 0.0, 0.0, 0
+        # Ejecuciones desde el último cambio de modo, y próximo instante habilitado ("perf_counter_ns").
+        self.since, self.next_ns = 0, 0
+        # Derivados actualizados durante las ejecuciones omitidas.
+        self.pending = set()
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def due(self, symbols, now: int = None) -> bool:
+        """
+        Decide si la estrategia debe ejecutarse ahora por la actualización de "`symbols`". En modo "`throttled`",
+        antes de su próximo instante habilitado, la ejecución se omite y "`symbols`" queda en "`pending`".
+        """
+        if (self.mode != "throttled"): return True
+        if (now or perf_counter_ns()) >= self.next_ns: return True
+        self.pending.update(symbols); self.n_skipped += 1
+        return False
+
+    def take(self, symbols) -> list:
+        """
+        Devuelve "`symbols`" junto con los derivados pendientes de las ejecuciones omitidas, y los descarta.
+        """
+        if not self.pending: return list(symbols)
+        symbols, self.pending = self.pending.union(symbols), set()
+        return list(symbols)
+
+    def on_run(self, t0: int, dt: int):
+        """
+        Registra una ejecución iniciada en "`t0`" y de "`dt`" ns ("`perf_counter_ns`"). Si cambia de modo,
+        devuelve el nuevo modo; si no, "`None`".
+        """
+        is_over, alpha = (dt > self.budget_ns), 2 / (self.WINDOW + 1)
+        self.n_runs += 1; self.n_overruns += is_over; self.since += 1
+        self.ratio += alpha * (is_over - self.ratio)
+        self.mean_ns += alpha * (dt - self.mean_ns)
+        if (dt > self.max_ns): self.max_ns = dt
+        self.next_ns = t0 + dt + int(self.mean_ns * (1 / self.DUTY - 1))
+        if not self.adaptive or (self.since < self.WINDOW): return None
+        level = self.MODES.index(self.mode)
+        if (self.ratio > self.RATIO_UP) and (level < len(self.MODES) - 1): level += 1
+        elif (self.ratio < self.RATIO_DOWN) and (level > 0): level -= 1
+        else: return None
+        self.mode, self.since = self.MODES[level], 0
+        return self.mode
+
+    def is_stale(self, t0: int, now: int = None, n: int = 1) -> bool:
+        """
+        "`True`" si ya venció el plazo de las "`n`" señales de una ejecución cuyos datos se tomaron en "`t0`" (en tal
+        caso, se cuentan como obsoletas). Sin plazo, nunca.
+        """
+        if self.deadline_ns is None: return False
+        if (now or perf_counter_ns()) - t0 <= self.deadline_ns: return False
+        self.n_stale += n
+        return True
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    @property
+    def row(self) -> dict:
+        """
+        Estado del presupuesto, para una fila de "`Manager.latency`".
+        """
+        return {"mode": self.mode, "budget_ms": self.seconds * 1000, "runs": self.n_runs,
+            "overruns": self.n_overruns, "ratio": self.ratio, "mean_ms": self.mean_ns / 1e6,
+            "max_ms": self.max_ns / 1e6, "skipped": self.n_skipped, "stale": self.n_stale}
+
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+if (__name__ == "__main__"):
+
+    from time import sleep
+    from pandas import DataFrame
+
+    # Estrategia que tarda 10 ms (contra 5 ms de presupuesto y 8 ms de plazo) durante 150 ticks, y luego 1 ms.
+    # Ticks cada 2 ms. En modo "background", aquí se sigue ejecutando en el mismo thread.
+    budget, modes = Budget(seconds = 0.005, deadline = 0.008), list()
+    for n in range(300):
+        now = perf_counter_ns()
+        if budget.due({"GGAL/FEB24"}, now):
+            symbols = budget.take({"GGAL/FEB24"})
+            sleep(0.010 if (n < 150) else 0.001)
+            mode = budget.on_run(now, perf_counter_ns() - now)
+            budget.is_stale(now)
+            if mode: modes.append((n, mode))
+        else: sleep(0.002)
+    print(modes)
+    print(DataFrame([budget.row], index = ["example"]).to_string())
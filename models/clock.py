@@ -0,0 +1,174 @@
+import os, sys
+sys.path.append("./")
+
+import numpy
+from time import time_ns, perf_counter_ns
+from pandas import Timestamp
+
+from utils.constants import *
+
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+class Clock:
+    """
+    Reloj del sistema. Quien procesa un ciclo (ej: una ronda de estrategias, ver "`Interface._run_strategies`") lo lee
+    una única vez al comenzarlo ("`tick`"), y todo lo que ocurre dentro del ciclo usa esa lectura: "`ns`", "`ms`",
+    "`days`" (días desde "epoch", UTC) y "`ts`" ("`Timestamp`"), en lugar de volver a consultar la hora. Por ejemplo,
+    los días restantes hasta el vencimiento de todos los derivados son una sola resta ("`days_to`") contra los
+    vencimientos precompilados en días ("`Strategy.layout["maturity"]`").
+
+    Cada lectura se toma junto con el contador monótono ("`mono_ns`", "`perf_counter_ns`"), que es el que se usa para
+    medir latencias. Los momentos posteriores dentro del ciclo (ej: el envío de una señal) se derivan de ambos
+    ("`wall_ns`", "`now`"), sin consultar la hora del sistema. La lectura es una única tupla: se publica de manera
+    atómica, y un thread que la lee nunca ve una mitad de una lectura y otra mitad de la siguiente.
+
+    En simulaciones, se reemplaza por un reloj virtual ("`VirtualClock`", ver "`Manager`").
+    """
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def __init__(self):
+
+        self.tick()
+
+    # Contador monótono en nanosegundos, para medir latencias. Siempre real, incluso con reloj virtual.
+    mono_ns = staticmethod(perf_counter_ns)
+
+    def now_ns(self) -> int:
+        """
+        Lectura de la hora, en nanosegundos desde "epoch" (UTC). A sobreescribir por los relojes virtuales.
+        """
+        return time_ns()
+
+    def tick(self) -> int:
+        """
+        Comienza un ciclo: lee la hora (y el contador monótono) una única vez, y la devuelve en nanosegundos.
+        """
+        self.reading = (self.now_ns(), perf_counter_ns(), None)
+        return self.reading[0]
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    @property
+    def ns(self) -> int:
+        """
+        Hora del ciclo en curso, en nanosegundos desde "epoch" (UTC).
+        """
+        return self.reading[0]
+
+    @property
+    def ms(self) -> float:
+        """
+        Hora del ciclo en curso, en milisegundos desde "epoch" (UTC).
+        """
+        return self.reading[0] / 1e6
+
+    @property
+    def days(self) -> float:
+        """
+        Hora del ciclo en curso, en días desde "epoch" (UTC): la unidad de "`Strategy.layout["maturity"]`".
+        """
+        return self.reading[0] / 86400e9
+
+    @property
+    def ts(self) -> Timestamp:
+        """
+        Hora del ciclo en curso, como "`Timestamp`" (UTC). Se crea una única vez por ciclo.
+        """
+        ns, mono, ts = reading = self.reading
+        if ts is None:
+            ts = Timestamp(ns, tz = "UTC")
+            # Solo si nadie comenzó otro ciclo mientras tanto.
+            if (self.reading is reading): self.reading = (ns, mono, ts)
+        return ts
+
+    def days_to(self, maturity):
+        """
+        Días restantes desde el ciclo en curso hasta "`maturity`": días desde "epoch" ("`float`" o array, ej:
+        "`layout["maturity"]`"), o "`Timestamp`" (sin zona horaria, se toma como UTC).
+        """
+        if isinstance(maturity, Timestamp): maturity = maturity.value / 86400e9
+        return maturity - self.days
+
+    def wall_ns(self, mono: int = None) -> int:
+        """
+        Hora (en nanosegundos desde "epoch") de un momento posterior al comienzo del ciclo, dado por el contador
+        monótono "`mono`" (por defecto, ahora): la del ciclo, mas el tiempo transcurrido desde entonces.
+        """
+        ns, start, _ = self.reading
+        return ns + ((perf_counter_ns() if (mono is None) else mono) - start)
+
+    def now(self) -> Timestamp:
+        """
+        Hora actual como "`Timestamp`" (UTC), derivada de la del ciclo (ver "`wall_ns`").
+        """
+        return Timestamp(self.wall_ns(), tz = "UTC")
+
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+class VirtualClock(Clock):
+    """
+    Reloj virtual, para simulaciones (ej: reproducir ticks grabados): la hora solo cambia cuando se la fija
+    ("`set`", ej: con el timestamp de cada tick reproducido) o se la adelanta ("`advance`"). Dentro de un ciclo, los
+    momentos posteriores suman el tiempo real de cómputo (ver "`wall_ns`"), y las latencias ("`mono_ns`") siguen
+    siendo reales.
+
+    Inputs:
+    * "`start`" ("`Timestamp`", "`str`" o "`int`"): Hora inicial (o nanosegundos desde "epoch", UTC).
+    """
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def __init__(self, start = 0):
+
+        self.virtual_ns = self.to_ns(start)
+        super().__init__()
+
+    @staticmethod
+    def to_ns(ts) -> int:
+        """
+        Nanosegundos desde "epoch" (UTC) de "`ts`". Los momentos sin zona horaria se toman como UTC.
+        """
+        return int(ts) if isinstance(ts, (int, numpy.integer)) else Timestamp(ts).value
+
+    def now_ns(self) -> int:
+
+        return self.virtual_ns
+
+    def set(self, ts):
+        """
+        Fija la hora virtual en "`ts`" (ver "`to_ns`"). Rige desde el próximo ciclo ("`tick`").
+        """
+        self.virtual_ns = self.to_ns(ts)
+
+    def advance(self, seconds: float):
+        """
+        Adelanta la hora virtual "`seconds`" segundos. Rige desde el próximo ciclo ("`tick`").
+        """
+        self.virtual_ns += int(seconds * 1e9)
+
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+if (__name__ == "__main__"):
+
+    from pandas import DatetimeIndex, read_csv
+    from time import perf_counter
+
+    # Días restantes de todos los derivados con vencimiento de "docs/specs.csv": un "Timestamp.utcnow()" y una resta de "Timestamp"
+    # por derivado (como "Alma.calc_daily_rates"), contra una lectura por ciclo y una resta vectorizada.
+    specs = read_csv("docs/specs.csv").set_index("symbol").dropna(subset = "maturity")
+    maturities = [Timestamp(maturity, tz = "UTC") for maturity in specs["maturity"]]
+    maturity_days = DatetimeIndex(specs["maturity"], tz = "UTC").asi8 / 86400e9
+    clock, n_cycles = Clock(), 200
+    t0 = perf_counter()
+    for _ in range(n_cycles): legacy = [(maturity - Timestamp.utcnow()).total_seconds() / 86400 for maturity in maturities]
+    t1 = perf_counter()
+    for _ in range(n_cycles): clock.tick(); days = clock.days_to(maturity_days)
+    t2 = perf_counter()
+    print(f"{len(maturities)} symbols: per-symbol utcnow {(t1 - t0) / n_cycles * 1e6:.1f} us/cycle,",
+        f"cached clock {(t2 - t1) / n_cycles * 1e6:.1f} us/cycle, max diff {numpy.abs(days - legacy).max() * 86400:.3f} s")
+
+    # Reloj virtual: la hora de cada ciclo es la fijada, sin importar cuánto tarde en procesarse.
+    virtual = VirtualClock("2023-12-01 14:00:00")
+    for _ in range(3):
+        virtual.tick(); print(virtual.ts, f"{virtual.days_to(Timestamp('2023-12-29')):.6f} days to 2023-12-29")
+        virtual.advance(30)
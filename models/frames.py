@@ -0,0 +1,132 @@
+import os, sys
+sys.path.append("./")
+
+# Decodificador JSON de los "frames" crudos del WebSocket: "orjson" si está instalado (~3 veces mas rápido que
+# "simplejson", el que usa "pyRofex"), y si no, el de la librería estándar.
+try: from orjson import loads
+except ImportError: from json import loads
+
+from utils.constants import *
+
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+class FrameLog:
+    """
+    Grabación de los "frames" crudos de datos de mercado del WebSocket (ver "`Interface._on_receive_frame`"), tal
+    cual llegan: uno por línea (cada mensaje es un JSON de una sola línea). Sirven para reproducir una sesión, o
+    medir el camino de decodificación con datos reales ("`read`", ver el "benchmark" debajo). Tiene un único thread
+    escritor (el del WebSocket), así que no toma "locks".
+
+    Inputs:
+    * "`path`" ("`str`"): Archivo donde grabar. Si ya existe, se agregan los nuevos "frames" al final.
+    """
+    DECODER = loads.__module__ # Nombre del decodificador en uso ("orjson" o "json").
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def __init__(self, path: str):
+
+        self.path, self.n_frames = path, 0
+        folder = os.path.dirname(path)
+        if folder: os.makedirs(folder, exist_ok = True)
+        self.file = open(path, "ab")
+        Log.info(f"Recording market data frames to \"{path}\" (decoder: {self.DECODER})")
+
+    def record(self, message):
+        """
+        Graba un "frame" crudo ("`str`" o "`bytes`").
+        """
+        if isinstance(message, str): message = message.encode()
+        self.file.write(message.rstrip(b"\n") + b"\n")
+        self.n_frames += 1
+
+    def close(self):
+        """
+        Cierra el archivo, con lo grabado hasta el momento.
+        """
+        if not self.file.closed: self.file.close()
+
+    @staticmethod
+    def read(path: str) -> list:
+        """
+        Lee los "frames" grabados en "`path`", como una lista de mensajes crudos ("`bytes`").
+        """
+        with open(path, "rb") as file:
+            return [line.rstrip(b"\n") for line in file if line.strip()]
+
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+if (__name__ == "__main__"):
+
+    import json, simplejson, numpy
+    from time import time, perf_counter_ns
+    from pandas import Timestamp, DataFrame, read_csv
+    from models.interface import Interface
+
+    # "Frames" grabados (ej: "python models/frames.py logs/frames.jsonl", ver "Interface(record_frames = ...)"), o
+    # si no se indican, una sesión sintética con el mismo formato: 20000 ticks de 50 derivados, con book de 5 niveles
+    # y última operación. El repositorio no incluye sesiones grabadas.
+    from tempfile import mkdtemp
+    if (len(sys.argv) > 1):
+        frames, source = FrameLog.read(sys.argv[1]), f"recorded \"{sys.argv[1]}\""
+        Log.info(f"Benchmarking {len(frames)} recorded frames from \"{sys.argv[1]}\"")
+    else:
+        Log.warning("No recorded frames given (usage: python models/frames.py <frames.jsonl>): "
+            "benchmarking a synthetic session instead")
+        random, ms = numpy.random.default_rng(0), int(time() * 1000)
+        symbols = read_csv("docs/specs.csv")["symbol"].sample(50, random_state = 0).to_list()
+        frames, path, source = list(), os.path.join(mkdtemp(prefix = "frames_"), "frames.jsonl"), "synthetic"
+        for n in range(20000):
+            price = round(1000 + random.normal(0, 10), 1)
+            frames.append(json.dumps({"type": "Md", "timestamp": ms + n, "instrumentId": {"marketId": "ROFX",
+                "symbol": symbols[n % 50]}, "marketData": {
+                "OF": [{"price": price + level, "size": int(random.integers(1, 50))} for level in range(1, 6)],
+                "BI": [{"price": price - level, "size": int(random.integers(1, 50))} for level in range(1, 6)],
+                "LA": {"price": price, "size": int(random.integers(1, 10)), "date": ms + n - 5},
+                "TV": 1000 + n, "OI": 5000, "IV": None, "NV": None}}, separators = (",", ":")).encode())
+        log = FrameLog(path)
+        for frame in frames: log.record(frame)
+        log.close(); frames = FrameLog.read(path)
+
+    # Camino anterior, como referencia: "simplejson" (en "pyRofex") a dicts anidados, validación aparte, y
+    # extracción campo por campo con "pop", con "Timestamp" de pandas.
+    def parse_legacy(entry: dict):
+        market_data = entry["marketData"]
+        if not (market_data.get("OF") or market_data.get("BI") or market_data.get("LA")): return
+        ts_local = Timestamp.utcnow()
+        ms_event, market_data = entry.pop("timestamp"), entry.pop("marketData")
+        iv, tv = market_data.pop("IV", None), market_data.pop("TV", None)
+        oi, nv = market_data.pop("OI", None), market_data.pop("NV", None)
+        last = market_data.pop("LA", None) or dict()
+        last_price, last_size, ms_last = last.get("price"), last.get("size"), last.get("date")
+        market, symbol = entry.pop("instrumentId").values()
+        ms_local = ts_local.timestamp() * 1000
+        book = dict()
+        for side, key in (("ask", "OF"), ("bid", "BI")):
+            for level, quote in enumerate((market_data.pop(key, None) or list())[: 5], 1):
+                book[f"price_{side}_l{level}"], book[f"size_{side}_l{level}"] = quote["price"], quote["size"]
+        return {"ts": ts_local, "price_last": last_price, "size_last": last_size, "iv": iv, "tv": tv, "oi": oi,
+            "nv": nv, **book, "dms_last": int(ms_local - ms_last) if ms_last else None,
+            "dms_event": int(ms_local - ms_event), "market": market, "symbol": symbol}
+
+    paths = {"simplejson + legacy parse": (simplejson.loads, parse_legacy),
+        "json + one-pass parse": (json.loads, Interface.parse_data_market),
+        f"{FrameLog.DECODER} + one-pass parse": (loads, Interface.parse_data_market)}
+    results, parsed = dict(), dict()
+    for name, (decode, parse) in paths.items():
+        times = numpy.empty(len(frames), numpy.int64)
+        for n, frame in enumerate(frames):
+            t0 = perf_counter_ns(); entry = parse(decode(frame)); times[n] = perf_counter_ns() - t0
+        results[name] = {"frames": len(frames), "mean_us": times.mean() / 1e3,
+            "p50_us": numpy.percentile(times, 50) / 1e3, "p99_us": numpy.percentile(times, 99) / 1e3}
+        parsed[name] = entry
+    table = DataFrame.from_dict(results, orient = "index")
+    table["speedup"] = table["mean_us"].iloc[0] / table["mean_us"]
+    print(f"Frames: {source}"); print(table.round(2).to_string())
+    # Mismos campos y valores en ambos caminos (salvo el momento local y las demoras calculadas con él).
+    legacy, fast = [{key: value for key, value in entry.items() if key not in ("ts", "dms_last", "dms_event")}
+        for entry in (parsed[[*paths][0]], parsed[[*paths][-1]])]
+    print("same fields:", legacy == fast)
@@ -0,0 +1,268 @@
+import os, sys
+sys.path.append("./")
+
+import numpy
+from urllib.parse import quote, unquote
+from pandas import DataFrame, DatetimeIndex, Timestamp, concat, read_csv, read_parquet
+from pandas.api.types import is_datetime64_any_dtype
+
+from utils.constants import *
+from models.snapshot import Snapshot
+
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+class History:
+    """
+    Caché de precios históricos (barras y ticks) en disco, particionada por tipo, símbolo y fecha (UTC):
+    "`<path>/<kind>/<symbol>/<YYYY-MM-DD>.npy`". Cada partición es un array estructurado de "`numpy`" (el mismo
+    formato columnar que "`Snapshot`", ver "`Snapshot.to_array`"), escrito de manera atómica, que se abre mapeado en
+    memoria: leer un rango solo toca las particiones (y columnas) del rango.
+
+    Los datos se cargan desde archivos locales ("`ingest`": "`.csv`", o "`.parquet`" si hay un motor de Parquet
+    instalado) o desde Yahoo Finance ("`download`": "`yahooquery`" o "`yfinance`", si están instalados). Se leen de
+    a bloques de días ("`stream`"), de modo que un "backtest" de varios meses nunca tiene todo en memoria.
+
+    Todos los momentos se guardan en UTC (los que no tienen zona horaria se toman como UTC), con el índice de
+    "`KINDS`" (el de "`BarBuilder`" o "`TickStore`").
+
+    Inputs:
+    * "`path`" ("`str`"): Carpeta de la caché. Por defecto, "`PATH_FOLDER_HISTORY`".
+    """
+    KINDS = {"bars": "ts_bar", "ticks": "ts_local"} # Tipos de datos, y nombre de su índice.
+    # Columnas candidatas a índice, si no lo es ya (en orden de preferencia).
+    COLUMNS_TIME = ["ts_bar", "ts_local", "ts", "date", "datetime", "time", "timestamp"]
+    # Nombres de columnas de Yahoo Finance (y otros volcados habituales) => nombres del repositorio.
+    RENAME = {"Open": "open", "High": "high", "Low": "low", "Close": "close", "Volume": "volume",
+        "Adj Close": "adjclose", "Adj_Close": "adjclose", "Symbol": "symbol", "Date": "date", "Datetime": "datetime"}
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def __init__(self, path: str = PATH_FOLDER_HISTORY):
+
+        self.path = path
+
+    def folder(self, kind: str, symbol: str = None) -> str:
+        """
+        Carpeta de un tipo de datos, o de un símbolo (con los caracteres especiales escapados, ej: "/" => "%2F").
+        """
+        if kind not in self.KINDS: raise ValueError(f"Unknown kind \"{kind}\" (expected one of {[*self.KINDS]})")
+        folder = os.path.join(self.path, kind)
+        return folder if (symbol is None) else os.path.join(folder, quote(symbol, safe = ""))
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    @classmethod
+    def normalize(cls, data: DataFrame, kind: str = "bars") -> DataFrame:
+        """
+        Lleva una tabla al formato de la caché: columnas renombradas ("`RENAME`"), índice de momentos en UTC con el
+        nombre de "`KINDS`" (tomado del índice, o de la primera columna de "`COLUMNS_TIME`"), ordenado, y demás
+        columnas de fechas en UTC.
+        """
+        data = data.rename(columns = cls.RENAME).rename(columns = str.lower)
+        if not isinstance(data.index, DatetimeIndex):
+            column = next((name for name in cls.COLUMNS_TIME if name in data.columns), None)
+            if column is None: raise ValueError(f"No time column found (expected one of {cls.COLUMNS_TIME})")
+            data = data.set_index(column)
+        index = DatetimeIndex(data.index)
+        data.index = index.tz_localize("UTC") if (index.tz is None) else index.tz_convert("UTC")
+        for name in data.columns:
+            if is_datetime64_any_dtype(data[name]) and (data[name].dt.tz is None):
+                data[name] = data[name].dt.tz_localize("UTC")
+        return data.rename_axis(cls.KINDS[kind]).sort_index(kind = "stable")
+
+    def write(self, kind: str, symbol: str, data: DataFrame) -> int:
+        """
+        Guarda los datos de un símbolo en la caché, una partición por fecha (UTC). Si la partición ya existe, se
+        combinan: ante momentos repetidos, quedan los nuevos. Devuelve la cantidad de filas escritas.
+        """
+        data, folder = self.normalize(data, kind), self.folder(kind, symbol)
+        data = data.drop(columns = "symbol", errors = "ignore")
+        os.makedirs(folder, exist_ok = True)
+        for date, part in data.groupby(data.index.normalize()):
+            file = os.path.join(folder, f"{date:%Y-%m-%d}.npy")
+            if os.path.exists(file):
+                part = concat([self.partition(file, kind, mmap = False), part])
+                part = part[~part.index.duplicated(keep = "last")].sort_index(kind = "stable")
+            array, _ = Snapshot.to_array(part)
+            with open(file + ".tmp", "wb") as tmp: numpy.save(tmp, array)
+            os.replace(file + ".tmp", file)
+        return len(data)
+
+    @classmethod
+    def partition(cls, file: str, kind: str, mmap: bool = True, columns: list = None) -> DataFrame:
+        """
+        Lee una partición (ver "`write`"). Con "`mmap`", se abre mapeada en memoria y solo se copian del disco las
+        columnas pedidas ("`columns`", por defecto todas).
+        """
+        array, index = numpy.load(file, mmap_mode = "r" if mmap else None), cls.KINDS[kind]
+        if columns is not None: array = array[[index] + [name for name in columns if name in array.dtype.names]]
+        # Todas las fechas de la caché están en UTC (ver "normalize").
+        tz = [name for name in array.dtype.names if (array.dtype[name].kind == "M")]
+        return Snapshot.from_array(array, {"index": index, "named": True, "tz": tz})
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def ingest(self, path: str, kind: str = "bars", symbol: str = None) -> dict:
+        """
+        Carga en la caché un volcado local ("`.csv`" o "`.parquet`"). Si tiene una columna "`symbol`", se separa por
+        símbolo; si no, todo es de "`symbol`" (por defecto, el nombre del archivo sin extensión).
+
+        Inputs:
+        * "`path`" ("`str`"): Archivo a cargar.
+        * "`kind`" ("`str`"): Tipo de datos ("`bars`" o "`ticks`").
+        * "`symbol`" ("`str`"): Símbolo de los datos, si el archivo no tiene una columna "`symbol`".\n
+        Outputs:
+        * "`rows`" ("`dict`"): Filas cargadas por símbolo.
+        """
+        if path.endswith(".parquet"): data = read_parquet(path)
+        else: data = read_csv(path)
+        data = data.rename(columns = self.RENAME)
+        if "symbol" in data.columns: groups = data.groupby("symbol", sort = False)
+        else: groups = [(symbol or os.path.splitext(os.path.basename(path))[0], data)]
+        rows = {name: self.write(kind, name, group) for name, group in groups}
+        Log.info(f"Ingested {sum(rows.values())} {kind} rows of {len(rows)} symbols from \"{path}\"")
+        return rows
+
+    def download(self, symbols: list, start = None, end = None, interval: str = "1d") -> dict:
+        """
+        Descarga barras de Yahoo Finance y las carga en la caché (ej: precios de los subyacentes). Usa "`yahooquery`"
+        o, si no está instalado, "`yfinance`". Si no hay ninguno, no descarga nada.
+
+        Inputs:
+        * "`symbols`" ("`list`"): Símbolos de Yahoo Finance (ej: "`["GGAL.BA", "YPFD.BA"]`").
+        * "`start`", "`end`" ("`str`" o "`Timestamp`"): Rango de fechas.
+        * "`interval`" ("`str`"): Duración de las barras (ej: "`"1d"`", "`"1h"`", "`"1m"`").\n
+        Outputs:
+        * "`rows`" ("`dict`"): Filas cargadas por símbolo.
+        """
+        symbols, rows = [symbols] if isinstance(symbols, str) else [*symbols], dict()
+        try: from yahooquery import Ticker; backend = "yahooquery"
+        except ImportError:
+            try: from yfinance import download; backend = "yfinance"
+            except ImportError:
+                Log.warning("No download backend installed (yahooquery or yfinance), nothing downloaded")
+                return rows
+        try:
+            if (backend == "yahooquery"):
+                data = Ticker(symbols).history(interval = interval, start = start, end = end)
+                # Con errores, "yahooquery" devuelve un dict con los mensajes por símbolo.
+                if isinstance(data, DataFrame) and not data.empty:
+                    data = data.reset_index()
+                    rows = {name: self.write("bars", name, group) for name, group in data.groupby("symbol")}
+            else:
+                data = download(symbols, start = start, end = end, interval = interval,
+                    group_by = "ticker", progress = False)
+                for name in symbols:
+                    group = (data[name] if (len(symbols) > 1) else data).dropna(how = "all")
+                    if not group.empty: rows[name] = self.write("bars", name, group)
+        except Exception as EXC: Log.error(f"Download error ({backend}): {repr(EXC)}")
+        Log.info(f"Downloaded {sum(rows.values())} bars of {len(rows)}/{len(symbols)} symbols")
+        return rows
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def symbols(self, kind: str = "bars") -> list:
+        """
+        Símbolos en la caché de un tipo de datos.
+        """
+        folder = self.folder(kind)
+        if not os.path.isdir(folder): return list()
+        return sorted(unquote(name) for name in os.listdir(folder) if os.path.isdir(os.path.join(folder, name)))
+
+    def dates(self, kind: str, symbol: str) -> list:
+        """
+        Fechas ("`YYYY-MM-DD`") de las particiones de un símbolo, ordenadas.
+        """
+        folder = self.folder(kind, symbol)
+        if not os.path.isdir(folder): return list()
+        return sorted(name[: -4] for name in os.listdir(folder) if name.endswith(".npy"))
+
+    def catalog(self) -> DataFrame:
+        """
+        Contenido de la caché: particiones, filas y fechas extremas por tipo de datos y símbolo. Solo lee los
+        encabezados de los archivos.
+        """
+        rows = list()
+        for kind in self.KINDS:
+            for symbol in self.symbols(kind):
+                dates = self.dates(kind, symbol)
+                if not dates: continue
+                folder = self.folder(kind, symbol)
+                n_rows = sum(len(numpy.load(os.path.join(folder, f"{date}.npy"), mmap_mode = "r")) for date in dates)
+                rows.append({"kind": kind, "symbol": symbol, "partitions": len(dates), "rows": n_rows,
+                    "first": dates[0], "last": dates[-1]})
+        return DataFrame(rows, columns = ["kind", "symbol", "partitions", "rows", "first", "last"])
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def stream(self, kind: str = "bars", symbols: list = None, start = None, end = None,
+        columns: list = None, days: int = 1):
+        """
+        Lee la caché de a bloques de "`days`" fechas, en orden cronológico: cada bloque es una única tabla con los
+        datos de todos los símbolos en esas fechas (columna "`symbol`"), ordenada por momento. Solo se lee un bloque a
+        la vez, así que la memoria usada no depende del largo del rango.
+
+        Inputs:
+        * "`kind`" ("`str`"): Tipo de datos ("`bars`" o "`ticks`").
+        * "`symbols`" ("`list`"): Símbolos a leer. Por defecto, todos los de la caché.
+        * "`start`", "`end`" ("`str`" o "`Timestamp`"): Rango de momentos "`[start, end)`" (sin zona horaria = UTC).
+        * "`columns`" ("`list`"): Columnas a leer. Por defecto, todas.
+        * "`days`" ("`int`"): Fechas por bloque.\n
+        Outputs:
+        * "`chunk`" ("`DataFrame`"): Generador de bloques.
+        """
+        to_utc = lambda ts: None if (ts is None) else (Timestamp(ts).tz_localize("UTC")
+            if (Timestamp(ts).tz is None) else Timestamp(ts).tz_convert("UTC"))
+        start, end = to_utc(start), to_utc(end)
+        symbols = self.symbols(kind) if (symbols is None) else ([symbols] if isinstance(symbols, str) else symbols)
+        first, last = None if (start is None) else f"{start:%Y-%m-%d}", None if (end is None) else f"{end:%Y-%m-%d}"
+        # Particiones del rango, por fecha.
+        partitions = dict()
+        for symbol in symbols:
+            for date in self.dates(kind, symbol):
+                if ((first is None) or (date >= first)) and ((last is None) or (date <= last)):
+                    partitions.setdefault(date, list()).append(symbol)
+        dates = sorted(partitions)
+        for n in range(0, len(dates), days):
+            parts = list()
+            for date in dates[n : n + days]:
+                for symbol in partitions[date]:
+                    file = os.path.join(self.folder(kind, symbol), f"{date}.npy")
+                    part = self.partition(file, kind, columns = columns)
+                    parts.append(part.assign(symbol = symbol))
+            chunk = concat(parts).sort_index(kind = "stable")
+            if (start is not None): chunk = chunk[chunk.index >= start]
+            if (end is not None): chunk = chunk[chunk.index < end]
+            if not chunk.empty: yield chunk
+
+    def read(self, kind: str = "bars", symbols: list = None, start = None, end = None, columns: list = None):
+        """
+        Lee todo un rango de la caché en una única tabla (ver "`stream`"). Para rangos largos, usar "`stream`".
+        """
+        chunks = [*self.stream(kind, symbols, start, end, columns, days = 30)]
+        if chunks: return concat(chunks)
+        return DataFrame(index = DatetimeIndex([], tz = "UTC", name = self.KINDS[kind]))
+
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+if (__name__ == "__main__"):
+
+    from argparse import ArgumentParser
+
+    args = ArgumentParser(prog = "Historical data ingest",
+        description = "Loads historical bars/ticks into a partitioned columnar cache (symbol/date)")
+    args.add_argument("files", type = str, nargs = "*", help = "Local dumps to ingest (.csv, .parquet)")
+    args.add_argument("-k", "--kind", type = str, default = "bars", choices = [*History.KINDS], help = "Data kind")
+    args.add_argument("-s", "--symbol", type = str, default = None,
+        help = "Symbol of the dumps without a 'symbol' column (default: file name)")
+    args.add_argument("-d", "--download", type = str, default = None,
+        help = "Comma separated Yahoo Finance symbols to download (ex: GGAL.BA,YPFD.BA)")
+    args.add_argument("--start", type = str, default = None, help = "Download start date")
+    args.add_argument("--end", type = str, default = None, help = "Download end date")
+    args.add_argument("--interval", type = str, default = "1d", help = "Download bar interval")
+    args.add_argument("-c", "--cache", type = str, default = PATH_FOLDER_HISTORY, help = "Cache folder")
+    values = args.parse_args()
+
+    history = History(values.cache)
+    for file in values.files: history.ingest(file, values.kind, values.symbol)
+    if values.download: history.download(values.download.split(","), values.start, values.end, values.interval)
+    print(history.catalog().to_string())
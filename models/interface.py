@@ -1,7 +1,10 @@
 import os, sys
 sys.path.append("./")
 
-import numpy, pyRofex
+import numpy, pyRofex, threading
+from functools import partial
+from numpy import nan
+from time import time, time_ns, perf_counter_ns
 from configparser import ConfigParser
 from pandas import Timestamp, Timedelta
 from pandas import Series, DataFrame
@@ -11,6 +14,9 @@ from loguru import logger as Log
 from utils.constants import *
 from models.manager import Manager
 from models.strategy import *
+from models.pipeline import Stage
+from models.transport import Transport
+from models.frames import FrameLog, loads
 from strategies.alma import Alma
 
 from pyRofex.components.globals import environment_config as ENV
@@ -30,75 +36,145 @@ class Interface(Manager):
     * "`account`" ("`str`"): Cuenta de usuario de ReMarkets.
     * "`password`" ("`str`"): Clave de la cuenta de usuario de ReMarkets.
     * "`environment`" ("`pyRofex.Environment`"): Portal de acceso a Rofex: simulación ("`REMARKET`") o real ("`LIVE`")
+    * "`pipeline`" ("`dict`" o "`False`"): Configuración de las etapas de procesamiento (ver "`Stage`"), por etapa:
+        "`{"parse": {"policy": "block", "maxsize": 10000}, "strategies": {"policy": "conflate"}}`". Lo no provisto
+        toma los valores de "`PIPELINE`". Con "`False`", todo se procesa dentro del callback del WebSocket.
+    * "`transport`" ("`dict`" o "`False`"): Configuración del "pool" de conexiones para las órdenes (ver
+        "`Transport`"): "`{"size": 4, "timeout": 2.0}`". Lo no provisto toma los valores de "`TRANSPORT`". Con
+        "`False`", las órdenes se envían mediante el cliente REST de "`pyRofex`".
+    * "`raw_frames`" ("`bool`"): Recibir los mensajes de mercado crudos del WebSocket y decodificarlos con
+        "`orjson`" si está instalado (ver "`_on_receive_frame`"), en lugar de la decodificación de "`pyRofex`".
+        Por defecto, "`True`".
+    * "`record_frames`" ("`str`"): Archivo donde grabar los mensajes de mercado crudos (ver "`FrameLog`"), con
+        "`raw_frames`". Por defecto, no se graban.
+
+    El procesamiento por defecto se divide en etapas, cada una con su propio thread y su cola:
+    - Recepción (callback del WebSocket): solo toma el tiempo de llegada y encola el tick en "parse".
+    - "`parse`": formatea el tick ("`parse_data_market`"), lo agrega al historial ("`store`") y actualiza las barras
+        en curso ("`bars`").
+    - "`strategies`": ejecuta las estrategias de los derivados actualizados ("`on_tick`") y de las barras cerradas
+        ("`on_bar`"), y procesa los "order reports" (así,
+        los libros de posiciones se acceden desde un único thread). Por defecto combina ("conflate") todos los
+        ticks pendientes en una sola ejecución, con la unión de sus derivados: las estrategias solo necesitan el
+        estado mas reciente, y con muchos derivados ("`Manager.select_universe`") cada ronda los abarca a todos
+        en lugar de ejecutarse una vez por derivado.
+    Cada ejecución de estrategia se mide contra su presupuesto de latencia ("`Strategy.budget`"). Las que lo exceden
+    seguido pasan a ejecutarse con menor frecuencia, y luego en su propio thread (ver "`Budget`", "`_run_background`"),
+    cuyas señales vuelven a la etapa "strategies" para su envío.
     """
+    # Configuración por defecto de las etapas del "pipeline" (ver "Stage").
+    PIPELINE = {"parse": dict(policy = "block", maxsize = 10000),
+           "strategies": dict(policy = "conflate", maxsize = 10000)}
+    # Configuración por defecto del "pool" de conexiones para las órdenes (ver "Transport").
+    TRANSPORT = dict(size = 4, timeout = 2.0)
+    # Columnas de precio y volumen de cada nivel del book, por lado del feed (ver "parse_data_market").
+    BOOK_COLUMNS = {key: [(f"price_{side}_l{level}", f"size_{side}_l{level}") for level in range(1, 6)]
+        for key, side in (("OF", "ask"), ("BI", "bid"))}
 
     #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
     def __init__(self, **kwargs):
         
+        pipeline = kwargs.pop("pipeline", dict())
+        transport = kwargs.pop("transport", dict())
+        raw_frames, record_frames = kwargs.pop("raw_frames", True), kwargs.pop("record_frames", None)
         super().__init__(**kwargs)
 
+        # Crear el "pool" de conexiones para las órdenes, y abrirlas de antemano.
+        self.transport = None
+        if (transport is not False):
+            config = ENV[self.environment]
+            self.transport = Transport(config["url"], config["token"],
+                refresh = self._refresh_token, **{**self.TRANSPORT, **transport})
+            self.transport.warm()
+
+        # Threads propios de las estrategias en modo "background", creados a demanda (ver "_to_background").
+        self.workers = dict()
+        # Crear e iniciar las etapas del "pipeline".
+        self.stages = dict()
+        if (pipeline is not False):
+            config = {stage: {**params, **pipeline.get(stage, dict())}
+                      for stage, params in self.PIPELINE.items()}
+            self.stages["parse"] = Stage("parse", self._on_stage_parse, **config["parse"])
+            self.stages["strategies"] = Stage("strategies", self._on_stage_strategies,
+                key = self._key_stage_strategies, merge = self._merge_stage_strategies, **config["strategies"])
+            for stage in self.stages.values(): stage.start()
+            Log.info(f"Pipeline stages: {config}")
+
         pyRofex.init_websocket_connection(
-            market_data_handler = self._on_update_market,
-            order_report_handler = self._on_update_orders,
+            market_data_handler = self._on_receive_market if self.stages else self._on_update_market,
+            order_report_handler = self._on_receive_orders if self.stages else self._on_update_orders,
             error_handler = self._on_update_errors,
             exception_handler = self._on_exception)
 
-        self.websocket = ENV.get("ws_client")
+        self.websocket = ENV[self.environment]["ws_client"]
+        # Recibir los mensajes crudos, en lugar de los decodificados por "pyRofex" (ver "_on_receive_frame"). Cada
+        # "connect" del cliente (ej: al reconectar) crea un "WebSocketApp" nuevo con su "on_message": se reemplaza
+        # en el cliente, para que valga en todas las conexiones, y en la conexión ya abierta.
+        self._on_message, self.frames = self.websocket.on_message, None
+        if raw_frames:
+            if record_frames: self.frames = FrameLog(record_frames)
+            self.websocket.on_message = self.websocket.ws_connection.on_message = self._on_receive_frame
+        # Cerrar cada segundo las barras vencidas de los derivados sin ticks recientes (ver "BarBuilder.flush").
+        self.tasks.add_job(name = "close_bars", func = self._close_bars, trigger = "interval", seconds = 1)
+        # Suscribir al WebSocket de órdenes, para recibir los "fills" de las órdenes
+        # enviadas y así mantener actualizados los libros de posiciones ("Ledger").
+        pyRofex.order_report_subscription(snapshot = True)
 
     #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
     @classmethod
-    def parse_data_market(cls, entry: dict):
+    def parse_data_market(cls, entry: dict, ns_local: int = None):
         """
         Esta función recibe los JSONs provistos por el WebSocket con contenido de datos de mercado, y los reformula para
         que sean compatibles con la estructura de "`Manager.symbol_data`" (ver "`Manager.MARKET_DATA_COLUMNS`"). Siendo un
-        "`classmethod`" puede testearse con dicts de prueba.
+        "`classmethod`" puede testearse con dicts de prueba. Solo llegan los datos suscriptos para el instrumento (ver
+        "`Manager.get_data_enums`"): los ausentes (ej: "`IV`", o niveles del libro mas allá de la profundidad pedida)
+        simplemente no se incluyen en el resultado, y el historial ("`TickStore`") los guarda como vacíos.
+        Lee cada campo una única vez (sin modificar a "`entry`") y lo escribe directamente en el tick plano que luego
+        leen "`store`" y "`bars`". Si el tick no es válido (sin book ni última operación), devuelve "`None`".
         
         Inputs:
         * "`entry`" ("`dict`"): Entrada de datos de mercado. Para ver el formato,
         leer página 41 de: "https://apihub.primary.com.ar/assets/docs/Primary-API.pdf"
+        * "`ns_local`" ("`int`"): Momento local del tick, en nanosegundos desde "epoch" (UTC). Por defecto, ahora.
         """
-        ts_local = Timestamp.utcnow()
-        # Extraer timestamp de tick, dada en milisegundos.
-        ms_event = entry.pop("timestamp")
         # "marketData" contiene los datos de mercado mismos.
-        market_data: dict = entry.pop("marketData")
-        # Extraer campos ajenos al "bid/ask" (ej: open interest)
-        iv, tv = market_data.pop("IV"), market_data.pop("TV")
-        oi, nv = market_data.pop("OI"), market_data.pop("NV")
-        # Extraer campos relacionados a la última operación ("last")
-        last_price, last_size, ms_last = market_data.pop("LA").values()
-        # Extraer nombre de derivado y de portal de mercado.
-        market, symbol = entry.pop("instrumentId").values()
-
+        market_data: dict = entry["marketData"]
+        get = market_data.get
+        asks, bids, last = get("OF"), get("BI"), get("LA")
+        # Comprobar que es un tick valido: con book o con última operación (según lo suscripto).
+        if not (asks or bids or last): return None
         # Medir "delays" en milisegundos, como el tiempo transcurrido desde
         # el evento de tick o desde la última operación, hasta el presente.
-        ms_local = ts_local.timestamp() * 1000
-        dms_event = int(ms_local - ms_event)
-        dms_last = int(ms_local - ms_last)
-
-        # Unir bids y asks en un solo DataFrame, acoplados
-        # según el nivel del book. Incluye precios y volúmenes.
-        book = concat(axis = "columns", objs = {
-                "ask": DataFrame(market_data.pop("OF")), # Ask/Offer
-                "bid": DataFrame(market_data.pop("BI"))  # Bid
-            })
-        # Apilar valores en una sola columna, indexados según el origen, nivel y el side
-        # (ej: "price ask 1", "vol ask 1", "price bid 1", "vol bid 1, price ask 2", etc.)
-        book = book.reindex(range(5)).unstack()
-        index = book.index.to_frame(False)
-        index.columns = ["side", "var", "level"]
-        # El primer nivel debe ser el 1, no el 0.
-        index["level"] = index["level"] + 1
-        index_format = "{0[var]}_{0[side]}_l{0[level]}".format
-        # Aplicar formato de indexación para poder acoplar al dict resultante.
-        book.index = index.agg(index_format, axis = "columns")
-        
-        return {"ts": ts_local, "price_last": last_price, "size_last": last_size,
-            "iv": iv, "tv": tv, "oi": oi, "nv": nv, **book, "dms_last": dms_last,
-            "dms_event": dms_event, "market": market, "symbol": symbol, }
+        ns_local = ns_local or time_ns()
+        ms_local, instrument = ns_local / 1e6, entry["instrumentId"]
+        tick = {"ts": ns_local, "price_last": None, "size_last": None, "iv": get("IV"), "tv": get("TV"),
+            "oi": get("OI"), "nv": get("NV"), "dms_last": None, "dms_event": int(ms_local - entry["timestamp"]),
+            "market": instrument["marketId"], "symbol": instrument["symbol"], }
+        # Extraer campos relacionados a la última operación ("last")
+        if last:
+            tick["price_last"], tick["size_last"], ms_last = last.get("price"), last.get("size"), last.get("date")
+            if ms_last: tick["dms_last"] = int(ms_local - ms_last)
+        # Aplanar bids y asks según el nivel del book, con precios y volúmenes (ej: "price_ask_l1",
+        # "size_ask_l1", "price_bid_l1", etc.). "zip" corta en el último nivel de "BOOK_COLUMNS".
+        for key, quotes in (("OF", asks), ("BI", bids)):
+            if not quotes: continue
+            for (price, size), quote in zip(cls.BOOK_COLUMNS[key], quotes):
+                tick[price], tick[size] = quote["price"], quote["size"]
+        return tick
         
     #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
-    def _run_strategies(self, symbols: set):
+    def _mark(self, stage: str, key: str, t0: int, id_tick: int, is_traced: bool, **args):
+        """
+        Cierra la etapa "`stage`" iniciada en "`t0`" ("`perf_counter_ns`"): la acumula en "`profiler`" (si está
+        activo) y en la traza del tick (si "`is_traced`"). Devuelve el instante actual, inicio de la etapa siguiente.
+        """
+        t1 = perf_counter_ns()
+        if self.profiler.enabled: self.profiler.add(stage, key, t0, t1)
+        if is_traced: self.tracer.span(id_tick, stage, t0, t1, key = key, **args)
+        return t1
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def _run_strategies(self, symbols: set, id_tick: int = None, is_traced: bool = False):
         """
         Funcion interna que ejecuta la función principal ("`Strategy.on_tick`") de cada estrategia dentro
         de "`strategies`". Toma la lista de derivados ("`symbols`") que supuestamente fueron actualizados
@@ -109,7 +185,16 @@ class Interface(Manager):
         - "`Signal.ORDER`" (nueva órden de compra/venta),
         - "`Signal.MODIFY`" (modificación de órden ya existente - todavía no probada),
         - "`Signal.CANCEL`" (cancelación de órden ya existente - todavía no probada).
+        Con "`profiler.enabled`", se acumulan los tiempos de las etapas "`filter`", "`on_tick`" y "`execute`"
+        por estrategia (ver "`Profiler`"). Las señales llevan el ID del tick que las originó ("`id_tick`"), y si
+        dicho tick fue muestreado ("`is_traced`"), las mismas etapas se registran en su traza (ver "`Tracer`").
+        Según el modo de su presupuesto de latencia ("`Budget`"), una estrategia puede omitirse en esta ronda
+        ("`throttled`") o ejecutarse en su propio thread ("`background`").
         """
+        profiler, sampler, clock = self.profiler, self.sampler, self.clock
+        is_timed = profiler.enabled or is_traced
+        # Leer la hora una única vez para toda la ronda: las estrategias y sus señales usan esta lectura.
+        clock.tick()
         # Preparar una lista para guardar datos de las
         # nuevas órdenes a generar durante esta ronda.
         new_signals = list()
@@ -121,55 +206,200 @@ class Interface(Manager):
             strat_class = strat.__class__.__name__
             # Tomar los derivados "necesarios":
             # "Recientemente actualizados" + "operados por la estrategia".
-            strat_derivs = list(symbols & set(strat.specs_derivs.index))
-            strat_unders = self.specs_derivs.loc[strat_derivs, "underlying"].unique()
-            # Medir timestamp actual, para futuro cálculo de delay de estrategia.
-            ms_exec = (ts_exec := Timestamp.utcnow()).timestamp() * 1000
-            is_feed = self.symbol_ticks["symbol"].isin(strat_derivs)
-            # Copiar historial de los derivados necesarios y de sus subyacentes.
-            data_deriv = self.symbol_ticks.loc[is_feed] # derivados
-            data_under = self.specs_unders.loc[strat_unders] # subyacentes
+            strat_derivs = symbols & set(strat.specs_derivs.index)
+            # Omitir la ejecución si la estrategia está limitada ("throttled") y todavía no es su turno: sus
+            # derivados quedan pendientes para la próxima. Si está en segundo plano, delegarla a su thread.
+            t0 = t_start = clock.mono_ns()
+            if not strat.budget.due(strat_derivs, t_start): continue
+            strat_derivs = strat.budget.take(strat_derivs)
+            if (strat.budget.mode == "background"):
+                self._to_background(strat, strat_derivs, id_tick, t_start); continue
+            # Subyacentes de la estrategia, precompilados al cargarla (ver "Strategy.compile").
+            strat_unders = strat.layout["unders"]
+            # Momento de ejecución, para futuro cálculo de delay de estrategia.
+            ms_exec = clock.wall_ns(t_start) / 1e6
+            # Copiar historial de los derivados necesarios (decodificado a "float") y de sus subyacentes:
+            # solo las columnas y cantidad de ticks que la estrategia declara usar (ver "Strategy.FIELDS").
+            data_deriv = self.store.frame(strat_derivs, strat.FIELDS, strat.DEPTH) # derivados
+            data_under = self.get_data_unders(strat_unders) if strat.UNDERLYING else DataFrame() # subyacentes
             if self.debug:
                 Log.debug(f"Strategy\"{strat_class} - {name}\" executed")
+            if is_timed: t0 = self._mark("filter", name, t0, id_tick, is_traced)
+            # Si la estrategia está siendo perfilada, habilitar el muestreo de este thread.
+            is_sampled = (sampler is not None) and (sampler.strat_name == name)
+            if is_sampled: sampler.target = threading.get_ident()
             # Ejecutar función principal de estrategia, "Strategy.on_tick".
+            t_strat = clock.mono_ns()
             try: signals = strat.on_tick(data_deriv, data_under)
             except Exception as EXC: Log.exception(EXC); continue
-            strat.time_executed = Timestamp.utcnow()
+            finally:
+                if is_sampled: sampler.target = None
+                self._on_budget(strat, t_strat, self.metrics.on_strategy(name, t_strat))
+            if is_timed: self._mark("on_tick", name, t0, id_tick, is_traced)
+            strat.time_executed = clock.now()
             # Si la estrategia no devolvió señales, pasar a la próxima.
             if not isinstance(signals, list): continue
-            strat_class = strat.__class__.__name__
+            new_signals += self._send_signals(strat, signals, ms_exec, id_tick, is_traced, t_start)
+        
+        self._log_signals(new_signals)
+
+    def _on_budget(self, strat: Strategy, t0: int, dt: int):
+        """
+        Registra una ejecución de la estrategia "`strat`" iniciada en "`t0`" y de "`dt`" ns en su presupuesto de
+        latencia ("`Budget.on_run`"), e informa si por ello cambió de modo.
+        """
+        budget = strat.budget
+        mode = budget.on_run(t0, dt)
+        if mode: Log.warning(f"Strategy \"{strat.name}\" switched to \"{mode}\" mode: {budget.ratio:.0%} "
+            f"of recent runs over its {budget.seconds * 1000:g} ms budget (mean {budget.mean_ns / 1e6:.2f} ms)")
 
-            for signal in signals:
+    def _to_background(self, strat: Strategy, symbols: list, id_tick: int = None, t_start: int = None):
+        """
+        Encola la ejecución de la estrategia "`strat`" por los derivados "`symbols`" en su propio thread (una etapa
+        "`Stage`" que se crea a demanda). Si ya tenía una ejecución pendiente por los mismos derivados, la reemplaza.
+        """
+        worker = self.workers.get(strat.name)
+        if worker is None:
+            # Una estrategia ya removida (ver "`remove_strategies`") no vuelve a crear su etapa.
+            if self.strategies.get(strat.name) is not strat: return
+            worker = Stage(f"strategy - {strat.name}", partial(self._run_background, strat.name),
+                policy = "conflate", key = lambda item: item[0])
+            self.workers[strat.name] = worker; worker.start()
+        worker.put((frozenset(symbols), id_tick, t_start))
+
+    def _run_background(self, name: str, item: tuple):
+        """
+        Ejecuta "`on_tick`" de la estrategia "`name`" en su propio thread (ver "`_to_background`"). Sus señales se
+        envían desde la etapa "strategies" (único thread con acceso a los libros de posiciones), o en este mismo
+        thread si no hay "pipeline". Su plazo corre desde que se encoló la ejecución ("`t_start`").
+        """
+        symbols, id_tick, t_start = item
+        strat: Strategy = self.strategies.get(name)
+        if (strat is None) or not strat.active: return
+        ms_exec = self.clock.wall_ns() / 1e6
+        data_deriv = self.store.frame([*symbols], strat.FIELDS, strat.DEPTH)
+        data_under = self.get_data_unders(strat.layout["unders"]) if strat.UNDERLYING else DataFrame()
+        t_strat = perf_counter_ns()
+        try: signals = strat.on_tick(data_deriv, data_under)
+        except Exception as EXC: Log.exception(EXC); return
+        finally: self._on_budget(strat, t_strat, self.metrics.on_strategy(name, t_strat))
+        strat.time_executed = self.clock.now()
+        if not isinstance(signals, list) or not signals: return
+        if not self.stages: return self._log_signals(self._send_signals(strat, signals, ms_exec, id_tick,
+            t_start = t_start))
+        self.stages["strategies"].put(("signals", name, signals, ms_exec, id_tick, t_start))
 
-                # Evitar errores si la función no devuelve señales.
-                if not isinstance(signal, Signal): continue
-                # Medir timestamp actual, para futuro cálculo de delay de envío.
-                ms_send = Timestamp.utcnow().timestamp() * 1000
+    def remove_strategies(self, names: list):
+        """
+        Igual a "`Manager.remove_strategies`", y además detiene y descarta la etapa de ejecución en segundo plano
+        de cada estrategia removida (ver "`_to_background`"), si la tenía. Sus ejecuciones pendientes se descartan.
+
+        Inputs:
+        - "`names`" ("`list[str]`"): Los nombres de las estrategias a borrar.
+        """
+        if isinstance(names, str): names = [names]
+        super().remove_strategies(names)
+        for name in names:
+            worker: Stage = self.workers.pop(name, None)
+            if worker: worker.stop()
+
+    def _run_bars(self, closed: list):
+        """
+        Ejecuta "`Strategy.on_bar`" de las estrategias activas que declaran barras ("`Strategy.BARS`") por cada
+        barra recién cerrada de sus derivados ("`closed`", ver "`BarBuilder.update`"), con sus últimas barras.
+        Las señales devueltas se envían igual que las de "`on_tick`" (ver "`_send_signals`").
+        """
+        new_signals, clock = list(), self.clock
+        clock.tick()
+        for symbol, timeframe in closed:
+            for name in self.symbol_feeds.get(symbol, list()):
+                strat: Strategy = self.strategies.get(name)
+                if (strat is None) or not strat.active or (timeframe not in (strat.BARS or dict())): continue
+                t_start = clock.mono_ns()
+                ms_exec = clock.wall_ns(t_start) / 1e6
+                bars = self.bars.frame(symbol, timeframe, strat.BARS[timeframe])
+                t_strat = perf_counter_ns()
+                try: signals = strat.on_bar(symbol, timeframe, bars)
+                except Exception as EXC: Log.exception(EXC); continue
+                finally: self._on_budget(strat, t_strat, self.metrics.on_strategy(name, t_strat))
+                strat.time_executed = clock.now()
+                if isinstance(signals, list):
+                    new_signals += self._send_signals(strat, signals, ms_exec, t_start = t_start)
+        self._log_signals(new_signals)
+
+    def _send_signals(self, strat: Strategy, signals: list, ms_exec: float,
+                      id_tick: int = None, is_traced: bool = False, t_start: int = None) -> list:
+        """
+        Valida y corrige ("`PreTrade.check`"), filtra ("`Ledger.allow`") y envía ("`execute`") las señales devueltas
+        por la estrategia "`strat`", y las registra en su historial ("`signals`") con sus demoras respecto de
+        "`ms_exec`" (inicio de su ejecución, en milisegundos). Si la ejecución venció el plazo de la estrategia
+        ("`Budget.is_stale`", contado desde "`t_start`", en "`perf_counter_ns`"), todas sus señales se registran
+        como "`STALE`" sin enviarse. El plazo se evalúa una única vez, antes de enviar la primera: las demoras de
+        los envíos de la tanda no vuelven obsoletas a las siguientes. Devuelve los datos de las señales registradas,
+        para "`_log_signals`".
+        """
+        name, strat_class, clock = strat.name, strat.__class__.__name__, self.clock
+        is_timed, new_signals = self.profiler.enabled or is_traced, list()
+        # Evitar errores si la función no devuelve señales.
+        signals = [signal for signal in signals if isinstance(signal, Signal)]
+        # Descartar (o corregir) en bloque las órdenes que el mercado rechazaría, sin pedido REST.
+        if self.pretrade and signals:
+            t0 = perf_counter_ns()
+            signals, rejected = self.pretrade.check(signals)
+            if is_timed: self._mark("pretrade", name, t0, id_tick, is_traced, n_rejected = len(rejected))
+            for signal, reason in rejected:
+                Log.warning(f"Pre-trade rejected ({reason}) signal from \"{name}\": \n{repr(signal)}")
+        # Ejecución obsoleta (vencido el plazo de la estrategia): registrar sus señales sin enviarlas.
+        t0 = clock.mono_ns()
+        is_stale = bool(signals) and (t_start is not None) and strat.budget.is_stale(t_start, t0, len(signals))
+        if is_stale: Log.warning(f"Stale signals from \"{name}\" ({(t0 - t_start) / 1e6:.1f} ms): {len(signals)}")
+        for signal in signals:
+
+            signal.id_tick = id_tick
+            # Descartar señales redundantes (posición máxima, cooldown).
+            with strat.lock: is_allowed = strat.ledger.allow(signal)
+            if not is_allowed: continue
+            # Momento de envío (derivado de la lectura del ciclo, ver "Clock"), para futuro cálculo de delay.
+            t0 = clock.mono_ns()
+            ms_send = clock.wall_ns(t0) / 1e6
+            if is_stale: ID, proprietary, status = None, None, "STALE"
+            else:
                 # Enviar orden/señal, y recibir respuesta de API, y resultado.
                 ID, proprietary, status = self.execute(signal)
-                # Medir timestamp actual, (instante final de ejecución de estrategia).
-                ts_resp = Timestamp.utcnow()
-                ms_resp = ts_resp.timestamp() * 1000
-
-                # Agregar datos al DataFrame interno de señales de la estrategia.
-                strat.signals.loc[ts_resp] = {
-                    **signal.dict, "status": status,
-                    "id_order": ID, "prop": proprietary,
-                    # Delays de envío y respuesta.
-                    "dms_send": int((ms_send - ms_exec)),
-                    "dms_exec": int((ms_resp - ms_exec))}
-                
-                # Agregar datos a la lista de nuevas órdenes de esta ronda.
-                new_signals.append({"strat_name": name, "strat_class": strat_class,
-                    "ts_resp": ts_resp, **signal.dict, "status": status, "id_order": ID})
-        
+                self.metrics.on_order(name, t0)
+                if is_timed: self._mark("execute", name, t0, id_tick, is_traced,
+                    id_signal = signal.id_signal, id_order = ID, status = status)
+                # Registrar el envío en el libro de posiciones de la estrategia.
+                with strat.lock: strat.ledger.on_send(signal, ID, status)
+                if ID is not None: self.order_strats[ID] = name
+            # Instante final de ejecución de estrategia.
+            ns_resp = clock.wall_ns()
+            ts_resp, ms_resp = Timestamp(ns_resp, tz = "UTC"), ns_resp / 1e6
+
+            # Agregar datos al DataFrame interno de señales de la estrategia.
+            with strat.lock: strat.signals.loc[ts_resp] = {
+                **signal.dict, "status": status,
+                "id_order": ID, "prop": proprietary,
+                # Delays de envío y respuesta.
+                "dms_send": int((ms_send - ms_exec)),
+                "dms_exec": int((ms_resp - ms_exec)), "id_tick": id_tick}
+            
+            # Agregar datos a la lista de nuevas órdenes de esta ronda.
+            new_signals.append({"strat_name": name, "strat_class": strat_class,
+                "ts_resp": ts_resp, **signal.dict, "status": status, "id_order": ID})
+        return new_signals
+
+    def _log_signals(self, new_signals: list):
+        """
+        Con "`debug`", muestra en consola las señales enviadas en esta ronda (ver "`_send_signals`").
+        """
         # Si no hubieron señales, no hacer nada.
         if not new_signals: return
         # Convertir la lista en DataFrame para printear.
         new_signals = DataFrame(new_signals)
         index_labels = ["ts_resp", "strat_class", "strat_name"]
         # Calcular hace cuantos milisegundos se efectuó cada órden.
-        new_signals["ms_ago"] = Timestamp.utcnow() - new_signals["ts_resp"]
+        new_signals["ms_ago"] = self.clock.now() - new_signals["ts_resp"]
         new_signals["ms_ago"] = new_signals["ms_ago"].dt.total_seconds()
         new_signals["ms_ago"] = (new_signals["ms_ago"] * 1000).astype(int)
         # Formatear timestamp de respuesta de la API como "HH:MM:SS.fff".
@@ -188,10 +418,12 @@ class Interface(Manager):
             Log.info(f"Exec. signal: \n{repr(signal)}")
             # Ante una cancelación, enviar solo el ID a cancelar.
             if (signal.action == Signal.Action.CANCEL):
-                response = pyRofex.cancel_order(signal.ID)
+                if not self.transport: response = pyRofex.cancel_order(signal.ID)
+                else: response = self.transport.cancel_order(signal.ID, ENV[self.environment]["proprietary"])
             # Ante nueva órden, enviar sus datos en formato API ("form").
             elif (signal.action == Signal.Action.ORDER):
-                response = pyRofex.send_order(**signal.form)
+                if not self.transport: response = pyRofex.send_order(**signal.form)
+                else: response = self.transport.send_order(account = self.account, **signal.form)
             # "modify" todavía pendiente (no hay tal función en "pyRofex").
             else: return [None, None, "Not implemented"]
             
@@ -205,47 +437,203 @@ class Interface(Manager):
             # Devolver excepción como status de la respuesta.
             return [None, None, repr(EXC)]
 
+    def _refresh_token(self) -> str:
+        """
+        Renueva el token de autenticación mediante el cliente REST de "`pyRofex`" (para "`Transport`").
+        """
+        config = ENV[self.environment]
+        config["rest_client"].update_token()
+        Log.warning("Authentication token refreshed")
+        return config["token"]
+
     #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
-    def _on_update_market(self, entry: dict):
+    def _on_receive_frame(self, ws, message: str):
+        """
+        Callback crudo del WebSocket (reemplaza a "`on_message`" de "`pyRofex`", con "`raw_frames`"). Decodifica el
+        mensaje con "`loads`" ("`orjson`" si está instalado, ver "`FrameLog`") y, si es de datos de mercado, lo
+        procesa como "`_on_receive_market`" (o "`_on_update_market`" sin "pipeline"), grabándolo antes si se pidió
+        ("`record_frames`"). Los demás mensajes ("order reports", errores) siguen el camino de "`pyRofex`".
+        """
+        t_recv = perf_counter_ns()
+        try:
+            entry = loads(message)
+            if (str(entry.get("type")).upper() != "MD"): return self._on_message(ws, message)
+            if self.frames: self.frames.record(message)
+            if self.stages: return self._on_receive_market(entry, t_recv)
+            self._on_update_market(entry)
+        except Exception as EXC: self._on_exception(EXC)
+
+    def _on_receive_market(self, entry: dict, t_recv: int = None):
+        """
+        Callback del WebSocket para ticks de mercado, con "pipeline": solo descarta los ticks de instrumentos sin
+        estrategias, y encola el resto junto a su instante de llegada en la etapa "parse".
+        """
+        if entry["instrumentId"]["symbol"] not in self.symbol_feeds: return
+        self.stages["parse"].put((t_recv or perf_counter_ns(), entry))
+
+    def _on_receive_orders(self, entry: dict):
+        """
+        Callback del WebSocket para "order reports", con "pipeline": los encola en la etapa "strategies".
+        """
+        self.stages["strategies"].put(("report", entry))
+
+    def _on_stage_parse(self, item: tuple):
+        """
+        Etapa "parse": procesa un tick encolado por "`_on_receive_market`" (ver "`_on_update_market`").
+        """
+        t_recv, entry = item
+        self._on_update_market(entry, t_recv)
+
+    def _on_stage_strategies(self, item: tuple):
+        """
+        Etapa "strategies": ejecuta las estrategias de los derivados actualizados o de las barras cerradas, envía
+        las señales de una estrategia en segundo plano (ver "`_run_background`"), o procesa un "order report".
+        """
+        if (item[0] == "report"): return self._on_update_orders(item[1])
+        if (item[0] == "bars"): return self._run_bars(item[1])
+        if (item[0] == "signals"):
+            _, name, signals, ms_exec, id_tick, t_start = item
+            strat = self.strategies.get(name)
+            if strat: self._log_signals(self._send_signals(strat, signals, ms_exec, id_tick, t_start = t_start))
+            return
+        _, symbols, id_tick, is_traced, t_put = item
+        if is_traced: self.tracer.span(id_tick, "queue_strategies", t_put)
+        self._run_strategies(symbols, id_tick, is_traced)
+
+    @staticmethod
+    def _key_stage_strategies(item: tuple):
+        """
+        Clave de combinación de la etapa "strategies": una sola para todos los ticks (ver "`_merge_stage_strategies`").
+        Los "reports", las barras y las señales de las estrategias en segundo plano no se combinan.
+        """
+        return "tick" if (item[0] == "tick") else None
+
+    @staticmethod
+    def _merge_stage_strategies(pending: tuple, item: tuple) -> tuple:
+        """
+        Combina un tick pendiente de la etapa "strategies" con uno nuevo: la unión de sus derivados, con el ID y el
+        instante de encolado del pendiente (el que mas espera), salvo que solo el nuevo esté siendo trazado.
+        """
+        _, symbols, id_tick, is_traced, t_put = pending
+        if item[3] and not is_traced: id_tick, is_traced = item[2], True
+        return ("tick", symbols | item[1], id_tick, is_traced, t_put)
+
+    def _dispatch(self, symbols: set, id_tick: int = None, is_traced: bool = False):
+        """
+        Ejecuta las estrategias de los derivados "`symbols`": en la etapa "strategies" si hay "pipeline", o en el
+        mismo thread si no lo hay.
+        """
+        if not self.stages: return self._run_strategies(symbols, id_tick, is_traced)
+        self.stages["strategies"].put(("tick", frozenset(symbols), id_tick, is_traced, perf_counter_ns()))
+
+    def _dispatch_bars(self, closed: list):
+        """
+        Ejecuta "`on_bar`" de las estrategias por las barras cerradas "`closed`" (ver "`_run_bars`"): en la etapa
+        "strategies" si hay "pipeline" (sin combinarse), o en el mismo thread si no lo hay.
+        """
+        if not self.stages: return self._run_bars(closed)
+        self.stages["strategies"].put(("bars", closed))
+
+    def _close_bars(self):
+        """
+        Tarea periódica del "`Scheduler`": cierra las barras vencidas de los derivados sin ticks recientes.
+        """
+        closed = self.bars.flush(time_ns())
+        if closed: self._dispatch_bars(closed)
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def _on_update_market(self, entry: dict, t_recv: int = None):
         """
         Esta función recibe el tick de mercado desde el WebSocket. Lo formatea con "`parse_data_market`" de modo que
-        pueda ser guardado en "`symbol_ticks`" y luego pueda ser procesado por la estrategia. Además, toma nota del
-        derivado "`symbol`" recientemente actualizado para notificar a la estrategia mediante "`run_strategies`".
-        Finalmente mantiene el tamaño de "`symbol_ticks`" por debajo de un límite de filas para no sobrecargar el
-        sistema.
+        pueda ser guardado en el historial ("`store`", que además aplica la retención de cada instrumento) y
+        luego pueda ser procesado por la estrategia. Además, toma nota del derivado "`symbol`" recientemente
+        actualizado para notificar a la estrategia mediante "`run_strategies`". Con "`profiler.enabled`", se acumulan los tiempos de las etapas "`parse`", "`append`" y
+        "`strategies`" por derivado (ver "`Profiler`"). Cada tick recibe un ID secuencial; los muestreados por
+        "`tracer`" registran además cada etapa en su traza, dentro de un intervalo "`tick`" que las abarca.
 
         Inputs:
         - "`entry`" ("`dict`"): Tick de mercado provisto por el WebSocket.
+        - "`t_recv`" ("`int`"): Instante de llegada ("`perf_counter_ns`"), si el tick fue encolado (ver "`Stage`").
         """
-        alert_symbols = set()
-        # Comprobar que es un tick valido.
-        is_valid_ask = len(entry["marketData"]["OF"]) > 0
-        is_valid_bid = len(entry["marketData"]["BI"]) > 0
-        if not (is_valid_ask or is_valid_bid): return
-        # Formatear tick de mercado, afin a "symbol_ticks".
+        alert_symbols, profiler = set(), self.profiler
+        # Descartar cuanto antes los ticks de instrumentos sin estrategias.
+        if (symbol := entry["instrumentId"]["symbol"]) not in self.symbol_feeds: return
+        self.metrics.on_tick(symbol)
+        # Asignar ID secuencial al tick, y decidir si se traza.
+        id_tick, is_traced = self.tracer.begin()
+        # Los ticks de instrumentos "spot" solo actualizan el BBO de su subyacente.
+        under = self.spot_unders.get(symbol)
+        if under is not None: return self._on_update_spot(under, entry, id_tick, is_traced)
+        is_timed = profiler.enabled or is_traced
+        t_tick = t0 = perf_counter_ns() if is_timed else 0
+        if t_recv and is_traced: t_tick = self.tracer.span(id_tick, "queue_parse", t_recv, t0, key = symbol)
+        # Formatear tick de mercado, afin a "MARKET_DATA_COLUMNS". Descartarlo si no es válido.
         entry = self.parse_data_market(entry)
-        # Extraer y usar timestamp como índice en "symbol_ticks".
-        ts_local: Timestamp = entry.pop("ts")
-        self.symbol_ticks.loc[ts_local] = entry
+        if entry is None: return
+        if is_timed: t0 = self._mark("parse", symbol, t0, id_tick, is_traced)
+        # Extraer y usar timestamp (en ns) como índice en el historial, con precios y volúmenes enteros.
+        ts_local: int = entry.pop("ts")
+        self.store.append(symbol, ts_local, entry)
+        # Actualizar las barras en curso del derivado, y notificar las que se cerraron (ver "BarBuilder").
+        closed = self.bars.update(symbol, ts_local, entry)
+        if closed: self._dispatch_bars(closed)
+        if is_timed: t0 = self._mark("append", symbol, t0, id_tick, is_traced)
         # Agregar ticker de tick a la lista de derivados actualizados.
         alert_symbols.add(entry["symbol"])
 
         if self.debug: Log.debug(f"Tick:\n{entry}")
 
-        # Ejecutar estrategias para los tickers actualizados.
-        self._run_strategies(alert_symbols)
-        n_ticks = self.symbol_ticks.shape[0]
-        n_ticks_max = self.SYMBOL_TICKS_GLOBAL_MAX
-        if (n_ticks > n_ticks_max): # Limitar tamaño de "symbol_ticks".
-            self.symbol_ticks = self.symbol_ticks.iloc[- n_ticks_max :]
+        # Ejecutar estrategias para los tickers actualizados (o encolarlos, ver "_dispatch").
+        self._dispatch(alert_symbols, id_tick, is_traced)
+        if is_timed: t0 = self._mark("strategies", symbol, t0, id_tick, is_traced)
+        if is_traced: self.tracer.span(id_tick, "tick", t_tick, t0, symbol = symbol)
+
+    def _on_update_spot(self, under: str, entry: dict, id_tick: int = None, is_traced: bool = False):
+        """
+        Tick de un instrumento "spot" (ver "`Manager.spot_symbols`"). Sin pasar por "`parse_data_market`" ni por
+        "`store`", guarda el BBO en "`spot_quotes`" para el subyacente "`under`", y si éste cambió, ejecuta
+        las estrategias de los derivados de dicho subyacente (ver "`under_derivs`").
+
+        Inputs:
+        - "`under`" ("`str`"): Subyacente del instrumento "spot".
+        - "`entry`" ("`dict`"): Tick de mercado provisto por el WebSocket.
+        """
+        t0 = perf_counter_ns() if is_traced else 0
+        bids, asks = entry["marketData"].get("BI"), entry["marketData"].get("OF")
+        bid = bids[0]["price"] if bids else nan
+        ask = asks[0]["price"] if asks else nan
+        quote = self.spot_quotes.get(under)
+        self.spot_quotes[under] = [bid, ask, time()]
+        if is_traced: t0 = self.tracer.span(id_tick, "spot", t0, key = under)
+        # Sin cambios en el BBO, las estrategias no tienen nada nuevo que calcular. Un lado vacío ("NaN") que
+        # sigue vacío tampoco es un cambio ("NaN" nunca es igual a sí mismo).
+        if quote and numpy.array_equal(quote[: 2], (bid, ask), equal_nan = True): return
+        symbols = self.under_derivs.get(under, set()) & self.symbol_feeds.keys()
+        if symbols: self._dispatch(symbols, id_tick, is_traced)
+        if is_traced: self.tracer.span(id_tick, "tick", t0, key = under)
 
     #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
     def _on_update_orders(self, entry: dict):
         """
-        Función de WebSocket para recepción de respuestas ante órdenes.
-        Todavía no implementada: actualmente, las órdenes se envían por API, no WebSocket.
+        Función de WebSocket para recepción de respuestas ante órdenes ("order reports"). Las órdenes se envían
+        por API, pero sus ejecuciones ("fills") llegan por aquí: se derivan al libro de posiciones ("`Ledger`")
+        de la estrategia que originó cada órden.
+
+        Inputs:
+        - "`entry`" ("`dict`"): Mensaje de órden provisto por el WebSocket.
         """
-        print("update_orders:", entry)
+        report: dict = entry.get("orderReport", dict())
+        if self.debug: Log.debug(f"Order report:\n{report}")
+        # Buscar la estrategia que envió la órden. Si ya no existe, ignorar.
+        name = self.order_strats.get(report.get("clOrdId"))
+        strat: Strategy = self.strategies.get(name)
+        if strat is None: return
+        with strat.lock:
+            strat.ledger.on_report(report)
+            is_done = report["clOrdId"] not in strat.ledger.orders
+        # Olvidar la órden cuando ya no tiene ejecuciones pendientes.
+        if is_done:
+            self.order_strats.pop(report["clOrdId"], None)
 
     def _on_update_errors(self, entry: dict):
         """
@@ -278,10 +666,19 @@ class Interface(Manager):
         luego cierra la aplicación WebSocket y finaliza la instancia. Se notifica del evento de terminación.
         """
         Log.warning("Shutting down interface & strats...")
+        # Guardar una última foto del estado, para un reinicio rápido.
+        self.save_snapshot()
         # Desactivar y remover todas las estrategias.
         self.remove_strategies([*self.strategies.keys()])
-        # Cerrar la conexión y todos los feeds del WebSocket.
+        # Cerrar la conexión y todos los feeds del WebSocket, y detener las etapas del "pipeline".
         pyRofex.close_websocket_connection(self.environment)
+        for stage in [*self.stages.values(), *self.workers.values()]: stage.stop()
+        # Cerrar el archivo de mensajes crudos grabados, si lo hay.
+        if self.frames: Log.info(f"Recorded {self.frames.n_frames} frames"), self.frames.close()
+        # Cerrar el "pool" de conexiones para las órdenes.
+        if self.transport: Log.info(f"Order connections: \n{self.transport.table}"), self.transport.close()
+        # Detener el servidor de métricas, si está activo.
+        self.metrics.shutdown()
         Log.success("Connection closed, strategies stopped.")
 
 #███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
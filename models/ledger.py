@@ -0,0 +1,262 @@
+import os, sys
+sys.path.append("./")
+
+from time import monotonic
+from pandas import DataFrame
+from pyRofex import Side as OrderSide
+
+from utils.constants import *
+
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+class Ledger:
+    """
+    Libro de posiciones y exposición de una estrategia, por instrumento. Lleva la cuenta de la posición neta (contratos
+    ejecutados, actualizada mediante los "fills" que informa el WebSocket de órdenes), de la cantidad todavía pendiente
+    de ejecución ("in-flight") y del momento de la última señal enviada para cada instrumento y sentido. Con ello, filtra
+    las señales redundantes antes de que lleguen a "`Interface.execute`":
+    - "Máxima posición": Se descarta toda señal que lleve la posición neta proyectada ("posición + pendiente + señal")
+        por encima de "`max_position`" en valor absoluto. Las señales que reducen la posición siempre se permiten.
+    - "Cooldown": Se descarta toda señal de mismo instrumento y sentido que la anterior, si desde esta última no pasaron
+        al menos "`cooldown`" segundos.
+
+    Inputs:
+    * "`max_position`" ("`float`"): Máxima posición neta absoluta por instrumento, en contratos. "`None`" = sin límite.
+    * "`cooldown`" ("`float`"): Segundos mínimos entre señales de un mismo instrumento y sentido. "`0`" = sin cooldown.
+    * "`limits`" ("`dict[str, dict]`"): Valores particulares de "`max_position`" y/o "`cooldown`" por instrumento.
+        Por ejemplo: "`{"GGAL/DIC23": {"max_position": 2}}`".
+    """
+    # Estados de órdenes (según el WebSocket de órdenes) que implican que no habrá mas "fills".
+    STATUS_CLOSED = {"FILLED", "CANCELLED", "REJECTED", "EXPIRED"}
+    # Columnas de la tabla de posiciones (ver "`Ledger.table`").
+    COLUMNS = ["position", "pending", "price_avg", "exposure", "pnl_real", "n_fills"]
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def __init__(self, max_position: float = None, cooldown: float = 0.0, limits: dict = dict()):
+
+        self.max_position = max_position
+        self.cooldown = cooldown
+        # Solo se conservan los valores particulares efectivamente provistos.
+        if not isinstance(limits, dict): limits = dict()
+        self.limits = {symbol: limit for symbol, limit in limits.items() if isinstance(limit, dict)}
+        # Multiplicador de contrato por instrumento, para calcular la exposición.
+        # Es provisto por "Manager.load_strategies" junto con "specs_derivs".
+        self.contracts = dict()
+        # - "positions": posición neta firmada (+ long, - short) por instrumento.
+        # - "pending": cantidad firmada enviada pero todavía no ejecutada.
+        # - "prices": precio promedio de entrada de la posición neta.
+        # - "pnl_real": ganancia/pérdida realizada al reducir posiciones.
+        # - "n_fills": cantidad de ejecuciones recibidas.
+        self.positions, self.pending, self.prices = dict(), dict(), dict()
+        self.pnl_real, self.n_fills = dict(), dict()
+        # Órdenes abiertas: "{id_order: [symbol, sentido (+1/-1), cantidad restante, cantidad original]}".
+        self.orders = dict()
+        # Momento (monotónico) de la última señal, por "(symbol, side)".
+        self.last_signal = dict()
+        # Cantidad de señales descartadas por cada filtro.
+        self.dropped = {"max_position": 0, "cooldown": 0}
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def get_limit(self, symbol: str, name: str):
+        """
+        Devuelve el valor del filtro "`name`" ("`max_position`" o "`cooldown`") para el instrumento "`symbol`".
+        Si no tiene un valor particular en "`limits`", se usa el general de la instancia.
+        """
+        limit = self.limits.get(symbol)
+        if limit and (name in limit): return limit[name]
+        return getattr(self, name)
+
+    def exposure(self, symbol: str):
+        """
+        Exposición neta proyectada del instrumento, en contratos: posición ejecutada mas cantidad pendiente.
+        """
+        return self.positions.get(symbol, 0.0) + self.pending.get(symbol, 0.0)
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def allow(self, signal, now: float = None):
+        """
+        Decide si la señal debe enviarse o descartarse según los filtros de "máxima posición" y "cooldown". Solo se
+        filtran nuevas órdenes; las modificaciones y cancelaciones siempre se permiten.
+
+        Inputs:
+        * "`signal`" ("`Signal`"): Señal a evaluar.
+        * "`now`" ("`float`"): Momento actual ("`time.monotonic`"). Por defecto, se mide en el momento.\n
+        Outputs:
+        * "`allowed`" ("`bool`"): "`True`" si la señal puede enviarse.
+        """
+        if (signal.action.name != "ORDER"): return True
+        if now is None: now = monotonic()
+        symbol = signal.symbol
+
+        # Filtro de "cooldown": señales repetidas en un mismo sentido.
+        cooldown = self.get_limit(symbol, "cooldown")
+        if cooldown:
+            last = self.last_signal.get((symbol, signal.side))
+            if (last is not None) and (now - last < cooldown):
+                self.dropped["cooldown"] += 1; return False
+
+        # Filtro de "máxima posición": solo afecta si la señal aumenta la exposición.
+        max_position = self.get_limit(symbol, "max_position")
+        if max_position is not None:
+            current = self.exposure(symbol)
+            projected = current + self.signed(signal)
+            if (abs(projected) > max_position) and (abs(projected) > abs(current)):
+                self.dropped["max_position"] += 1; return False
+
+        return True
+
+    @staticmethod
+    def signed(signal):
+        """
+        Cantidad firmada de la señal: positiva si es compra, negativa si es venta.
+        """
+        return signal.size if (signal.side == OrderSide.BUY) else - signal.size
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def on_send(self, signal, id_order: str, status: str, now: float = None):
+        """
+        Registra una señal ya enviada por "`Interface.execute`". El "cooldown" corre desde este momento, haya sido
+        aceptada o no. Si la API aceptó la órden ("`status == "OK"`"), su cantidad pasa a estar "pendiente" hasta que
+        lleguen los "fills" correspondientes.
+
+        Inputs:
+        * "`signal`" ("`Signal`"): Señal enviada.
+        * "`id_order`" ("`str`"): ID de órden devuelto por la API.
+        * "`status`" ("`str`"): Status devuelto por la API.
+        * "`now`" ("`float`"): Momento actual ("`time.monotonic`"). Por defecto, se mide en el momento.
+        """
+        if (signal.action.name != "ORDER"): return
+        if now is None: now = monotonic()
+        symbol = signal.symbol
+        self.last_signal[(symbol, signal.side)] = now
+        if (status != "OK") or (id_order is None): return
+        signed = self.signed(signal)
+        self.pending[symbol] = self.pending.get(symbol, 0.0) + signed
+        self.orders[id_order] = [symbol, 1 if (signed > 0) else -1, abs(signed), abs(signed)]
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def on_fill(self, id_order: str, size: float, price: float):
+        """
+        Aplica una ejecución (total o parcial) de una órden abierta: actualiza la posición neta, el precio promedio
+        de entrada y la ganancia realizada, y descuenta la cantidad pendiente.
+
+        Inputs:
+        * "`id_order`" ("`str`"): ID de la órden ejecutada.
+        * "`size`" ("`float`"): Cantidad ejecutada en este "fill" (sin signo).
+        * "`price`" ("`float`"): Precio de ejecución del "fill".
+        """
+        order = self.orders.get(id_order)
+        if (order is None) or not size: return
+        symbol, sign, leaves = order[: 3]
+        size = min(size, leaves)
+        order[2] = leaves - size
+        self.pending[symbol] = self.pending.get(symbol, 0.0) - sign * size
+        self.n_fills[symbol] = self.n_fills.get(symbol, 0) + 1
+
+        position = self.positions.get(symbol, 0.0)
+        price_avg = self.prices.get(symbol, 0.0)
+        updated = position + sign * size
+        if (position * sign >= 0): # La ejecución aumenta la posición...
+            self.prices[symbol] = (abs(position) * price_avg + size * price) / abs(updated)
+        else: # La ejecución reduce (o invierte) la posición...
+            closed = min(abs(position), size)
+            pnl = closed * (price - price_avg) * (- sign) * self.contracts.get(symbol, 1.0)
+            self.pnl_real[symbol] = self.pnl_real.get(symbol, 0.0) + pnl
+            # Si se invirtió la posición, el remanente entra al precio del "fill".
+            if (updated * position < 0): self.prices[symbol] = price
+            elif (updated == 0): self.prices[symbol] = 0.0
+        self.positions[symbol] = updated
+        if (order[2] <= 0): self.on_close(id_order)
+
+    def on_close(self, id_order: str):
+        """
+        Cierra una órden abierta (ejecutada por completo, cancelada, rechazada o expirada). La cantidad que haya
+        quedado sin ejecutar deja de contar como "pendiente".
+        """
+        order = self.orders.pop(id_order, None)
+        if order is None: return
+        symbol, sign, leaves = order[: 3]
+        self.pending[symbol] = self.pending.get(symbol, 0.0) - sign * leaves
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def on_report(self, report: dict):
+        """
+        Procesa un "order report" del WebSocket de órdenes (campo "`orderReport`"; ver página 44 de
+        "https://apihub.primary.com.ar/assets/docs/Primary-API.pdf"). Aplica el "fill" si lo hubiera, y cierra la
+        órden si su status indica que no habrá mas ejecuciones.
+
+        Inputs:
+        * "`report`" ("`dict`"): Contenido de "`orderReport`".\n
+        Outputs:
+        * "`owned`" ("`bool`"): "`True`" si la órden pertenecía a este libro.
+        """
+        id_order = report.get("clOrdId")
+        if id_order not in self.orders: return False
+        status = report.get("status")
+        if status in ("FILLED", "PARTIALLY_FILLED"):
+            self.on_fill(id_order, report.get("lastQty") or 0, report.get("lastPx") or 0)
+        if status in self.STATUS_CLOSED: self.on_close(id_order)
+        return True
+
+    def reconcile(self, report: dict):
+        """
+        Concilia una órden abierta con su estado actual según la API (ej: "`pyRofex.get_order_status`"), luego de
+        un reinicio. A diferencia de "`on_report`", usa la cantidad acumulada ("`cumQty`") y el precio promedio
+        ("`avgPx`"), con lo cual solo se aplican los "fills" que todavía no habían sido registrados.
+
+        Inputs:
+        * "`report`" ("`dict`"): Estado de la órden, con el mismo formato que "`orderReport`".
+        """
+        id_order = report.get("clOrdId")
+        order = self.orders.get(id_order)
+        if order is None: return
+        filled = order[3] - order[2]
+        missing = (report.get("cumQty") or 0) - filled
+        if (missing > 0): self.on_fill(id_order, missing, report.get("avgPx") or 0)
+        if report.get("status") in self.STATUS_CLOSED: self.on_close(id_order)
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    @property
+    def state(self):
+        """
+        Estado del libro en formato JSON-serializable (para "`Snapshot`"). No incluye los momentos de las últimas
+        señales ("cooldown"), ya que son relativos al reloj monotónico del proceso.
+        """
+        return {"positions": self.positions, "pending": self.pending, "prices": self.prices,
+            "pnl_real": self.pnl_real, "n_fills": self.n_fills, "orders": self.orders}
+
+    def load_state(self, state: dict):
+        """
+        Restaura el estado del libro, a partir de "`Ledger.state`".
+        """
+        for name, value in state.items():
+            if name in self.state: setattr(self, name, dict(value))
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    @property
+    def table(self):
+        """
+        Tabla de posiciones y exposición con una fila por instrumento. La exposición se expresa en unidades monetarias:
+        "`posición * precio promedio * multiplicador de contrato`".
+        """
+        symbols = sorted({*self.positions, *self.pending})
+        table = DataFrame(index = symbols, columns = self.COLUMNS, dtype = float)
+        for symbol in symbols:
+            position, price = self.positions.get(symbol, 0.0), self.prices.get(symbol, 0.0)
+            table.loc[symbol] = [position, self.pending.get(symbol, 0.0), price,
+                position * price * self.contracts.get(symbol, 1.0),
+                self.pnl_real.get(symbol, 0.0), self.n_fills.get(symbol, 0)]
+        return table.rename_axis("symbol")
+
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+if (__name__ == "__main__"):
+
+    # Pruebas de los filtros ("allow") y de las posiciones, precios y ganancias ante "fills" (ver "test/").
+    import unittest
+    tests = unittest.defaultTestLoader.discover("test", pattern = "test_ledger.py", top_level_dir = "test")
+    unittest.TextTestRunner(verbosity = 2).run(tests)
@@ -1,10 +1,15 @@
 import os, sys, json
 sys.path.append("./")
 
-import pyRofex
+import pyRofex, threading
+from time import time
+from copy import deepcopy
+from typing import NamedTuple
+from numpy import nan
 from apscheduler.schedulers.background \
     import BackgroundScheduler as Scheduler
-from pandas import Series, DataFrame, to_datetime, read_csv
+from apscheduler.events import EVENT_JOB_SUBMITTED
+from pandas import Series, DataFrame, Timestamp, to_datetime, read_csv
 from pyRofex import MarketDataEntry as MarketInfo
 from configparser import ConfigParser
 from yahooquery import Ticker
@@ -12,11 +17,41 @@ from yahooquery import Ticker
 from utils.functions import *
 from utils.constants import *
 from models.strategy import Strategy
+from models.snapshot import Snapshot
+from models.profiler import Profiler, Sampler
+from models.metrics import Metrics
+from models.tracer import Tracer
+from models.store import TickStore
+from models.bars import BarBuilder
+from models.pretrade import PreTrade
+from models.clock import Clock
 
 #███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
 #███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
 #███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
 
+class Versioned(NamedTuple):
+    """
+    Versión inmutable de una tabla compartida entre threads (ej: "`Manager.specs_unders`"). Nunca se modifica: cada
+    actualización publica una nueva instancia, reemplazando la referencia de manera atómica. Quien la lee toma la
+    referencia una sola vez, y obtiene una vista consistente sin "locks" aunque se publique otra en simultáneo.
+    * "`version`" ("`int`"): Número de versión, creciente desde 1.
+    * "`ts`" ("`float`"): Momento de publicación ("epoch", en segundos).
+    * "`data`" ("`DataFrame`"): Tabla. No debe modificarse "in place".
+    """
+    version: int
+    ts: float
+    data: DataFrame
+
+    @property
+    def age(self) -> float:
+        """
+        Antigüedad de la versión, en segundos.
+        """
+        return time() - self.ts
+
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
 class Manager:
     """
     Esta clase se encarga de gestionar las estrategias en el aspecto interno. Es decir: no interactua con los WebSockets. Al
@@ -31,11 +66,24 @@ class Manager:
     * "`account`" ("`str`"): Cuenta de usuario de ReMarkets.
     * "`password`" ("`str`"): Clave de la cuenta de usuario de ReMarkets.
     * "`environment`" ("`pyRofex.Environment`"): Portal de acceso a Rofex: simulación ("`REMARKET`") o real ("`LIVE`")
+    * "`retention`" ("`dict`"): Retención de ticks por defecto ("`{"ticks": ..., "seconds": ...}`", ver
+        "`TickStore.policy`"). Lo no provisto toma los valores de "`RETENTION_DEFAULT`".
+    * "`retention_symbols`" ("`dict`"): Retención de ticks por instrumento ("`{symbol: {"ticks": ..., ...}}`").
+    * "`memory_budget`" ("`int`"): Presupuesto de memoria del historial de ticks, en bytes.
+    * "`pretrade`" ("`bool`"): Validar y corregir las nuevas órdenes contra "`specs_derivs`" antes de enviarlas (ver
+        "`PreTrade`"). Por defecto, "`True`".
+    * "`clock`" ("`Clock`"): Reloj de los ciclos de procesamiento, compartido con las estrategias (ver "`Clock`").
+        Por defecto, el del sistema. En simulaciones, un reloj virtual ("`VirtualClock`").
     """
     # Directorios para archivos importantes...
     PATH_FILE_SPECS = PATH_FOLDER_DOCS + "specs.csv"
     PATH_FILE_CREDS = PATH_FOLDER_AUTH + "credentials.ini"
-    SYMBOL_TICKS_GLOBAL_MAX = 100000 # Maxima cantidad de datos de mercado acumulados.
+    # Retención de ticks por defecto para cada instrumento, y presupuesto de memoria del historial (ver "TickStore").
+    RETENTION_DEFAULT = dict(ticks = 10000, seconds = None)
+    MEMORY_BUDGET = 64 * 2 ** 20
+    BARS_SIZE = 1000 # Barras cerradas a retener por instrumento e intervalo (ver "BarBuilder").
+    SNAPSHOT_TICKS = 1000 # Cantidad de ticks por instrumento a guardar en cada foto ("Snapshot").
+    SNAPSHOT_SIGNALS = 10000 # Cantidad de señales por estrategia a guardar en cada foto ("Snapshot").
     # Regex para renombrar las columnas de los DataFrames, de "camelCase" a "snake_case".
     REGEX_CAMEL_TO_SNAKE = dict(pat = "(.)([A-Z][a-z]?)", repl = r"\1_\2", regex = True)
     
@@ -44,15 +92,26 @@ class Manager:
         MarketInfo.BIDS, MarketInfo.OFFERS, MarketInfo.LAST, MarketInfo.INDEX_VALUE,
         MarketInfo.TRADE_VOLUME, MarketInfo.NOMINAL_VOLUME, MarketInfo.OPEN_INTEREST]
     
+    # Datos de mercado a solicitar en el feed de los subyacentes "spot": solo el BBO.
+    SPOT_DATA_ENUMS = [MarketInfo.BIDS, MarketInfo.OFFERS]
+    # Segmento de los instrumentos "spot" en ReMarkets, y plazos de liquidación en orden de preferencia.
+    # (ej: "MERV - XMEV - GGAL - 48hs" es preferible a "MERV - XMEV - GGAL - CI").
+    SPOT_SEGMENT, SPOT_SETTLEMENTS = "MERV", ["48hs", "24hs", "CI"]
+    # Máximo de instrumentos por mensaje de suscripción al feed (ver "_subscribe_feeds").
+    SUBSCRIBE_BATCH = 50
+    
     # Columnas normalmente adquiridas, en los datos de mercado.
     MARKET_DATA_COLUMNS = ["market", "symbol", "price_last", "size_last", "dms_last", "dms_event",
         "price_ask_l1", "size_ask_l1", "price_ask_l2", "size_ask_l2", "price_ask_l3", "size_ask_l3",
         "price_ask_l4", "size_ask_l4", "price_ask_l5", "size_ask_l5", "price_bid_l1", "size_bid_l1",
         "price_bid_l2", "size_bid_l2", "price_bid_l3", "size_bid_l3", "price_bid_l4", "size_bid_l4",
         "price_bid_l5", "size_bid_l5", "iv", "tv", "oi", "nv"]
-    
-    # Modelo de tabla para los datos de mercado acumulados.
-    TEMPLATE_MARKET_DATA = DataFrame(columns = MARKET_DATA_COLUMNS).rename_axis("ts_local")
+    # Dato de mercado del feed del cual proviene cada columna (ver "get_data_enums"). Las columnas 6 a 15 son
+    # los precios y volúmenes "ask" (niveles 1 a 5) y las 16 a 25, los "bid". El resto no requiere ninguno.
+    MARKET_DATA_SOURCES = {"price_last": MarketInfo.LAST, "size_last": MarketInfo.LAST,
+        "dms_last": MarketInfo.LAST, **dict.fromkeys(MARKET_DATA_COLUMNS[6 : 16], MarketInfo.OFFERS),
+        **dict.fromkeys(MARKET_DATA_COLUMNS[16 : 26], MarketInfo.BIDS), "iv": MarketInfo.INDEX_VALUE,
+        "tv": MarketInfo.TRADE_VOLUME, "oi": MarketInfo.OPEN_INTEREST, "nv": MarketInfo.NOMINAL_VOLUME}
 
     # Columnas y renombrados, para los datos de mercado de los subyacentes.
     COLUMNS_SPECS_UNDERS = dict(marketCap = "shares", preMarketPrice = "pm_price",
@@ -79,6 +138,32 @@ class Manager:
         # Modo "debug" printea los WebSockets con mayor detalle...
         # (ej: los datos de los feeds, y las órdenes una por una)
         self.debug = kwargs.pop("debug", False)
+        # Frecuencia de actualización de datos de mercado para los subyacentes.
+        freq_update_unders = kwargs.pop("freq_update_unders", 60)
+        # Frecuencia y antigüedad máxima de las fotos del estado en disco (ver "Snapshot").
+        freq_snapshot = kwargs.pop("freq_snapshot", 30)
+        self.snapshot = Snapshot(max_age = kwargs.pop("max_age_snapshot", 3600))
+        # Tiempos por etapa del procesamiento de ticks (ver "Profiler"), y perfilador por muestreo.
+        self.profiler, self.sampler = Profiler(kwargs.pop("profile", False)), None
+        # Trazas por tick, para una proporción "trace_rate" de los ticks (ver "Tracer").
+        self.tracer = Tracer(kwargs.pop("trace_rate", 0.0))
+        # Métricas en formato Prometheus (ver "Metrics"): servidas por HTTP local y/o escritas en un archivo.
+        metrics_port, metrics_path = kwargs.pop("metrics_port", None), kwargs.pop("metrics_path", None)
+        freq_metrics = kwargs.pop("freq_metrics", 15)
+        self.metrics = Metrics(self._collect_metrics)
+        # Momento ("epoch") de la última actualización de cada subyacente, y demora de cada tarea.
+        self.unders_updated, self.tasks_lag = dict(), dict()
+        # Solo para quienes publican nuevas versiones de "specs_unders". Quienes la leen no lo usan.
+        self._unders_lock = threading.Lock()
+        # Antigüedad máxima (en segundos) del BBO "spot" de un subyacente para ser usado por las estrategias.
+        self.max_age_spot = kwargs.pop("max_age_spot", 60)
+        # Retención de ticks por defecto y por instrumento, y presupuesto de memoria del historial (ver "TickStore").
+        retention = {**self.RETENTION_DEFAULT, **kwargs.pop("retention", dict())}
+        self.retention_symbols: dict = kwargs.pop("retention_symbols", dict())
+        self.memory_budget = kwargs.pop("memory_budget", self.MEMORY_BUDGET)
+        is_pretrade = kwargs.pop("pretrade", True)
+        # Reloj de los ciclos de procesamiento: una lectura de la hora por ronda de estrategias (ver "Clock").
+        self.clock: Clock = kwargs.pop("clock", None) or Clock()
 
         if not kwargs:
             # Si no se proveen credenciales en la función, se toman
@@ -103,9 +188,11 @@ class Manager:
         # Crear dicts de almacenamiento de estrategias y datos.
         # - "strategies": tendrá todas las estrategias instanciadas.
         # - "symbol_feeds": tendrá la lista de instrumentos siendo actualizados en el feed.
-        # - "symbol_ticks": tendrá el historial de ticks de cada instrumento en el feed.
-        self.strategies, self.symbol_feeds = dict(), dict()
-        self.symbol_ticks = self.TEMPLATE_MARKET_DATA.copy()
+        # - "order_strats": tendrá el nombre de la estrategia que envió cada órden ("{id_order: name}").
+        # - "feed_entries": tendrá los datos y profundidad suscriptos de cada instrumento ("{symbol: (entries, depth)}").
+        # - "feed_requests": tendrá los datos y profundidad pedidos por cada estrategia ("{symbol: {name: (...)}}").
+        self.strategies, self.symbol_feeds, self.order_strats = dict(), dict(), dict()
+        self.feed_entries, self.feed_requests = dict(), dict()
 
         # Si existe un archivo "docs/specs.csv" con especificaciones y,
         # parámetros financieros, usar este en lugar de re-descargarlo.
@@ -114,14 +201,36 @@ class Manager:
             self.specs_derivs: DataFrame = self.specs_derivs.set_index("symbol")
         # En caso que no exista, re-descargar "specs" y almacenarlo como "csv".
         else: self.specs_derivs: DataFrame = self.get_specs_derivs(self.environment)
+        # "store" tendrá el historial de ticks de cada instrumento en el feed, con precios y volúmenes
+        # enteros en las unidades de cada instrumento según "specs_derivs" (ver "TickStore").
+        self.store = TickStore(self.specs_derivs, self.memory_budget, retention)
+        for symbol, policy in self.retention_symbols.items(): self.store.set_retention(symbol, **policy)
+        # "bars" tendrá las barras OHLCV de los derivados cuyas estrategias las usan (ver "Strategy.BARS").
+        self.bars = BarBuilder(self.BARS_SIZE)
+        # "pretrade" validará las nuevas órdenes contra "specs_derivs" antes de su envío (ver "PreTrade").
+        self.pretrade = PreTrade(self.specs_derivs) if is_pretrade else None
+        # Instrumentos "spot" de cada subyacente en ReMarkets, cuyo BBO reemplaza al precio de Yahoo.
+        # - "spot_symbols": instrumento "spot" de cada subyacente ("{underlying: symbol}").
+        # - "spot_unders": operación inversa ("{symbol: underlying}").
+        # - "spot_quotes": último BBO de cada subyacente ("{underlying: [bid, ask, epoch]}").
+        # - "under_derivs": derivados de cada subyacente ("{underlying: {symbols}}").
+        self.spot_symbols = self.get_spot_symbols(self.specs_derivs)
+        self.spot_unders = dict(zip(self.spot_symbols.values, self.spot_symbols.index))
+        self.spot_quotes, is_spot = dict(), self.specs_derivs.index.isin(self.spot_symbols.values)
+        derivs = self.specs_derivs.loc[~ is_spot, "underlying"]
+        self.under_derivs = {under: {*symbols} for under, symbols in derivs.groupby(derivs).groups.items()}
         
-        # Obtener todos los subyacentes registrados.
-        unders = self.specs_derivs["underlying"].unique()
-        Log.info(f"Getting data for {len(unders)} underlyings.")
-        # Frecuencia de actualización de datos de mercado para los subyacentes.
-        freq_update_unders = kwargs.pop("freq_update_unders", 60)
-        # Descargar un primer conjunto de datos recientes, para crear el modelo de tabla.
-        self.specs_unders = self.get_specs_unders(unders)
+        # Si hay una foto reciente del estado en disco, restaurar ticks y subyacentes
+        # desde ella, en lugar de esperar al feed y de re-descargar los subyacentes.
+        # Luego, "update_unders" los concilia con Yahoo apenas inicia el "Scheduler".
+        is_restored = self._restore_snapshot()
+        if not is_restored:
+            # Obtener todos los subyacentes registrados.
+            unders = self.specs_derivs["underlying"].unique()
+            Log.info(f"Getting data for {len(unders)} underlyings.")
+            # Descargar un primer conjunto de datos recientes, para crear el modelo de tabla.
+            self.specs_unders = self.get_specs_unders(unders)
+            self.unders_updated.update(dict.fromkeys(self.specs_unders.index, time()))
         verbose = {"n_deriv": self.specs_derivs.shape[0], "n_under": self.specs_unders.shape[0]}
         Log.success("Got specs for {n_deriv} symbols and {n_under} underlyings.", **verbose)
         Log.warning(f"Underlying data set to update every {freq_update_unders} seconds.")
@@ -132,7 +241,16 @@ class Manager:
         # no queda otra alternativa mas que solicitarlos cada cierto tiempo desde Yahoo.
         self.tasks = Scheduler(); self.tasks.add_job(
             name = "update_unders", func = self._update_unders,
-            trigger = "interval", seconds = freq_update_unders)
+            trigger = "interval", seconds = freq_update_unders,
+            next_run_time = Timestamp.now() if is_restored else None)
+        # Agregar la tarea "save_snapshot", que guarda periódicamente el estado en disco.
+        self.tasks.add_job(name = "save_snapshot", func = self.save_snapshot,
+            trigger = "interval", seconds = freq_snapshot)
+        # Exponer métricas, y medir la demora de cada tarea respecto de su horario programado.
+        if metrics_port: self.metrics.serve(metrics_port)
+        if metrics_path: self.tasks.add_job(name = "write_metrics", func = self.metrics.write,
+            args = (metrics_path,), trigger = "interval", seconds = freq_metrics)
+        self.tasks.add_listener(self._on_task_submitted, EVENT_JOB_SUBMITTED)
         
         # Printear listado de tareas paralelas para chequeo.
         df_tasks = parse_tasks(self.tasks.get_jobs())
@@ -140,6 +258,56 @@ class Manager:
         # Iniciar tareas paralelas.
         self.tasks.start()
 
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    @property
+    def specs_unders(self) -> DataFrame:
+        """
+        Datos de los subyacentes de la versión vigente ("`unders`", ver "`Versioned`"). Asignarla publica una nueva
+        versión: la tabla asignada no debe modificarse luego.
+        """
+        return self.unders.data
+
+    @specs_unders.setter
+    def specs_unders(self, data: DataFrame):
+        current = getattr(self, "unders", None)
+        version = current.version + 1 if current else 1
+        self.unders = Versioned(version, time(), data)
+
+    @property
+    def symbol_ticks(self) -> DataFrame:
+        """
+        Historial de ticks de todos los instrumentos, decodificado a "`float`" (ver "`TickStore.frame`"). Es una copia:
+        para análisis o para grabar ticks (ej: "`Sweep`"). Las estrategias reciben solo los de sus derivados.
+        """
+        return self.store.frame()
+
+    def history(self, path: str = None) -> TickStore:
+        """
+        Historial de ticks de la foto en disco ("`path`", por defecto la de "`snapshot`"), sin importar su antigüedad,
+        como "`TickStore`" de solo lectura mapeado en memoria (ver "`TickStore.from_array`"). Admite las mismas
+        consultas por rango temporal y "as-of" que "`store`".
+        """
+        snapshot = Snapshot(path or self.snapshot.path, max_age = float("inf"))
+        array = snapshot.array("symbol_ticks") if snapshot.load() else None
+        return TickStore(self.specs_derivs) if (array is None) else TickStore.from_array(array, self.specs_derivs)
+
+    @property
+    def memory_usage(self) -> DataFrame:
+        """
+        Uso de memoria del historial de ticks por instrumento, con su política de retención (ver "`TickStore.usage`").
+        El total de "`bytes_used`" se mantiene por debajo de "`memory_budget`".
+        """
+        return self.store.usage
+
+    @property
+    def latency(self) -> DataFrame:
+        """
+        Presupuesto de latencia de cada estrategia (ver "`Budget`"): modo actual, ejecuciones y excesos, duración
+        media y máxima, ejecuciones omitidas y señales obsoletas.
+        """
+        rows = {name: strat.budget.row for name, strat in [*self.strategies.items()]}
+        return DataFrame.from_dict(rows, orient = "index").rename_axis("strategy")
+
     #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
     @classmethod
     def get_specs_derivs(cls, environment: pyRofex.Environment):
@@ -203,6 +371,107 @@ class Manager:
         Log.success("Saved {n_specs} symbol specs (\"{path}\")", **verbose)
         return specs
     
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    @classmethod
+    def get_spot_symbols(cls, specs: DataFrame):
+        """
+        Halla el instrumento "spot" de ReMarkets para cada subyacente: acciones (CFI "`ES...`") del segmento
+        "`SPOT_SEGMENT`", cuyo nombre termina en alguno de los plazos de "`SPOT_SETTLEMENTS`" (ej: "`MERV - XMEV -
+        GGAL - 48hs`"). Si hay varios plazos para un mismo subyacente, se elige el primero de dicha lista.
+
+        Inputs:
+        - "`specs`" ("`DataFrame`"): Especificaciones de los instrumentos (ver "`get_specs_derivs`").\n
+        Outputs:
+        - "`spots`" ("`Series`"): Instrumento "spot" ("`symbol`"), indexado por subyacente ("`underlying`").
+        """
+        is_spot = specs["segment"].eq(cls.SPOT_SEGMENT) & specs["cfi"].str.startswith("ES")
+        spots = specs.loc[is_spot, ["underlying"]].copy()
+        spots["settlement"] = spots.index.str.split(" - ").str[-1]
+        spots["rank"] = spots["settlement"].map({name: n for n, name in enumerate(cls.SPOT_SETTLEMENTS)})
+        spots = spots.dropna(subset = "rank").sort_values("rank")
+        spots = spots.reset_index().drop_duplicates("underlying").set_index("underlying")
+        return spots["symbol"].sort_index()
+
+    @classmethod
+    def get_universe(cls, specs: DataFrame, cfi = "F", segments: list = None,
+                     maturity: tuple = (0, None), unders: list = None, ts = None) -> list:
+        """
+        Selecciona un universo de derivados de "`specs`" para operar en bloque (ej: toda la curva de futuros), según
+        su código CFI, su segmento, los días restantes hasta su vencimiento y la disponibilidad de precios de su
+        subyacente. Los instrumentos "spot" (ver "`get_spot_symbols`") no se incluyen: son subyacentes.
+
+        Inputs:
+        - "`specs`" ("`DataFrame`"): Especificaciones de los instrumentos (ver "`get_specs_derivs`").
+        - "`cfi`" ("`str`" o "`list[str]`"): Prefijos de código CFI admitidos (ej: "`"F"`" para futuros, "`"OC"`"
+            para opciones "call"). "`None`" = todos.
+        - "`segments`" ("`list[str]`"): Segmentos admitidos (ej: "`["DDF", "DDA"]`"). "`None`" = todos.
+        - "`maturity`" ("`tuple`"): Mínimo y máximo de días restantes hasta el vencimiento ("`None`" = sin límite).
+            Con algún límite, se excluyen los instrumentos sin vencimiento. "`None`" = no filtrar por vencimiento.
+        - "`unders`" ("`list[str]`"): Subyacentes con precios disponibles. "`None`" = no filtrar por subyacente.
+        - "`ts`" ("`Timestamp`"): Momento de referencia para los días restantes. Por defecto, ahora.\n
+        Outputs:
+        - "`symbols`" ("`list[str]`"): Derivados seleccionados, ordenados por subyacente y vencimiento.
+        """
+        is_valid = ~ specs.index.isin(cls.get_spot_symbols(specs).values)
+        if cfi is not None:
+            cfi = (cfi,) if isinstance(cfi, str) else (*cfi,)
+            is_valid &= specs["cfi"].fillna("").str.startswith(cfi).values
+        if segments is not None: is_valid &= specs["segment"].isin([*segments]).values
+        if unders is not None: is_valid &= specs["underlying"].isin([*unders]).values
+        low, high = maturity or (None, None)
+        if (low is not None) or (high is not None):
+            ts = Timestamp.utcnow() if (ts is None) else Timestamp(ts)
+            if ts.tzinfo is None: ts = ts.tz_localize("UTC")
+            # Días restantes: "NaN" (sin vencimiento) no cumple ningún límite.
+            days = (to_datetime(specs["maturity"], utc = True) - ts).dt.total_seconds().values / 86400
+            if low is not None: is_valid &= (days >= low)
+            if high is not None: is_valid &= (days <= high)
+        selected = specs.loc[is_valid, ["underlying", "maturity"]]
+        return selected.sort_values(["underlying", "maturity"]).index.to_list()
+
+    def select_universe(self, cfi = "F", segments: list = None, maturity: tuple = (0, None),
+                        underlying: bool = True) -> list:
+        """
+        Universo de derivados de "`specs_derivs`" según "`get_universe`", para cargarlos en una estrategia (ej:
+        "`Alma(symbols = dict.fromkeys(symbols))`"). Sus suscripciones se envían en tandas ("`SUBSCRIBE_BATCH`")
+        y la etapa "strategies" agrupa los ticks de todos ellos en una sola ronda (ver "`Interface`").
+
+        Inputs:
+        - "`cfi`", "`segments`", "`maturity`": Ver "`get_universe`".
+        - "`underlying`" ("`bool`"): Solo derivados cuyo subyacente tiene precio: en Yahoo ("`specs_unders`") o
+            por su instrumento "spot" de ReMarkets ("`spot_symbols`").\n
+        Outputs:
+        - "`symbols`" ("`list[str]`"): Derivados seleccionados.
+        """
+        unders = None
+        if underlying:
+            prices = self.specs_unders.get("last_price", Series(dtype = float)).dropna()
+            unders = {*prices.index, *self.spot_symbols.index}
+        symbols = self.get_universe(self.specs_derivs, cfi, segments, maturity, unders, self.clock.now_ns())
+        verbose = {"n_symbols": len(symbols), "cfi": cfi, "segments": segments, "maturity": maturity}
+        Log.info("Universe of {n_symbols} symbols (cfi: {cfi}; segments: {segments}; days: {maturity})", **verbose)
+        return symbols
+
+    def get_data_unders(self, unders: list):
+        """
+        Datos de los subyacentes "`unders`" para las estrategias: las filas de "`specs_unders`" (Yahoo), mas las
+        columnas "`under_bid`" y "`under_ask`" con el BBO "spot" de ReMarkets. Éstas quedan vacías ("`NaN`") para
+        los subyacentes sin BBO, o cuyo BBO tiene mas de "`max_age_spot`" segundos: la estrategia debería usar el
+        precio de Yahoo ("`last_price`") en su lugar. Los subyacentes sin datos de Yahoo tienen una fila vacía
+        ("`NaN`"), salvo su BBO "spot": la falta de uno no impide operar los demás. "`data.attrs`" lleva la versión de
+        "`specs_unders`" de la cual provienen los datos, y su momento de publicación ("`version`" y "`ts`", ver
+        "`Versioned`").
+        """
+        specs_unders = self.unders # Una sola lectura: vista consistente.
+        data = specs_unders.data.reindex(unders)
+        data.attrs.update(version = specs_unders.version, ts = specs_unders.ts)
+        ts, quotes = time(), self.spot_quotes
+        fresh = [quotes.get(under) for under in data.index]
+        fresh = [quote if quote and (ts - quote[2] < self.max_age_spot) else (nan, nan, nan) for quote in fresh]
+        data["under_bid"] = [quote[0] for quote in fresh]
+        data["under_ask"] = [quote[1] for quote in fresh]
+        return data
+
     #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
     @classmethod
     def get_specs_unders(cls, unders: list):
@@ -236,7 +505,7 @@ class Manager:
         Esta funcion se encarga de llamar a la anterior "`get_specs_unders`" de manera regular, solicitando los datos
         de subyacentes para únicamente los instrumentos que se ven activos en las estrategias y en los WebSockets (es
         decir, incluidos en "`symbol_feeds`").
-        Actualiza los valores previamente guardados en "`specs_unders`" con los nuevos descargados. Nota: es una función
+        Publica una nueva versión de "`specs_unders`" con los nuevos datos descargados (ver "`Versioned`"). Nota: es una función
         "privada"; debería ser ejecutada únicamente de manera interna, por el "`Scheduler`". No debería usarse de manera
         aislada.
         """
@@ -253,19 +522,295 @@ class Manager:
         # sin problema durante un tiempo acotado...)
         except Exception as EXC: Log.exception(EXC); return
 
-        # Actualizar "specs_unders" con los datos mas recientes.
-        self.specs_unders.loc[unders.index] = unders
+        # Publicar una nueva versión de "specs_unders" con los datos mas recientes (copia, sin modificar
+        # la vigente, que puede estar siendo leída por el thread del WebSocket en este mismo momento).
+        with self._unders_lock:
+            specs_unders = self.specs_unders.copy()
+            specs_unders.loc[unders.index] = unders
+            self.specs_unders = specs_unders
+        self.unders_updated.update(dict.fromkeys(unders.index, time()))
         # Printear los nombres de subyacentes actualizados.
         updated = ", ".join("\"" + unders.index + "\"")
         if self.debug: Log.debug(f"Updated underlying data for: {updated}.")
         
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def _on_task_submitted(self, event):
+        """
+        Función del "`Scheduler`" al lanzar cada tarea: registra su demora ("lag") respecto del horario programado.
+        """
+        job = self.tasks.get_job(event.job_id)
+        name = job.name if job else event.job_id
+        lag = Timestamp.now(tz = "UTC") - Timestamp(event.scheduled_run_times[-1])
+        self.tasks_lag[name] = lag.total_seconds()
+
+    def _collect_metrics(self):
+        """
+        Métricas del tipo "gauge" leídas al momento de exponerlas (ver "`Metrics`"): tamaño del historial de ticks,
+        antigüedad de los precios de cada subyacente, y demora de las tareas del "`Scheduler`".
+        """
+        ts, label = time(), "{0}=\"{1}\"".format
+        stages = getattr(self, "stages", dict()) # Solo en "Interface".
+        transport = getattr(self, "transport", None) # Solo en "Interface".
+        connections = transport.table if transport else DataFrame(columns = ["mean_ms", "errors"])
+        pretrade = getattr(self, "pretrade", None)
+        budgets = {name: strat.budget for name, strat in [*self.strategies.items()]}
+        rejected, fixed = (pretrade.rejected, pretrade.fixed) if pretrade else (dict(), dict())
+        return {
+            "symbol_ticks_rows": ("Ticks retained in the tick store.", {"": self.store.n_rows}),
+            "symbol_ticks_bytes": ("Memory allocated by the tick store.", {"": self.store.nbytes}),
+            "symbol_ticks_budget_bytes": ("Memory budget of the tick store.", {"": self.memory_budget}),
+            "symbol_ticks_evicted_total": ("Ticks dropped by retention policies or the memory budget.",
+                {"": self.store.n_evicted}),
+            "underlying_age_seconds": ("Seconds since the last underlying price update.", {label("underlying",
+                under): ts - updated for under, updated in [*self.unders_updated.items()]}),
+            "scheduler_lag_seconds": ("Delay of the last run of each task versus its schedule.",
+                {label("task", name): lag for name, lag in [*self.tasks_lag.items()]}),
+            "spot_age_seconds": ("Seconds since the last spot BBO update of each underlying.",
+                {label("underlying", under): ts - quote[2] for under, quote in [*self.spot_quotes.items()]}),
+            "pipeline_queue_depth": ("Items waiting in each pipeline stage.",
+                {label("stage", name): stage.depth for name, stage in stages.items()}),
+            "pipeline_dropped_total": ("Items dropped or conflated by each pipeline stage.",
+                {label("stage", name): stage.n_dropped for name, stage in stages.items()}),
+            "order_connection_latency_seconds": ("Mean latency of the order requests of each pooled connection.",
+                {label("connection", n): ms / 1000 for n, ms in connections["mean_ms"].items()}),
+            "order_connection_errors_total": ("Failed order requests of each pooled connection.",
+                {label("connection", n): errors for n, errors in connections["errors"].items()}),
+            "strategy_budget_overruns_total": ("Strategy runs over their latency budget.",
+                {label("strategy", name): budget.n_overruns for name, budget in budgets.items()}),
+            "strategy_budget_mode": ("Strategy run mode: 0 = inline, 1 = throttled, 2 = background.",
+                {label("strategy", name): budget.MODES.index(budget.mode) for name, budget in budgets.items()}),
+            "strategy_skipped_total": ("Strategy runs skipped while throttled.",
+                {label("strategy", name): budget.n_skipped for name, budget in budgets.items()}),
+            "strategy_stale_signals_total": ("Signals not sent because they missed their strategy deadline.",
+                {label("strategy", name): budget.n_stale for name, budget in budgets.items()}),
+            "pretrade_rejected_total": ("Orders rejected before sending, by failed instrument spec.",
+                {label("reason", reason): n for reason, n in [*rejected.items()]}),
+            "pretrade_fixed_total": ("Orders rounded or clipped to the instrument specs before sending, by field.",
+                {label("field", field): n for field, n in [*fixed.items()]}),
+        }
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def save_snapshot(self):
+        """
+        Guarda una foto del estado en disco (ver "`Snapshot`"): los últimos "`SNAPSHOT_TICKS`" ticks de cada instrumento
+        (incluye el último book), los datos de subyacentes, y por cada estrategia, sus últimas "`SNAPSHOT_SIGNALS`"
+        señales y su libro de posiciones con las órdenes abiertas. Es ejecutada periódicamente por el "`Scheduler`", en
+        su propio thread: el estado de cada estrategia se copia bajo su "`lock`" (ver "`Strategy.lock`"), y recién
+        luego se escribe en disco.
+        """
+        try:
+            ticks = self.store.table(self.SNAPSHOT_TICKS) # Enteros, sin decodificar.
+            tables = {"specs_unders": self.specs_unders, "symbol_ticks": ticks}
+            state = {"strategies": dict()}
+            for n, (name, strat) in enumerate([*self.strategies.items()]):
+                strat: Strategy = strat
+                with strat.lock:
+                    tables[f"signals_{n}"] = strat.signals.tail(self.SNAPSHOT_SIGNALS).copy()
+                    state["strategies"][name] = {"signals": f"signals_{n}", "ledger": deepcopy(strat.ledger.state)}
+            self.snapshot.save(tables, state)
+            if self.debug: Log.debug(f"Saved snapshot to \"{self.snapshot.path}\"")
+        except Exception as EXC: Log.exception(EXC)
+
+    def _restore_snapshot(self):
+        """
+        Restaura los ticks ("`store`") y "`specs_unders`" desde la foto guardada en disco, si es lo suficientemente reciente.
+        El estado de cada estrategia se restaura luego, al cargarla (ver "`_restore_strategy`"). Los ticks del feed en
+        vivo simplemente se agregan a continuación de los restaurados.
+
+        Outputs:
+        - "`is_restored`" ("`bool`"): "`True`" si se pudo restaurar.
+        """
+        if not self.snapshot.load(): return False
+        ts_start = Timestamp.utcnow()
+        try:
+            specs_unders = self.snapshot.table("specs_unders")
+            symbol_ticks = self.snapshot.table("symbol_ticks")
+        except Exception as EXC: Log.exception(EXC); return False
+        if (specs_unders is None) or (symbol_ticks is None): return False
+        self.specs_unders = specs_unders
+        ts_snapshot = Timestamp(self.snapshot.meta["ts"]).timestamp()
+        self.unders_updated.update(dict.fromkeys(specs_unders.index, ts_snapshot))
+        self.store.load(symbol_ticks)
+        verbose = {"age": self.snapshot.age(self.snapshot.meta), "n_ticks": len(symbol_ticks),
+            "ms": (Timestamp.utcnow() - ts_start).total_seconds() * 1000}
+        Log.success("Restored snapshot ({age:.0f} s old, {n_ticks} ticks) in {ms:.1f} ms.", **verbose)
+        return True
+
+    def _restore_strategy(self, strat: Strategy):
+        """
+        Restaura las señales y el libro de posiciones de la estrategia desde la foto cargada (si la foto tiene una
+        estrategia con el mismo nombre). Luego concilia sus órdenes abiertas con su estado actual según la API.
+        """
+        states: dict = self.snapshot.meta.get("state", dict()).get("strategies", dict())
+        if strat.name not in states: return
+        state = states[strat.name]
+        signals = self.snapshot.table(state["signals"])
+        if signals is not None: strat.signals = signals.reindex(columns = strat.signals.columns)
+        strat.ledger.load_state(state["ledger"])
+        # Conciliar órdenes abiertas: pueden haberse ejecutado durante la caída.
+        for id_order in [*strat.ledger.orders]:
+            self.order_strats[id_order] = strat.name
+            try: strat.ledger.reconcile(pyRofex.get_order_status(id_order)["order"])
+            except Exception as EXC: Log.warning(f"Order \"{id_order}\" not reconciled: {repr(EXC)}")
+        verbose = {"name": strat.name, "n_signals": len(strat.signals), "n_orders": len(strat.ledger.orders)}
+        Log.success("Restored \"{name}\": {n_signals} signals, {n_orders} open orders.", **verbose)
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    @classmethod
+    def get_data_enums(cls, fields: list = None, bars: bool = False):
+        """
+        Datos de mercado a solicitar en el feed ("`MarketInfo`") y profundidad del libro, para obtener las columnas
+        "`fields`" (ver "`MARKET_DATA_SOURCES`" y "`Strategy.FIELDS`"). Sin "`fields`", todos ("`MARKET_DATA_ENUMS`").
+        Con "`bars`" (ver "`Strategy.BARS`"), se agregan los que usa "`BarBuilder`": última operación, volumen y BBO.
+
+        Outputs:
+        - "`entries`" ("`list[MarketInfo]`"): Datos de mercado, en el orden de "`MARKET_DATA_ENUMS`" (al menos el BBO).
+        - "`depth`" ("`int`"): Máximo nivel del libro entre las columnas "bid"/"ask" pedidas (al menos 1).
+        """
+        if fields is None: return cls.MARKET_DATA_ENUMS, 5
+        sources = {cls.MARKET_DATA_SOURCES.get(field) for field in fields}
+        if bars: sources.update([MarketInfo.LAST, MarketInfo.TRADE_VOLUME, *cls.SPOT_DATA_ENUMS])
+        entries = [entry for entry in cls.MARKET_DATA_ENUMS if entry in sources]
+        levels = [int(field[-1]) for field in fields if field.startswith(("price_a", "price_b", "size_a", "size_b"))]
+        return entries or cls.SPOT_DATA_ENUMS, max(levels, default = 1)
+
+    def _subscribe_feeds(self, name: str, symbols: list, entries: list = None, depth: int = 5):
+        """
+        Registra a la estrategia "`name`" como usuaria de los feeds de "`symbols`". "`symbol_feeds`" funciona como
+        un registro con conteo de referencias: cada instrumento tiene la lista de estrategias que lo operan. Se
+        suscriben en el WebSocket los instrumentos nuevos, y los ya suscriptos para los cuales "`entries`"/"`depth`"
+        agregan datos (con la unión de lo solicitado por todas sus estrategias, ver "`feed_entries`"): una llamada
+        por cada combinación de datos y profundidad, en tandas de hasta "`SUBSCRIBE_BATCH`" instrumentos.
+
+        Inputs:
+        - "`name`" ("`str`"): Nombre de la estrategia.
+        - "`symbols`" ("`list[str]`"): Derivados a suscribir.
+        - "`entries`" ("`list[MarketInfo]`"): Datos de mercado a solicitar. Por defecto, "`MARKET_DATA_ENUMS`".
+        - "`depth`" ("`int`"): Profundidad del libro a solicitar.
+        """
+        new_symbols, entries = dict(), entries or self.MARKET_DATA_ENUMS
+        for symbol in symbols:
+            # "symbol_feeds" es un dict de listas, adonde el "key" es el nombre del
+            # derivado bajo feed, y el "value" es una lista con los nombres de las
+            # estrategias que operan dicho instrumento.
+            # ej: {"GGAL/ENE24": ["Alma_1", "Alma_2", ...]}
+            feed: list = self.symbol_feeds.setdefault(symbol, list())
+            if name not in feed: feed.append(name)
+            requests = self.feed_requests.setdefault(symbol, dict())
+            requests[name] = self._merge_entries([requests.get(name, ((), 0)), (entries, depth)])
+            old_entries, old_depth = self.feed_entries.get(symbol, ((), 0))
+            new_entries = (*dict.fromkeys([*old_entries, *entries]),) # Unión, sin duplicados.
+            if (len(new_entries) == len(old_entries)) and (depth <= old_depth): continue
+            self.feed_entries[symbol] = (new_entries, max(depth, old_depth))
+            new_symbols.setdefault(self.feed_entries[symbol], list()).append(symbol)
+        
+        size = self.SUBSCRIBE_BATCH
+        for (new_entries, new_depth), tickers in new_symbols.items():
+            # En tandas de a "SUBSCRIBE_BATCH", para no enviar un único mensaje enorme con todo el universo.
+            for n in range(0, len(tickers), size):
+                batch = tickers[n : n + size]
+                pyRofex.market_data_subscription(tickers = batch, entries = [*new_entries], depth = new_depth)
+                verbose = {"symbols": ", ".join(batch), "depth": new_depth,
+                           "entries": ", ".join(entry.name for entry in new_entries)}
+                Log.success("Subscribed to: {symbols} ({entries}; depth {depth})", **verbose)
+
+    def _update_retention(self, symbols: list):
+        """
+        Asigna la retención de ticks de cada instrumento de "`symbols`": la que retenga mas (por dimensión) entre la
+        configurada para el instrumento ("`retention_symbols`") y la de las estrategias que lo operan ("`RETENTION`").
+        Las estrategias sin "`RETENTION`" cuentan con la retención por defecto del "`store`": compartir un instrumento
+        con otra estrategia nunca les reduce el historial. Sin ninguna configurada, la retención por defecto.
+        """
+        n_ticks, ns = self.store.keep_default
+        default = {"ticks": n_ticks, "seconds": None if (ns is None) else ns / 1e9}
+        for symbol in symbols:
+            names = [name for name in self.symbol_feeds.get(symbol, list()) if name in self.strategies]
+            policies = [self.strategies[name].RETENTION for name in names]
+            if not self.retention_symbols.get(symbol) and not any(policies):
+                self.store.set_retention(symbol); continue
+            policies = [self.retention_symbols.get(symbol), *[policy or default for policy in policies]]
+            policies = [policy for policy in policies if policy]
+            merged = dict()
+            for key in ("ticks", "seconds"):
+                values = [policy[key] for policy in policies if policy.get(key) is not None]
+                merged[key] = max(values) if values else None
+            self.store.set_retention(symbol, **merged)
+
+    def _update_bars(self, symbols: list):
+        """
+        Asigna los intervalos de las barras de cada derivado de "`symbols`" (ver "`BarBuilder`"): la unión de los
+        declarados por las estrategias que lo operan ("`Strategy.BARS`").
+        """
+        for symbol in symbols:
+            names = [name for name in self.symbol_feeds.get(symbol, list()) if name in self.strategies]
+            timeframes = {timeframe for name in names for timeframe in (self.strategies[name].BARS or dict())}
+            self.bars.subscribe(symbol, timeframes)
+
+    @staticmethod
+    def _merge_entries(requests) -> tuple:
+        """
+        Unión de pedidos de datos de mercado ("`[(entries, depth)]`"): todos los datos, sin duplicados y en orden de
+        aparición, y la mayor profundidad.
+        """
+        requests = [*requests]
+        entries = (*dict.fromkeys(entry for entries, _ in requests for entry in entries),)
+        return entries, max((depth for _, depth in requests), default = 0)
+
+    def _unsubscribe_feeds(self, name: str, symbols: list):
+        """
+        Quita a la estrategia "`name`" de los feeds de "`symbols`". Los instrumentos que conservan otras estrategias
+        quedan con la unión de lo pedido por ellas (ver "`feed_requests`"). Los que se quedan sin estrategias salen de
+        "`symbol_feeds`", con lo cual sus ticks se descartan apenas llegan (ver "`_on_update_market`"), y se
+        desuscriben del WebSocket si la versión de "`pyRofex`" lo permite: una llamada por cada combinación de datos
+        y profundidad, en tandas de hasta "`SUBSCRIBE_BATCH`" instrumentos (como "`_subscribe_feeds`"). Con
+        "`pyRofex==0.5.0`" no hay mensaje de desuscripción de market data: nada se desuscribe del WebSocket, y los
+        ticks de esos instrumentos solo se descartan localmente.
+
+        Inputs:
+        - "`name`" ("`str`"): Nombre de la estrategia.
+        - "`symbols`" ("`list[str]`"): Derivados a desuscribir.
+        """
+        old_symbols = dict()
+        for symbol in symbols:
+            feed: list = self.symbol_feeds.get(symbol, list())
+            if name in feed: feed.remove(name)
+            requests = self.feed_requests.get(symbol, dict())
+            requests.pop(name, None)
+            if feed:
+                # El WebSocket sigue enviando lo ya suscripto, pero las próximas suscripciones se comparan contra
+                # lo que efectivamente piden las estrategias restantes.
+                if requests: self.feed_entries[symbol] = self._merge_entries(requests.values())
+                continue
+            if symbol not in self.symbol_feeds: continue
+            self.symbol_feeds.pop(symbol); self.feed_requests.pop(symbol, None)
+            old = self.feed_entries.pop(symbol, ((*self.MARKET_DATA_ENUMS,), 5))
+            old_symbols.setdefault(old, list()).append(symbol)
+
+        if not old_symbols: return
+        unsubscribe, size = getattr(pyRofex, "market_data_unsubscription", None), self.SUBSCRIBE_BATCH
+        for (entries, depth), tickers in old_symbols.items():
+            for n in range(0, len(tickers), size):
+                batch = tickers[n : n + size]
+                if not unsubscribe:
+                    Log.warning("Dropping ticks locally (\"pyRofex\" cannot unsubscribe): " + ", ".join(batch))
+                    continue
+                unsubscribe(tickers = batch, entries = [*entries], depth = depth)
+                Log.warning("Unsubscribed from: " + ", ".join(batch))
+
+    def _get_spots(self, strat: Strategy):
+        """
+        Instrumentos "spot" (ver "`spot_symbols`") de los subyacentes de la estrategia "`strat`".
+        """
+        unders = strat.specs_derivs["underlying"].unique()
+        return self.spot_symbols.reindex(unders).dropna().to_list()
+
     #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
     def load_strategies(self, strats: list):
         """
         Por medio de esta funcion, uno carga las instancias de estrategias al "`Manager`". Estas estrategias deben
         ser instancias de alguna clase descendiente de "`Strategy`". Una vez cargada, se agrega a la lista interna
-        de "`strategies`", y se subscriben a los feeds correspondientes. En caso que alguna de las estrategias ya
-        exista en la lista, se ignora y se pasa a la próxima.
+        de "`strategies`", y se subscriben a los feeds correspondientes (ver "`_subscribe_feeds`"). En caso que
+        alguna de las estrategias ya exista en la lista, se ignora y se pasa a la próxima.
         Nota: la estrategia no entra en funcionamiento hasta que luego se utilice la función "`toggle_strategies`"
         para comenzar su actividad.
         
@@ -285,30 +830,31 @@ class Manager:
                 verbose = {"strategy": strat.__class__.__name__,
                         "name": strat.name, "symbols": symbols}
                 Log.info("Loading \"{strategy} - {name}\".", **verbose)
-                # Suscribir el WebSocket a los feeds de dichos derivados.
-                pyRofex.market_data_subscription(tickers = symbols,
-                        entries = self.MARKET_DATA_ENUMS, depth = 5)
-                Log.success("Subscribed to: " + ", ".join(symbols))
                 # Proveer a la estrategia, de las especificaciones de los derivados.
                 try: strat.specs_derivs = self.specs_derivs.loc[symbols]
                 except KeyError: # En caso que algún derivado haya sido escrito mal...
                     error = "At least one of the symbols from \"{strategy} - {name}\""
                     error += "doesn't exist:\n{symbols}... aborting strategy activation."
                     Log.warning(error, **verbose); continue
+                # Compartir el reloj de los ciclos, para que la estrategia lea la misma hora que el "Manager".
+                strat.clock = self.clock
+                # Proveer al libro de posiciones, de los multiplicadores de contrato.
+                strat.ledger.contracts = strat.specs_derivs["contract"].to_dict()
+                # Datos de mercado que la estrategia usa (ver "Strategy.FIELDS").
+                unknown = set(strat.FIELDS or list()).difference(self.MARKET_DATA_COLUMNS)
+                if unknown: Log.warning(f"Unknown fields for \"{strat.name}\" (ignored): {unknown}")
+                entries, depth = self.get_data_enums(strat.FIELDS, bool(strat.BARS))
 
                 # Agregar la estrategia a la lista del "Manager"
                 self.strategies[strat.name] = strat
-                # Agregar los nombres de los derivados a la lista de feeds
-                # aprobados por el WebSocket, que está dentro del "Manager".
-                for symbol in strat.specs_derivs.index:
-                    # "symbol_feeds" es un dict de listas, adonde el "key" es el nombre del
-                    # derivado bajo feed, y el "value" es una lista con los nombres de las
-                    # estrategias que operan dicho instrumento.
-                    # ej: {"GGAL/ENE24": ["Alma_1", "Alma_2", ...]}
-                    if (symbol not in self.symbol_feeds):
-                        self.symbol_feeds[symbol] = list()
-                    feed: list = self.symbol_feeds[symbol]
-                    feed.append(strat.name)
+                # Suscribir el WebSocket a los feeds de dichos derivados, y al
+                # BBO de los instrumentos "spot" de sus subyacentes.
+                self._subscribe_feeds(strat.name, symbols, entries, depth)
+                if strat.UNDERLYING: self._subscribe_feeds(strat.name, self._get_spots(strat), self.SPOT_DATA_ENUMS, 1)
+                # Retener los ticks y construir las barras que la estrategia necesita (ver "Strategy.RETENTION").
+                self._update_retention(symbols); self._update_bars(symbols)
+                # Restaurar su estado desde la foto en disco, si lo hubiera.
+                self._restore_strategy(strat)
 
             Log.info("Loaded \"{strategy} - {name}\"", **verbose)
         
@@ -352,13 +898,43 @@ class Manager:
                 verbose["strat"] = strat.__class__.__name__
                 Log.warning("{action} \"{strat} - {name}\"", **verbose)
 
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def profile_strategy(self, name: str, seconds: float = 10, interval: float = 0.001, path: str = None):
+        """
+        Activa un perfilador por muestreo ("`Sampler`") sobre la estrategia "`name`" durante "`seconds`" segundos.
+        Solo se muestrea mientras se ejecuta su "`on_tick`". Al terminar, guarda un archivo "folded" (compatible
+        con "`flamegraph.pl`" y "speedscope") y devuelve su ruta. Solo puede haber un muestreo a la vez.
+
+        Inputs:
+        - "`name`" ("`str`"): Nombre de la estrategia a perfilar.
+        - "`seconds`" ("`float`"): Duración del muestreo.
+        - "`interval`" ("`float`"): Período de muestreo, en segundos.
+        - "`path`" ("`str`"): Archivo de salida. Por defecto, dentro de "`logs/`".
+        """
+        if name not in self.strategies:
+            Log.warning("Strategy \"{name}\" invalid.", name = name); return None
+        if (self.sampler is not None) and self.sampler.is_alive():
+            Log.warning("Already profiling \"{name}\".", name = self.sampler.strat_name); return None
+        self.sampler = Sampler(name, seconds, interval, path)
+        self.sampler.start()
+        Log.warning("Profiling \"{name}\" for {seconds} seconds.", name = name, seconds = seconds)
+        return self.sampler.path
+
+    def export_trace(self, path: str = None, id_tick: int = None):
+        """
+        Exporta las trazas por tick en formato JSON de "Chrome trace" (ver "`Tracer.export`"). Con "`id_tick`" (ej:
+        de la columna homónima de "`Strategy.signals`"), solo las del tick que originó una señal en particular.
+        """
+        return self.tracer.export(path, id_tick)
+
     #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
     def remove_strategies(self, names: list):
         """
         Permite desactivar permanentemente y borrar las estrategias cuyos nombres estan dados en la lista
-        "`names`". Primero, se borra de la lista de feeds de cada derivado. Luego se extrae ("pop") de la
-        lista de "`strategies`" misma, y despues de desactivarla ("`active = False`"), se borra ("`del`")
-        de manera definitiva. Si el nombre no está presente en la lista "`strategies`", se ignora.
+        "`names`". Primero, se borra de la lista de feeds de cada derivado (ver "`_unsubscribe_feeds`"). Luego
+        se extrae ("pop") de la lista de "`strategies`" misma, y despues de desactivarla ("`active = False`"),
+        se borra ("`del`") de manera definitiva. Si el nombre no está presente en la lista "`strategies`", se
+        ignora.
 
         Inputs:
         - "`names`" ("`list[str]`"): Los nombres de las estrategias a borrar.
@@ -374,12 +950,10 @@ class Manager:
                 # Extraer la instancia de estrategia ("pop").
                 strat: Strategy = self.strategies.pop(name)
                 verbose["strat"] = strat.__class__.__name__
-                # pyRofex.market_data_unsubscription() ?
-                # Iterar sobre los derivados asociados a la estrategia.
-                for symbol in strat.symbols.keys():
-                    # Remover el nombre de la estrategia, de dichos feeds.
-                    feed: list = self.symbol_feeds[symbol]
-                    feed.remove(strat.name)
+                # Remover el nombre de la estrategia de los feeds de sus derivados.
+                self._unsubscribe_feeds(strat.name, strat.specs_derivs.index)
+                self._unsubscribe_feeds(strat.name, self._get_spots(strat))
+                self._update_retention(strat.specs_derivs.index); self._update_bars(strat.specs_derivs.index)
                 # Desactivar y eliminar de manera definitiva.
                 strat.active = False; strat.__del__()
                 Log.warning("Removed \"{strat} - {name}\"", **verbose)
@@ -0,0 +1,207 @@
+import os, sys
+sys.path.append("./")
+
+import threading
+from bisect import bisect_left
+from time import time, perf_counter_ns
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from utils.constants import *
+
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+class Metrics:
+    """
+    Métricas del sistema en vivo, expuestas en formato de texto de Prometheus
+    ("https://prometheus.io/docs/instrumenting/exposition_formats/"), ya sea mediante un servidor HTTP local en su
+    propio thread ("`serve`", en "`/metrics`") o escribiendo un archivo ("`write`", ej: para "node_exporter").
+
+    Los ticks ("`on_tick`") se cuentan sin "locks", desde un único thread escritor: la etapa "parse" del "pipeline"
+    (o el thread del WebSocket, sin "pipeline"). Las ejecuciones y órdenes ("`on_strategy`", "`on_order`") llegan de
+    varios threads: la etapa "strategies" y el de cada estrategia en modo "background" (ej: "`on_tick`" en su thread
+    y "`on_bar`" en la etapa "strategies"), con lo cual se acumulan bajo un "lock" (fuera del camino de los ticks).
+    Quien los lee ("`render`") toma una copia de cada "dict": la de los ticks sin bloquear (atómica bajo el GIL).
+
+    Inputs:
+    * "`collect`" ("`callable`"): Función sin argumentos que devuelve métricas adicionales del tipo "gauge", leídas
+        al momento de exponerlas: "`{nombre: (descripción, {etiquetas: valor})}`", adonde "etiquetas" es un "`str`"
+        con el formato de Prometheus (ej: "`'underlying="GGAL.BA"'`") o "" si no lleva.
+    """
+    PREFIX = "rofex_"
+    # Límites superiores (en segundos) de los "buckets" del histograma de ejecución de las estrategias.
+    BUCKETS = [0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5]
+    BUCKETS_NS = [int(bound * 1e9) for bound in BUCKETS]
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def __init__(self, collect = None):
+
+        self.collect = collect or dict
+        # Contadores: ticks por derivado, señales enviadas por estrategia.
+        self.ticks, self.signals = dict(), dict()
+        # Acumulados "[cantidad, total en ns, cantidades por bucket]" de ejecución de "on_tick" (ver "BUCKETS"), y
+        # "[cantidad, total, máximo]" en ns de latencia de órdenes (envío hasta respuesta de la API), por estrategia.
+        self.runs, self.orders, self.lock = dict(), dict(), threading.Lock()
+        # Valores de la exposición anterior, para calcular tasas por segundo entre exposiciones.
+        self._last = {"ts": time(), "ticks": dict(), "signals": dict()}
+        self.server = None
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def on_tick(self, symbol: str):
+        """
+        Cuenta un tick recibido del derivado "`symbol`".
+        """
+        self.ticks[symbol] = self.ticks.get(symbol, 0) + 1
+
+    def on_strategy(self, name: str, t0: int) -> int:
+        """
+        Acumula el tiempo de ejecución de "`on_tick`" de la estrategia "`name`", desde "`t0`" ("`perf_counter_ns`"),
+        en su histograma. Devuelve dicho tiempo, en ns.
+        """
+        dt = perf_counter_ns() - t0
+        bucket = bisect_left(self.BUCKETS_NS, dt)
+        with self.lock:
+            run = self.runs.get(name)
+            if run is None: self.runs[name] = run = [0, 0, [0] * (len(self.BUCKETS) + 1)]
+            run[0] += 1; run[1] += dt; run[2][bucket] += 1
+        return dt
+
+    def on_order(self, name: str, t0: int):
+        """
+        Cuenta una señal enviada por la estrategia "`name`", y su latencia desde "`t0`" ("`perf_counter_ns`").
+        """
+        dt = perf_counter_ns() - t0
+        with self.lock:
+            self.signals[name] = self.signals.get(name, 0) + 1
+            order = self.orders.get(name)
+            if order is None: self.orders[name] = order = [0, 0, 0]
+            order[0] += 1; order[1] += dt
+            if (dt > order[2]): order[2] = dt
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    @classmethod
+    def family(cls, name: str, kind: str, help: str, samples: dict, suffix: str = ""):
+        """
+        Formatea una métrica en texto de Prometheus: encabezados "`# HELP`"/"`# TYPE`" y una línea por muestra.
+        Las claves de "`samples`" son las etiquetas, ya formateadas.
+        """
+        name = cls.PREFIX + name
+        lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+        for labels, value in samples.items():
+            labels = "{%s}" % labels if labels else ""
+            lines.append(f"{name}{suffix}{labels} {float(value):.9g}")
+        return lines
+
+    @classmethod
+    def summary(cls, name: str, help: str, label: str, values: dict):
+        """
+        Formatea acumulados "`[cantidad, total en ns, ...]`" como un "summary" de Prometheus ("`_sum`" en
+        segundos, y "`_count`").
+        """
+        name_full = cls.PREFIX + name
+        lines = [f"# HELP {name_full} {help}", f"# TYPE {name_full} summary"]
+        for key, (count, total, *_) in values.items():
+            lines.append(f"{name_full}_sum{{{label}=\"{key}\"}} {total / 1e9:.9g}")
+            lines.append(f"{name_full}_count{{{label}=\"{key}\"}} {count}")
+        return lines
+
+    @classmethod
+    def histogram(cls, name: str, help: str, label: str, values: dict):
+        """
+        Formatea acumulados "`[cantidad, total en ns, cantidades por bucket]`" como un "histogram" de Prometheus
+        ("`_bucket`" acumulados por límite "`le`" de "`BUCKETS`", "`_sum`" en segundos, y "`_count`").
+        """
+        name_full = cls.PREFIX + name
+        lines = [f"# HELP {name_full} {help}", f"# TYPE {name_full} histogram"]
+        for key, (count, total, buckets) in values.items():
+            cumulative = 0
+            for bound, n in zip([*cls.BUCKETS, "+Inf"], buckets):
+                cumulative += n
+                lines.append(f"{name_full}_bucket{{{label}=\"{key}\",le=\"{bound}\"}} {cumulative}")
+            lines.append(f"{name_full}_sum{{{label}=\"{key}\"}} {total / 1e9:.9g}")
+            lines.append(f"{name_full}_count{{{label}=\"{key}\"}} {count}")
+        return lines
+
+    def render(self) -> str:
+        """
+        Devuelve todas las métricas en formato de texto de Prometheus. Las tasas por segundo se calculan respecto
+        de la exposición anterior.
+        """
+        ticks = dict(self.ticks)
+        with self.lock:
+            signals = dict(self.signals)
+            runs = {name: [count, total, [*buckets]] for name, (count, total, buckets) in self.runs.items()}
+            orders = {name: [*order] for name, order in self.orders.items()}
+        ts = time(); last, dt = self._last, max(ts - self._last["ts"], 1e-9)
+        self._last = {"ts": ts, "ticks": ticks, "signals": signals}
+        rate = lambda now, before: {key: (value - before.get(key, 0)) / dt for key, value in now.items()}
+        label = lambda name, values: {f"{name}=\"{key}\"": value for key, value in values.items()}
+
+        lines = self.family("ticks_total", "counter", "Market data ticks received.", label("symbol", ticks))
+        lines += self.family("ticks_per_second", "gauge", "Ticks per second since the last scrape.",
+            label("symbol", rate(ticks, last["ticks"])))
+        lines += self.histogram("strategy_exec_seconds", "Strategy on_tick execution time.", "strategy", runs)
+        lines += self.family("signals_total", "counter", "Signals sent to the API.", label("strategy", signals))
+        lines += self.family("signals_per_second", "gauge", "Signals per second since the last scrape.",
+            label("strategy", rate(signals, last["signals"])))
+        lines += self.summary("order_latency_seconds", "Order round trip to the API.", "strategy", orders)
+        lines += self.family("order_latency_max_seconds", "gauge", "Slowest order round trip to the API.",
+            label("strategy", {name: order[2] / 1e9 for name, order in orders.items()}))
+        for name, (help, samples) in self.collect().items():
+            lines += self.family(name, "gauge", help, samples)
+        return "\n".join(lines) + "\n"
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def write(self, path: str):
+        """
+        Escribe las métricas en el archivo "`path`" (de manera atómica, via archivo temporal y "`os.replace`").
+        """
+        with open(path + ".tmp", "w") as handle: handle.write(self.render())
+        os.replace(path + ".tmp", path)
+
+    def serve(self, port: int = 9108, host: str = "127.0.0.1"):
+        """
+        Inicia un servidor HTTP en su propio thread ("daemon"), que expone las métricas en "`/metrics`".
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if (self.path.split("?")[0] not in ("/", "/metrics")): return self.send_error(404)
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", metrics.CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers(); self.wfile.write(body)
+            def log_message(self, *args): pass # Silenciar el log por request.
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target = self.server.serve_forever, name = "Metrics", daemon = True).start()
+        Log.info(f"Serving metrics on \"http://{host}:{port}/metrics\"")
+
+    def shutdown(self):
+        """
+        Detiene el servidor HTTP, si está activo.
+        """
+        if self.server is None: return
+        self.server.shutdown(); self.server.server_close()
+        self.server = None
+
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+if (__name__ == "__main__"):
+
+    from urllib.request import urlopen
+
+    metrics = Metrics(lambda: {"symbol_ticks_rows": ("Rows retained in symbol_ticks.", {"": 1234})})
+    for n in range(1000): metrics.on_tick("GGAL/DIC23" if n % 3 else "YPFD/DIC23")
+    metrics.on_strategy("Alma_test", perf_counter_ns() - 2500000)
+    metrics.on_order("Alma_test", perf_counter_ns() - 40000000)
+    metrics.serve(9108)
+    print(urlopen("http://127.0.0.1:9108/metrics").read().decode())
+    metrics.shutdown()
@@ -0,0 +1,138 @@
+import os, sys
+sys.path.append("./")
+
+import threading
+from collections import deque
+
+from utils.constants import *
+
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+class Stage(threading.Thread):
+    """
+    Etapa de un "pipeline" de procesamiento: una cola mas un thread propio que la consume, ejecutando "`func`" sobre
+    cada elemento en orden de llegada. Quien produce ("`put`") nunca ejecuta "`func`": solo encola, de modo que una
+    etapa lenta no demora a la anterior (ej: el callback del WebSocket). Políticas ante desborde ("`policy`"):
+    - "`block`": la cola tiene "`maxsize`" lugares; quien produce espera a que se libere uno.
+    - "`drop_oldest`": la cola tiene "`maxsize`" lugares; al llenarse se descarta el elemento mas antiguo. Sin
+        "locks": "`deque`" con "`maxlen`" es atómica bajo el GIL.
+    - "`conflate`": se conserva solo el último elemento de cada clave ("`key(item)`", ej: el derivado), en la
+        posición de llegada del primero pendiente. Los elementos de clave "`None`" nunca se combinan. Es la única
+        política que toma un "lock" (breve, solo para reemplazar el elemento pendiente). Con "`merge`", en lugar
+        de reemplazarlo se lo combina con el nuevo ("`merge(pending, item)`", ej: la unión de los derivados).
+
+    Inputs:
+    * "`name`" ("`str`"): Nombre de la etapa.
+    * "`func`" ("`callable`"): Función a ejecutar sobre cada elemento. Sus excepciones se registran y no detienen
+        la etapa.
+    * "`maxsize`" ("`int`"): Capacidad de la cola (no aplica a "`conflate`").
+    * "`policy`" ("`str`"): Política ante desborde (ver arriba).
+    * "`key`" ("`callable`"): Clave de cada elemento, para "`conflate`".
+    * "`merge`" ("`callable`"): Combinación del elemento pendiente con el nuevo de igual clave, para "`conflate`".
+        Por defecto, el nuevo reemplaza al pendiente.
+    """
+    POLICIES = ("block", "drop_oldest", "conflate")
+    TIMEOUT = 0.1 # Espera máxima (en segundos) entre revisiones de la cola, para poder detenerse.
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def __init__(self, name: str, func, maxsize: int = 10000, policy: str = "block", key = None,
+                 merge = None):
+
+        super().__init__(name = f"Stage - {name}", daemon = True)
+        assert policy in self.POLICIES, f"Invalid policy \"{policy}\"!"
+        assert (policy != "conflate") or callable(key), "\"conflate\" requires a \"key\" function!"
+        self.stage, self.func, self.maxsize, self.policy, self.key = name, func, maxsize, policy, key
+        self.merge = merge
+        self.items = deque(maxlen = maxsize if (policy == "drop_oldest") else None)
+        self.pending, self.lock = dict(), threading.Lock() # Solo para "conflate".
+        self.slots = threading.BoundedSemaphore(maxsize) # Solo para "block".
+        self.ready, self.running = threading.Event(), False
+        # Contadores: elementos encolados, procesados y descartados (o combinados).
+        self.n_put = self.n_done = self.n_dropped = 0
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    @property
+    def depth(self) -> int:
+        """
+        Cantidad de elementos pendientes en la cola.
+        """
+        return len(self.pending) if (self.policy == "conflate") else len(self.items)
+
+    def put(self, item):
+        """
+        Encola "`item`" según la política de la etapa, y despierta a su thread.
+        """
+        self.n_put += 1
+        if (self.policy == "block"):
+            self.slots.acquire(); self.items.append(item)
+        elif (self.policy == "drop_oldest"):
+            if (len(self.items) >= self.maxsize): self.n_dropped += 1
+            self.items.append(item)
+        else:
+            key = self.key(item)
+            if key is None: key = object() # Clave única: nunca se combina.
+            with self.lock:
+                pending = self.pending.get(key)
+                if pending is not None:
+                    self.n_dropped += 1
+                    if self.merge: item = self.merge(pending, item)
+                self.pending[key] = item
+        self.ready.set()
+
+    def _take(self):
+        """
+        Extrae el próximo elemento de la cola. Devuelve "`(True, item)`", o "`(False, None)`" si está vacía.
+        """
+        if (self.policy == "conflate"):
+            with self.lock:
+                if not self.pending: return False, None
+                return True, self.pending.pop(next(iter(self.pending)))
+        try: item = self.items.popleft()
+        except IndexError: return False, None
+        if (self.policy == "block"): self.slots.release()
+        return True, item
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def run(self):
+
+        self.running = True
+        while self.running:
+            # Limpiar el aviso antes de vaciar la cola: lo que llegue mientras tanto vuelve a avisar.
+            self.ready.wait(self.TIMEOUT); self.ready.clear()
+            while True:
+                is_item, item = self._take()
+                if not is_item: break
+                try: self.func(item)
+                except Exception as EXC: Log.exception(EXC)
+                self.n_done += 1
+
+    def stop(self, timeout: float = 1.0):
+        """
+        Detiene el thread de la etapa luego del elemento en curso. Los elementos pendientes se descartan. Si se
+        llama desde el propio thread de la etapa (ej: una estrategia que se remueve a sí misma), no se espera.
+        """
+        self.running = False; self.ready.set()
+        if self.is_alive() and (threading.current_thread() is not self): self.join(timeout)
+
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+if (__name__ == "__main__"):
+
+    from time import sleep, perf_counter
+
+    # Productor rápido (10k elementos, 3 claves) contra un consumidor lento (0.1 ms por elemento).
+    for policy in Stage.POLICIES:
+        done = list()
+        stage = Stage(policy, lambda item: (sleep(0.0001), done.append(item)), maxsize = 100,
+            policy = policy, key = lambda item: item % 3)
+        stage.start(); t0 = perf_counter()
+        for n in range(10000): stage.put(n)
+        ms_put = (perf_counter() - t0) * 1000
+        while stage.depth: sleep(0.01)
+        sleep(0.01); stage.stop()
+        print(f"{policy:>12}: put in {ms_put:7.1f} ms, processed {len(done):5d},",
+            f"dropped {stage.n_dropped:5d}, last {done[-1]}")
@@ -0,0 +1,156 @@
+import os, sys
+sys.path.append("./")
+
+import threading
+from time import perf_counter_ns, sleep
+from collections import Counter
+from pandas import DataFrame, Timestamp
+
+from utils.constants import *
+
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+class Profiler:
+    """
+    Acumulador de tiempos por etapa ("spans") del procesamiento de ticks, agregados por etapa y por clave (derivado o
+    estrategia, según la etapa). Cuando está desactivado ("`enabled = False`"), el código instrumentado solo lee dicho
+    atributo: no se toman tiempos ni se acumula nada. Uso típico:
+
+    ```
+    t0 = perf_counter_ns() if profiler.enabled else 0
+    ... # Etapa a medir.
+    if profiler.enabled: profiler.add("on_tick", name, t0)
+    ```
+
+    Inputs:
+    * "`enabled`" ("`bool`"): Estado inicial. Puede cambiarse en cualquier momento.
+    """
+    COLUMNS = ["count", "mean_us", "max_us", "total_ms"]
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def __init__(self, enabled: bool = False):
+
+        self.enabled = enabled
+        # Acumulados por "(etapa, clave)": "[cantidad, total en ns, máximo en ns]".
+        self.spans = dict()
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def add(self, stage: str, key: str, t0: int, t1: int = None):
+        """
+        Acumula el tiempo transcurrido entre "`t0`" y "`t1`" ("`perf_counter_ns`"; por defecto, el instante actual)
+        para la etapa "`stage`" y clave "`key`". Devuelve "`t1`", para encadenar etapas consecutivas sin volver a medir.
+        """
+        t1 = t1 or perf_counter_ns()
+        span = self.spans.get((stage, key))
+        if span is None: self.spans[(stage, key)] = [1, t1 - t0, t1 - t0]
+        else:
+            span[0] += 1; span[1] += t1 - t0
+            if (t1 - t0 > span[2]): span[2] = t1 - t0
+        return t1
+
+    def reset(self):
+        """
+        Descarta todos los tiempos acumulados.
+        """
+        self.spans = dict()
+
+    @property
+    def table(self) -> DataFrame:
+        """
+        Tabla de tiempos acumulados, indexada por etapa y clave.
+        """
+        rows = {key: {"count": count, "mean_us": total / count / 1000, "max_us": peak / 1000,
+            "total_ms": total / 1e6} for key, (count, total, peak) in [*self.spans.items()]}
+        table = DataFrame.from_dict(rows, orient = "index", columns = self.COLUMNS)
+        return table.rename_axis(["stage", "key"]).sort_index() if rows else table
+
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+class Sampler(threading.Thread):
+    """
+    Perfilador por muestreo ("sampling profiler") de una estrategia. Es un thread que cada "`interval`" segundos lee
+    la pila de llamadas ("`sys._current_frames`") del thread indicado en "`target`", solo mientras éste es distinto
+    de "`None`". Quien ejecuta la estrategia (ver "`Interface._run_strategies`") asigna su propio thread a "`target`"
+    antes de llamar a "`on_tick`" y lo vuelve a "`None`" al terminar, de modo que solo se muestrea esa estrategia.
+    Al cabo de "`seconds`" segundos, las pilas se guardan en formato "folded" ("`func_1;func_2;func_3 N`", una pila
+    por línea, con su cantidad de muestras), compatible con "`flamegraph.pl`" y "speedscope".
+
+    Inputs:
+    * "`name`" ("`str`"): Nombre de la estrategia a perfilar.
+    * "`seconds`" ("`float`"): Duración del muestreo.
+    * "`interval`" ("`float`"): Período de muestreo, en segundos.
+    * "`path`" ("`str`"): Archivo de salida. Por defecto, "`logs/profile_{name}_{timestamp}.folded`".
+    """
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def __init__(self, name: str, seconds: float = 10, interval: float = 0.001, path: str = None):
+
+        super().__init__(name = f"Sampler - {name}", daemon = True)
+        ts = Timestamp.utcnow().strftime("%Y%m%d_%H%M%S")
+        self.path = path or os.path.join(PATH_FOLDER_LOGS, f"profile_{name}_{ts}.folded")
+        self.strat_name, self.seconds, self.interval = name, seconds, interval
+        self.target, self.stacks = None, Counter()
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    @staticmethod
+    def fold(frame) -> str:
+        """
+        Convierte una pila de llamadas en una línea "folded": de la llamada mas externa a la mas interna.
+        """
+        names = list()
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def run(self):
+
+        ts_stop = perf_counter_ns() + int(self.seconds * 1e9)
+        while (perf_counter_ns() < ts_stop):
+            target = self.target
+            if target is not None:
+                frame = sys._current_frames().get(target)
+                if frame is not None: self.stacks[self.fold(frame)] += 1
+            sleep(self.interval)
+        self.save()
+
+    def save(self):
+        """
+        Guarda las pilas muestreadas en "`path`", en formato "folded".
+        """
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok = True)
+        with open(self.path, "w") as handle:
+            for stack, count in self.stacks.most_common(): handle.write(f"{stack} {count}\n")
+        verbose = {"name": self.strat_name, "n": sum(self.stacks.values()), "path": self.path}
+        Log.success("Profiled \"{name}\" with {n} samples: \"{path}\"", **verbose)
+
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+if (__name__ == "__main__"):
+
+    from time import perf_counter
+    from tempfile import gettempdir
+
+    # Costo del código instrumentado con el perfilador apagado y encendido.
+    profiler, n = Profiler(), 1000000
+    for enabled in (False, True):
+        profiler.enabled = enabled
+        t0 = perf_counter()
+        for _ in range(n):
+            t = perf_counter_ns() if profiler.enabled else 0
+            if profiler.enabled: profiler.add("stage", "key", t)
+        print(f"enabled = {enabled}: {(perf_counter() - t0) / n * 1e9:.0f} ns per span")
+    print(profiler.table)
+
+    # Muestreo de una función "lenta" ejecutada en este mismo thread. Se graba en la carpeta temporal (o el archivo
+    # indicado, ej: "python models/profiler.py logs/profile_test.folded").
+    path = sys.argv[1] if (len(sys.argv) > 1) else os.path.join(gettempdir(), "profile_test.folded")
+    sampler = Sampler("test", seconds = 1, path = path)
+    sampler.start(); sampler.target = threading.get_ident()
+    slow = lambda: sum(n * n for n in range(10000))
+    while sampler.is_alive(): slow()
+    print(open(sampler.path).read()[: 500])
@@ -0,0 +1,178 @@
+import os, sys, json
+sys.path.append("./")
+
+import numpy
+from pandas import DataFrame, Timestamp, to_numeric
+from pandas.api.types import is_numeric_dtype, is_integer_dtype, is_bool_dtype, is_datetime64_any_dtype, infer_dtype
+
+from utils.constants import *
+
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+class Snapshot:
+    """
+    Foto del estado del "`Manager`" en disco, para poder reanudar la operatoria rápidamente luego de un reinicio (ej:
+    una caída durante el horario de mercado). Cada tabla ("`DataFrame`") se guarda como un array estructurado de
+    "`numpy`" en su propio archivo "`.npy`" (binario, sin objetos de Python), de modo que puede abrirse mapeado en
+    memoria ("`numpy.load(..., mmap_mode = "r")`") sin deserializar nada. El archivo "`meta.json`" lleva el momento
+    de la foto, la lista de tablas (con su índice y columnas con zona horaria) y el estado pequeño (ej: los libros de
+    posiciones de las estrategias). Se escribe último, de modo que una foto a medio escribir nunca se considera válida.
+
+    Inputs:
+    * "`path`" ("`str`"): Carpeta adonde guardar/leer la foto. Por defecto, "`PATH_FOLDER_SNAPSHOTS`".
+    * "`max_age`" ("`float`"): Antigüedad máxima (en segundos) para que una foto sea restaurable.
+    """
+    FILE_META = "meta.json"
+    # Tipos inferidos (ver "`pandas.api.types.infer_dtype`") de columnas "object" a guardar como números.
+    NUMERIC_KINDS = {"integer", "floating", "mixed-integer-float", "decimal", "boolean"}
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def __init__(self, path: str = PATH_FOLDER_SNAPSHOTS, max_age: float = 3600):
+
+        self.path, self.max_age = path, max_age
+        self.meta = dict()
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    @classmethod
+    def to_array(cls, df: DataFrame):
+        """
+        Convierte un "`DataFrame`" en un array estructurado de "`numpy`" sin campos "`object`" (mapeable en memoria).
+        - Columnas enteras => sin cambios (ej: los precios en "ticks" de "`TickStore.table`").
+        - Columnas numéricas (o de objetos convertibles a números) => "`float64`".
+        - Columnas booleanas => "`bool`".
+        - Columnas de fechas => "`datetime64[ns]`" en UTC (la zona horaria se registra aparte).
+        - Cualquier otra columna => texto de ancho fijo ("`U<n>`"). "`None`"/"`NaN`" se guardan como "".
+
+        Inputs:
+        * "`df`" ("`DataFrame`"): Tabla a convertir. Su índice se guarda como una columna mas.\n
+        Outputs:
+        * "`array`" ("`numpy.ndarray`"): Array estructurado, una fila por fila de la tabla.
+        * "`info`" ("`dict`"): Nombre de la columna índice y lista de columnas con zona horaria.
+        """
+        named = df.index.name is not None
+        index = df.index.name if named else "index"
+        df = df.reset_index(names = index)
+        fields, columns, tz = list(), dict(), list()
+        for name in df.columns:
+            values = df[name]
+            if is_datetime64_any_dtype(values):
+                if values.dt.tz is not None:
+                    values = values.dt.tz_convert("UTC").dt.tz_localize(None)
+                    tz.append(name)
+                values = values.to_numpy("datetime64[ns]")
+            elif is_bool_dtype(values): values = values.to_numpy(bool)
+            elif is_integer_dtype(values): values = values.to_numpy()
+            elif is_numeric_dtype(values): values = values.to_numpy(float)
+            # Columnas "object" con números (ej: tablas sin tipos definidos).
+            elif infer_dtype(values, skipna = True) in cls.NUMERIC_KINDS:
+                values = to_numeric(values).to_numpy(float)
+            else:
+                values = values.where(values.notna(), "").astype(str)
+                values = values.to_numpy(str) if len(values) else numpy.array([], "U1")
+            fields.append((str(name), values.dtype))
+            columns[str(name)] = values
+        array = numpy.empty(len(df), dtype = fields)
+        for name, values in columns.items(): array[name] = values
+        return array, {"index": index, "named": named, "tz": tz}
+
+    @staticmethod
+    def from_array(array: numpy.ndarray, info: dict):
+        """
+        Operación inversa de "`to_array`": reconstruye el "`DataFrame`" a partir del array estructurado.
+        Los textos vacíos vuelven a ser "`None`".
+        """
+        df = DataFrame({name: array[name] for name in array.dtype.names})
+        for name in df.columns:
+            if (df[name].dtype.kind == "U") or (df[name].dtype == object):
+                df[name] = df[name].astype(object).where(df[name] != "", None)
+        for name in info.get("tz", list()):
+            df[name] = df[name].dt.tz_localize("UTC")
+        df = df.set_index(info["index"])
+        return df if info.get("named", True) else df.rename_axis(None)
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def save(self, tables: dict, state: dict = dict()):
+        """
+        Guarda una nueva foto. Cada archivo se escribe primero con extensión temporal y luego se reemplaza de manera
+        atómica ("`os.replace`"); "`meta.json`" se escribe al final.
+
+        Inputs:
+        * "`tables`" ("`dict[str, DataFrame]`"): Tablas a guardar, por nombre.
+        * "`state`" ("`dict`"): Estado adicional (JSON-serializable) a guardar dentro de "`meta.json`".
+        """
+        os.makedirs(self.path, exist_ok = True)
+        meta = {"ts": Timestamp.utcnow().isoformat(), "tables": dict(), "state": state}
+        for name, df in tables.items():
+            array, info = self.to_array(df)
+            file = os.path.join(self.path, f"{name}.npy")
+            with open(file + ".tmp", "wb") as handle: numpy.save(handle, array)
+            os.replace(file + ".tmp", file)
+            meta["tables"][name] = info
+        file = os.path.join(self.path, self.FILE_META)
+        with open(file + ".tmp", "w") as handle: json.dump(meta, handle, default = str)
+        os.replace(file + ".tmp", file)
+        self.meta = meta
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def load(self):
+        """
+        Lee "`meta.json`" de la foto guardada. Devuelve "`True`" si existe y su antigüedad es menor a "`max_age`".
+        Las tablas no se leen hasta ser pedidas mediante "`table`".
+        """
+        file = os.path.join(self.path, self.FILE_META)
+        if not os.path.isfile(file): return False
+        try:
+            with open(file) as handle: meta = json.load(handle)
+        except (OSError, ValueError) as EXC: Log.warning(f"Invalid snapshot: {repr(EXC)}"); return False
+        if (self.age(meta) > self.max_age): return False
+        self.meta = meta
+        return True
+
+    @staticmethod
+    def age(meta: dict):
+        """
+        Antigüedad de la foto, en segundos.
+        """
+        return (Timestamp.utcnow() - Timestamp(meta["ts"])).total_seconds()
+
+    def array(self, name: str, mmap: bool = True):
+        """
+        Devuelve la tabla "`name`" de la foto cargada como array estructurado (o "`None`" si no existe), sin convertir
+        (ver "`to_array`"). Con "`mmap`", el archivo se abre mapeado en memoria: solo se leen del disco las páginas
+        efectivamente usadas.
+        """
+        info = self.meta.get("tables", dict()).get(name)
+        file = os.path.join(self.path, f"{name}.npy")
+        if (info is None) or not os.path.isfile(file): return None
+        return numpy.load(file, mmap_mode = "r" if mmap else None)
+
+    def table(self, name: str, mmap: bool = True):
+        """
+        Devuelve la tabla "`name`" de la foto cargada como "`DataFrame`" (o "`None`" si no existe). El archivo se abre
+        mapeado en memoria: solo se leen del disco las páginas efectivamente usadas durante la conversión.
+        """
+        array = self.array(name, mmap)
+        if array is None: return None
+        return self.from_array(array, self.meta["tables"][name])
+
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+if (__name__ == "__main__"):
+
+    from time import perf_counter
+    from tempfile import mkdtemp
+    from pandas import date_range
+
+    n = 100000
+    ticks = DataFrame(index = date_range("2023-12-01", periods = n, freq = "ms", tz = "UTC").rename("ts_local"),
+        data = {"symbol": "GGAL/DIC23", "price_ask_l1": numpy.random.rand(n), "size_ask_l1": 1.0})
+    # Foto de prueba en una carpeta temporal (o la indicada, ej: "python models/snapshot.py snapshots/test/").
+    snapshot = Snapshot(sys.argv[1] if (len(sys.argv) > 1) else mkdtemp(prefix = "snapshot_"))
+    snapshot.save({"ticks": ticks}, state = {"test": True})
+    t0 = perf_counter(); snapshot.load(); restored = snapshot.table("ticks")
+    print(f"Restored {len(restored)} rows in {(perf_counter() - t0) * 1000:.1f} ms")
+    print(restored.tail(), restored.dtypes, sep = "\n")
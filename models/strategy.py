@@ -1,10 +1,13 @@
 import os, sys, json
 sys.path.append("./")
 
-import warnings
+import warnings, threading
 from enum import Enum
 from uuid import uuid4
-from pandas import Series, DataFrame, Timestamp, Timedelta
+from itertools import count
+from time import time
+import numpy
+from pandas import Series, DataFrame, Timestamp, Timedelta, DatetimeIndex, Index, factorize
 from pyRofex import Side as OrderSide, OrderType, TimeInForce
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.schedulers import SchedulerNotRunningError
@@ -12,6 +15,9 @@ from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.triggers.date import DateTrigger
 from utils.constants import *
 from utils.functions import *
+from models.ledger import Ledger
+from models.budget import Budget
+from models.clock import Clock
 from yfinance import Ticker
 
 # Suppress FutureWarning messages
@@ -42,15 +48,32 @@ class Signal:
     * "`SL`" y "`TP`" ("`float`"): "Stop Loss" y "Take Profit". No válidos en "`pyRofex`", pero probablemente a
         futuro pueda desarrollarse un feature local como tal, con órdenes combinadas para lograr el mismo efecto.
     * "`comment`" ("`str`"): Comentario de la operación. Útil para agregar detalles de su origen/causa.
+    El atributo "`id_tick`" (no es input) identifica al tick que originó la señal (ver "`Tracer`").
 
-    *Nota: leer concepto de UUIDs y docstring de "`Signal.get_uid`" debajo.*
+    Por rendimiento, la clase usa "`__slots__`" (sin "`__dict__`" por instancia) y sus formatos de salida ("`dict`",
+    "`form`" y "`repr`") se calculan una única vez y quedan en caché. Por ello, la señal debe tratarse como inmutable
+    luego de creada: las funciones que la modifican (ej: "`flip`") deben llamar a "`_invalidate`". Para crear muchas
+    señales de una vez a partir de columnas (ej: las de un DataFrame), usar "`Signal.from_arrays`".
+
+    *Nota: leer concepto de IDs y docstrings de "`Signal.get_uid`" y "`Signal.get_sid`" debajo.*
     """
     class Action(Enum): ORDER, MODIFY, CANCEL = range(3) # Enum para establecer objetivo de la señal.
 
     # Columnas a conservar en DataFrame para historial de señales dentro de las estrategias.
     RESPONSE_COLUMNS = ["id_signal", "id_order", "status", "prop", "symbol", "size",
-         "price", "type", "side", "oper", "tif", "SL", "TP", "dms_send", "dms_exec"]
-    
+         "price", "type", "side", "oper", "tif", "SL", "TP", "dms_send", "dms_exec", "id_tick"]
+    # Nombres de los enums, precalculados para no leer "`.name`" en cada serialización.
+    NAMES = {member: member.name for enum in (Action, OrderType, OrderSide, TimeInForce) for member in enum}
+    # Inverso de cada sentido, para "`flip`".
+    FLIPS = {OrderSide.BUY: OrderSide.SELL, OrderSide.SELL: OrderSide.BUY}
+
+    __slots__ = ("action", "comment", "id_signal", "ID", "symbol", "size", "side",
+                 "type", "price", "tif", "SL", "TP", "id_tick", "_dict", "_form", "_repr")
+
+    # Prefijo por proceso (momento de inicio + dígitos aleatorios) + contador secuencial, para los IDs de señal.
+    _SID_PREFIX = "%08X%s" % (int(time()), uuid4().hex.upper()[: 4])
+    _SID_COUNTER = count(1)
+
     @staticmethod
     def get_uid(n: int = 8):
         """
@@ -64,58 +87,110 @@ class Signal:
         """
         uid = str(uuid4()).upper()
         return uid.replace("-", "")[: n]
+
+    @classmethod
+    def get_sid(cls):
+        """
+        Genera el ID por defecto de cada señal: prefijo fijo por proceso (8 dígitos hex del momento de inicio, en
+        segundos, y 4 dígitos hex aleatorios), seguido de un contador secuencial de al menos 6 dígitos hex, que no se
+        reinicia (ej: "`6530A1F2B7C400002B`"). Así no se repiten entre reinicios ni en sesiones largas. Es mucho mas
+        barato que "`get_uid`" (no llama a "`uuid4`" por señal), y "`itertools.count`" es atómico bajo el GIL, con lo
+        cual es seguro entre threads.
+        """
+        return "%s%06X" % (cls._SID_PREFIX, next(cls._SID_COUNTER))
         
     #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
-    def __init__(self, **kwargs):
+    def __init__(self, oper: Action, symbol: str = None, size: float = None,
+                 side: OrderSide = None, type: OrderType = OrderType.MARKET,
+                 price: float = None, tif: TimeInForce = TimeInForce.DAY,
+                 SL: float = None, TP: float = None, ID: str = None,
+                 comment: str = "", uid: str = None, **kwargs):
 
         # "oper": argumento necesario. Debe ser un enum/Action.
-        self.action = kwargs.pop("oper")
-        assert isinstance(self.action, self.Action)
+        self.action = oper
+        assert isinstance(oper, self.Action)
         # "comment" no es necesario. Por defecto, vacío.
-        self.comment = kwargs.pop("comment", "")
-        assert isinstance(self.comment, str)
-        # "id_signal" es generado aleatoriamente por defecto.
-        self.id_signal = kwargs.pop("uid", self.get_uid())
-
-        if (self.action == self.Action.ORDER):
-            # Extraer y definir argumentos para señales de órden nueva.
-            # TODO: Limitar "size" según min/max size en "specs_derivs"...
-            self.size = kwargs.pop("size")
-            self.side = kwargs.pop("side")
-            self.symbol = kwargs.pop("symbol")
-            assert isinstance(self.size, (int, float))
-            # Por defecto, la órden es de ejecución inmediata.
-            self.type = kwargs.pop("type", OrderType.MARKET)
+        self.comment = comment
+        assert isinstance(comment, str)
+        # "id_signal" es secuencial por defecto.
+        self.id_signal = uid or self.get_sid()
+        self.symbol, self.size, self.side = symbol, size, side
+        self.type, self.price, self.tif = type, price, tif
+        self.SL, self.TP, self.ID = SL, TP, ID
+        # ID del tick que originó la señal (ver "Tracer"). Lo asigna quien ejecuta la estrategia.
+        self.id_tick = None
+        self._dict = self._form = self._repr = None
+
+        if (oper is self.Action.ORDER):
+            # Los límites de "specs_derivs" (precio, volumen, tipo) se verifican antes del envío ("PreTrade").
             # Ante ejecución inmediata, no se provee precio.
-            self.price = kwargs.pop("price", None)
-            if not self.price: self.type = OrderType.MARKET
-            # Por defecto, la orden es de tipo DAY.
-            self.tif = kwargs.pop("tif", TimeInForce.DAY)
-            # Por defecto, la orden no tiene SL o TP definidos.
-            self.SL = kwargs.pop("SL", None)
-            self.TP = kwargs.pop("TP", None)
+            if not price: self.type = OrderType.MARKET
             # Verificar que los tipos de datos para cada argumento
             # de la órden son afines a los requeridos por pyRofex.
             self._type_check_basic()
             self._type_check_place()
             # El ID de la órden será devuelto por la API de pyRofex
             # luego de la ejecución de la órden. Para un ID establecido
-            # por mi sistema, sirve justamente el "UUID" aleatorio.
+            # por mi sistema, sirve justamente el "id_signal".
             self.ID = None
         else:
             # Para una modificación o cancelación, se
             # requiere el ID de la órden preexistente.
-            self.ID = kwargs.pop("ID")
-            assert isinstance(self.ID, str)
-            if (self.action == self.Action.MODIFY):
-                # Pueden modificarse los siguientes datos:
-                self.price = kwargs.pop("price", None)
-                self.SL = kwargs.pop("SL", None)
-                self.TP = kwargs.pop("TP", None)
-                self.size = kwargs.pop("size", None)
+            assert isinstance(ID, str)
+            self.type = self.tif = None
+            if (oper is self.Action.MODIFY):
                 # Verificar que los tipos de datos son correctos.
                 self._type_check_basic()
 
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    @classmethod
+    def from_arrays(cls, symbol, side, size, price = None, type: OrderType = OrderType.MARKET,
+                    tif: TimeInForce = TimeInForce.DAY, SL = None, TP = None, comment = None):
+        """
+        Constructor en bloque de nuevas órdenes ("`Action.ORDER`"), a partir de columnas (ej: las de un DataFrame,
+        que es lo que produce "`Alma.on_tick`"). Cada input puede ser una secuencia (una fila por señal) o un valor
+        único que se aplica a todas. Los tipos se verifican una vez por columna en lugar de una vez por señal, y se
+        evita el "`__init__`" por instancia.
+
+        Inputs:
+        * "`symbol`", "`side`", "`size`", "`price`", "`type`", "`tif`", "`SL`", "`TP`", "`comment`": Idem "`Signal`".\n
+        Outputs:
+        * "`signals`" ("`list[Signal]`"): Lista de señales, en el orden de las filas.
+        """
+        n = len(symbol)
+        # Expandir valores únicos a listas, y convertir arrays de "numpy" a listas de Python.
+        def column(values, default = None):
+            if values is None: values = default
+            if isinstance(values, (str, Enum, int, float)) or (values is None):
+                return [values] * n
+            values = values.tolist() if hasattr(values, "tolist") else list(values)
+            assert len(values) == n, "All columns must have the same length!"
+            return values
+        
+        symbol, side, size = column(symbol), column(side), column(size)
+        price, types, tifs = column(price), column(type), column(tif)
+        SL, TP, comment = column(SL), column(TP), column(comment, "")
+        # Verificación de tipos, una vez por columna.
+        assert all(isinstance(value, str) for value in symbol)
+        assert all(isinstance(value, str) for value in comment)
+        assert all(isinstance(value, (int, float)) for value in size)
+        assert set(side) <= {*OrderSide}, "Invalid \"side\" values!"
+        assert set(types) <= {*OrderType}, "Invalid \"type\" values!"
+        assert set(tifs) <= {*TimeInForce}, "Invalid \"tif\" values!"
+        
+        signals, new, order = list(), object.__new__, cls.Action.ORDER
+        for i in range(n):
+            signal = new(cls)
+            signal.action, signal.comment, signal.id_signal = order, comment[i], cls.get_sid()
+            signal.symbol, signal.size, signal.side = symbol[i], size[i], side[i]
+            signal.price, signal.tif, signal.SL, signal.TP = price[i], tifs[i], SL[i], TP[i]
+            signal.id_tick = None
+            # Ante ejecución inmediata, no se provee precio.
+            signal.type = types[i] if price[i] else OrderType.MARKET
+            signal.ID = signal._dict = signal._form = signal._repr = None
+            signals.append(signal)
+        return signals
+
     #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
     def _type_check_basic(self):
         """
@@ -137,37 +212,46 @@ class Signal:
         if (self.type == OrderType.LIMIT):
             assert self.price is not None
 
+    def _invalidate(self):
+        """
+        Descarta los formatos de salida en caché. Llamar luego de modificar cualquier atributo de la señal.
+        """
+        self._dict = self._form = self._repr = None
+
     def flip(self):
         """
         Invertir señal: de "`BUY`" a "`SELL`" o viceversa. Útil para testeos.
         """
-        self.side = {
-            OrderSide.BUY: OrderSide.SELL,
-            OrderSide.SELL: OrderSide.BUY
-        }[self.side]
+        self.side = self.FLIPS[self.side]
+        self._invalidate()
     
     @property
     def dict(self):
         """
-        Formato de datos de señal para DataFrames/bases de datos, y/o logging.
+        Formato de datos de señal para DataFrames/bases de datos, y/o logging. Se calcula una sola vez.
         """
-        return {
-            "id_signal": self.id_signal, "symbol": self.symbol,
-            "size": self.size, "price": self.price,
-            "type": self.type.name, "side": self.side.name,
-            "oper": self.action.name, "tif": self.tif.name,
-            "SL": self.SL, "TP": self.TP, "id_order": self.ID,
-            "comment": self.comment}
+        if self._dict is None:
+            names = self.NAMES
+            self._dict = {
+                "id_signal": self.id_signal, "symbol": self.symbol,
+                "size": self.size, "price": self.price,
+                "type": names.get(self.type), "side": names.get(self.side),
+                "oper": names.get(self.action), "tif": names.get(self.tif),
+                "SL": self.SL, "TP": self.TP, "id_order": self.ID,
+                "comment": self.comment}
+        return self._dict
     
     @property
     def form(self):
         """
-        Formato de datos de señal para envío de mensajes a la API de "`pyRofex`".
+        Formato de datos de señal para envío de mensajes a la API de "`pyRofex`". Se calcula una sola vez.
         """
-        return {
-            "ticker": self.symbol, "size": self.size,
-            "order_type": self.type, "side": self.side,
-            "time_in_force": self.tif, "price": self.price}
+        if self._form is None:
+            self._form = {
+                "ticker": self.symbol, "size": self.size,
+                "order_type": self.type, "side": self.side,
+                "time_in_force": self.tif, "price": self.price}
+        return self._form
     
     def __dict__(self):
         return self.dict
@@ -177,8 +261,10 @@ class Signal:
         Representación de señal con la forma:
         "`Signal(size = 0.1, price = 1234.56, ...)`"
         """
-        return ("Signal(%s)" % ", ".join(["%s: %s"
+        if self._repr is None:
+            self._repr = ("Signal(%s)" % ", ".join(["%s: %s"
                 % KV for KV in self.dict.items()]))
+        return self._repr
 
     #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
     @classmethod
@@ -226,6 +312,10 @@ class Strategy:
         una determinada frecuencia, bajo el uso de "`tasks`". Por ejemplo, suponer que se desea correr
         la función "`other_function`" ejemplificada en el código arriba, cada 30 segundos. Luego, tasks
         podría ser: "`{other_function: IntervalTrigger(seconds = 30)}`."
+    * "`max_position`" ("`float`"): Máxima posición neta absoluta por instrumento (ver "`Ledger`"). Por defecto, sin límite.
+    * "`cooldown`" ("`float`"): Segundos mínimos entre señales de un mismo instrumento y sentido (ver "`Ledger`").
+        Ambos pueden especificarse por instrumento dentro de "`symbols`". Ej: "`{"GGAL/DIC23": {"max_position": 2}}`".
+        Ambos filtros están desactivados por defecto: cada subclase elige los suyos (ej: "`Alma`").
     
     Cualquier otro input debe ser un elemento especifico de cada subclase de estrategia, acorde a las
     necesidades del modelo. Deben ser reconocidos y almacenados como atributos dentro de "`__init__`".
@@ -235,9 +325,25 @@ class Strategy:
     # Columnas de DataFrame para almacenar datos de subyacentes.
     COLUMNS_UNDERLYING = ["currency", "exchange", "open", "shares", "day_high",
                       "day_low", "previous_close", "last_price", "last_volume"]
+    # Datos de mercado que la estrategia usa en "on_tick", para no materializar ni solicitar al feed lo que no usa
+    # (ver "Interface._run_strategies" y "Manager.get_data_enums"). A sobreescribir por cada estrategia:
+    # - "FIELDS": columnas de "Manager.MARKET_DATA_COLUMNS" ("symbol" siempre se incluye). "None": todas.
+    # - "DEPTH": cantidad de ticks por derivado (los últimos). "None": todo el historial retenido.
+    # - "UNDERLYING": si usa datos de subyacentes. Si no, "data_under" es una tabla vacía.
+    FIELDS, DEPTH, UNDERLYING = None, None, True
+    # Ticks a retener de cada derivado ("Manager._update_retention"): "{"ticks": N, "seconds": T}" (los últimos N
+    # ticks, y los de los últimos T segundos). "None": la retención por defecto del "Manager".
+    RETENTION = None
+    # Barras OHLCV de cada derivado a recibir en "on_bar" (ver "BarBuilder"): "{intervalo en segundos: barras}".
+    # Ej: "{10: 100, 60: 30}": las últimas 100 barras de 10 segundos y 30 de 1 minuto. "None": sin barras.
+    BARS = None
+    # Presupuesto de latencia de cada ejecución (ver "Budget"): "{"seconds": S, "deadline": D, "adaptive": bool}".
+    # Ej: "{"seconds": 0.002, "deadline": 0.01}". Lo no provisto toma los valores por defecto de "Budget" (sin plazo).
+    BUDGET = None
 
     #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
-    def __init__(self, name: str, symbols: dict, tasks: dict = dict()):
+    def __init__(self, name: str, symbols: dict, tasks: dict = dict(),
+                 max_position: float = None, cooldown: float = 0.0):
 
         self.strat_class = self.__class__.__name__
         verbose = {"name": name, "strat": self.strat_class}
@@ -254,6 +360,15 @@ class Strategy:
         self.signals = self.TEMPLATE_SIGNALS.copy()
         # Para tener especificaciónes de derivados "a mano".
         self.specs_derivs = DataFrame(index = [*symbols])
+        # Libro de posiciones, para filtrar señales redundantes antes de ser enviadas.
+        self.ledger = Ledger(max_position, cooldown, limits = self.symbols)
+        # Para modificar o copiar el historial de señales y el libro de posiciones desde distintos threads
+        # (ej: envíos, reportes de órdenes del WebSocket, y la foto periódica del "Manager").
+        self.lock = threading.Lock()
+        # Presupuesto de latencia, para medir sus ejecuciones y limitarlas si lo exceden.
+        self.budget = Budget(**(self.BUDGET or dict()))
+        # Reloj de los ciclos de ejecución (ver "Clock"). El "Manager" le asigna el suyo al cargarla.
+        self.clock = Clock()
         # Para tener "a mano" la última señal realizada.
         self.last_order = Signal.test([*symbols][0])
         # "Scheduler", para ejecutar tareas paralelas.
@@ -281,7 +396,10 @@ class Strategy:
         """
         Esta función es necesaria para que cada vez que se modifica "active", también se pausen o reanuden las tareas
         correspondientes de manera automática. Es decir: "`strat.active = True`" provoca que "`self.tasks.resume()`".
+        Del mismo modo, cada vez que se asigna "`specs_derivs`" (ej: en "`Manager.load_strategies`"), se recompila
+        la disposición de arrays "`layout`" (ver "`compile`").
         """
+        if (name == "specs_derivs"): super().__setattr__("layout", self.compile(value))
         if (name == "active"):
             now = Timestamp.utcnow()
             # Tomar valor de "active"
@@ -298,6 +416,34 @@ class Strategy:
         # Para cualquier caso, se sobreescribe el atributo.
         super().__setattr__(name, value)
 
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    @staticmethod
+    def compile(specs: DataFrame) -> dict:
+        """
+        Precompila las especificaciones de los derivados de la estrategia como arrays densos, alineados por posición,
+        de modo que el trabajo por tick se reduce a indexar arrays (en lugar de "`loc`", "`merge`" y conversiones
+        de fechas). Nada de esto cambia entre ticks.
+
+        Inputs:
+        - "`specs`" ("`DataFrame`"): Especificaciones de los derivados (ver "`Manager.specs_derivs`").\n
+        Outputs:
+        - "`layout`" ("`dict`"):
+            * "`index`" ("`Index`"): Derivados. Su posición ("`index.get_indexer(symbols)`") indexa al resto.
+            * "`unders`" ("`list`"): Subyacentes (únicos) de los derivados.
+            * "`under_pos`" ("`numpy.ndarray[int]`"): Posición del subyacente de cada derivado en "`unders`".
+            * "`maturity`" ("`numpy.ndarray[float]`"): Vencimiento de cada derivado, en días desde "epoch" (UTC).
+            * "`contract`" ("`numpy.ndarray[float]`"): Multiplicador de contrato de cada derivado.
+        """
+        n = len(specs)
+        under_pos, unders = factorize(specs["underlying"]) if ("underlying" in specs) else (numpy.zeros(n, int), [])
+        if ("maturity" in specs):
+            maturity = DatetimeIndex(specs["maturity"], tz = "UTC")
+            maturity = numpy.where(maturity.isna(), numpy.nan, maturity.asi8 / 86400e9)
+        else: maturity = numpy.full(n, numpy.nan)
+        contract = specs["contract"].to_numpy(float) if ("contract" in specs) else numpy.ones(n)
+        return {"index": Index(specs.index), "unders": list(unders), "under_pos": under_pos,
+                "maturity": maturity, "contract": contract}
+
     #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
     def __del__(self):
         """
@@ -328,6 +474,15 @@ class Strategy:
         self.last_order.flip()
         return [self.last_order]
 
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def on_bar(self, symbol: str, timeframe: int, bars: DataFrame) -> list:
+        """
+        A sobreescribir (overload) por cada estrategia que declare "`BARS`". Se ejecuta al cerrarse cada barra del
+        derivado "`symbol`" en el intervalo "`timeframe`" (en segundos), con sus últimas barras cerradas ("`bars`",
+        ver "`BarBuilder.frame`"). Puede devolver señales, igual que "`on_tick`".
+        """
+        return
+
 if (__name__ == "__main__"):
 
     Strategy("test", symbols = ["YPFD/ENE24", "GGAL/ENE24"])
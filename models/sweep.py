@@ -0,0 +1,206 @@
+import os, sys
+sys.path.append("./")
+
+import numpy
+from itertools import product
+from concurrent.futures import ProcessPoolExecutor
+from pandas import Series, DataFrame, Timestamp, DatetimeIndex
+from pandas import read_csv, read_pickle, read_parquet, merge_asof
+
+from utils.constants import *
+from strategies.alma import Alma
+
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+# Datos compartidos (solo lectura) por los procesos del "pool". Se asignan una vez por proceso mediante
+# "_init_worker". Con el método "fork" (Linux) los arrays se heredan sin copiarse ("copy-on-write").
+_SHARED = dict()
+
+def _init_worker(shared: dict):
+    _SHARED.update(shared)
+
+def _run_chunk(configs: list):
+    return [Sweep.evaluate(_SHARED, **config) for config in configs]
+
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+class Sweep:
+    """
+    Barrido de parámetros de "`Alma`" ("`thr_rate_taker`", "`thr_rate_payer`") sobre ticks grabados, evaluando
+    cada configuración en paralelo en un "pool" de procesos. Todo lo que no depende de los parámetros (días al
+    vencimiento, tasas y precios de salida) se calcula una única vez en "`prepare`" y se
+    comparte como arrays de solo lectura con los procesos. Cada configuración solo aplica "`Alma.calc_sides`" sobre
+    dichos arrays y simula sus señales:
+    - Cada señal opera 1 contrato, comprando en "ask" o vendiendo en "bid" (ejecución inmediata, como en "`Alma`").
+    - El PnL se mide valuando cada operación al precio medio del último tick de su derivado ("mark-to-market").
+    - El "turnover" es la suma de "`precio * multiplicador de contrato`" de todas las operaciones.
+
+    Nota: no se simulan los filtros del "`Ledger`" (máxima posición, cooldown), puesto que requieren recorrer los ticks
+    de manera secuencial. En su lugar, se informa la máxima posición neta absoluta alcanzada ("`position_max`").
+
+    Inputs:
+    * "`ticks`" ("`DataFrame`"): Ticks grabados, con el formato de "`Manager.symbol_ticks`" (índice de timestamps, y
+        al menos "`symbol`", "`price_ask_l1`" y "`price_bid_l1`").
+    * "`specs_derivs`" ("`DataFrame`"): Especificaciones de los derivados (ver "`Manager.specs_derivs`").
+    * "`unders`" ("`Series`" o "`DataFrame`"): Precios de los subyacentes. Puede ser un precio fijo por subyacente
+        ("`Series`", ej: "`specs_unders["last_price"]`"), o un historial con una columna por subyacente e índice de
+        timestamps ("`DataFrame`"), en cuyo caso a cada tick se le asigna el último precio conocido ("as-of").
+    * "`n_workers`" ("`int`"): Cantidad de procesos. Por defecto, todos los CPUs disponibles.
+    """
+    # Columnas de la tabla de resultados, además de los parámetros.
+    COLUMNS_RESULT = ["n_signals", "n_buys", "n_sells", "pnl", "turnover", "position_max"]
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def __init__(self, ticks: DataFrame, specs_derivs: DataFrame, unders, n_workers: int = None):
+
+        self.n_workers = n_workers or os.cpu_count()
+        self.shared = self.prepare(ticks, specs_derivs, unders)
+        verbose = {"n_ticks": len(self.shared["side_buy"]), "n_symbols": len(self.shared["symbols"])}
+        Log.info("Sweep prepared over {n_ticks} ticks of {n_symbols} symbols.", **verbose)
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    @staticmethod
+    def read_ticks(path: str):
+        """
+        Lee ticks grabados desde "`.csv`", "`.pkl`" o "`.parquet`", con el timestamp local ("`ts_local`") como índice.
+        """
+        if path.endswith(".csv"): ticks = read_csv(path, index_col = 0)
+        elif path.endswith(".parquet"): ticks = read_parquet(path)
+        else: ticks = read_pickle(path)
+        ticks.index = DatetimeIndex(ticks.index)
+        if ticks.index.tz is None: ticks.index = ticks.index.tz_localize("UTC")
+        return ticks.rename_axis("ts_local")
+
+    @staticmethod
+    def grid(**params):
+        """
+        Producto cartesiano de valores de parámetros. Ej: "`Sweep.grid(thr_rate_taker = [0.0001, 0.0002],
+        thr_rate_payer = [0.0001, 0.0002])`" devuelve 4 configuraciones (dicts).
+        """
+        names = [*params.keys()]
+        return [dict(zip(names, values)) for values in product(*params.values())]
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    @staticmethod
+    def prepare(ticks: DataFrame, specs_derivs: DataFrame, unders):
+        """
+        Calcula los arrays compartidos, independientes de los parámetros. Se descartan los ticks sin bid/ask, sin
+        especificaciones, o cuyo subyacente no tiene precio.
+
+        Outputs:
+        - "`shared`" ("`dict[str, numpy.ndarray]`"): Tasas, precios de entrada y de salida,
+            multiplicador de contrato y código de derivado, una posición por tick.
+        """
+        data = ticks[["symbol", "price_ask_l1", "price_bid_l1"]].dropna()
+        data = data.loc[data["symbol"].isin(specs_derivs.index)].sort_index()
+        specs = specs_derivs.loc[data["symbol"]]
+        data["underlying"] = specs["underlying"].values
+        data["contract"] = specs["contract"].values.astype(float)
+        maturity = DatetimeIndex(specs["maturity"], tz = "UTC")
+        data["exp_days"] = (maturity - data.index).total_seconds().values / 86400
+
+        # Precio del subyacente de cada tick: fijo, o el último conocido al momento del tick.
+        if isinstance(unders, DataFrame):
+            unders = unders.sort_index().stack().rename("under").reset_index()
+            unders.columns = ["ts", "underlying", "under"]
+            left = data.rename_axis("ts").reset_index()
+            data = merge_asof(left, unders, on = "ts", by = "underlying").set_index("ts")
+        else: data["under"] = data["underlying"].map(unders)
+        data = data.dropna(subset = "under")
+        data = data.loc[data["exp_days"] > 0]
+
+        ask, bid = data["price_ask_l1"].astype(float), data["price_bid_l1"].astype(float)
+        under = data["under"].astype(float)
+        rates = Alma.calc_rates(data["exp_days"].values, ask.values, bid.values, under.values, under.values)
+        # Precio de salida de cada derivado: precio medio de su último tick.
+        mid = ((ask + bid) / 2).groupby(data["symbol"]).last()
+        codes, symbols = data["symbol"].factorize()
+        # Orden de los ticks agrupados por derivado (estable), y el inicio de cada grupo.
+        order = numpy.argsort(codes, kind = "stable")
+        starts = numpy.searchsorted(codes[order], numpy.arange(len(symbols)))
+        return {"rate_taker": rates["rate_taker"], "rate_payer": rates["rate_payer"],
+            "side_buy": ask.values, "side_sell": bid.values,
+            "mark": mid.loc[symbols].values[codes], "contract": data["contract"].values,
+            "order": order, "starts": starts, "symbols": numpy.asarray(symbols)}
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    @staticmethod
+    def evaluate(shared: dict, thr_rate_taker: float = 0.0001, thr_rate_payer: float = 0.0001):
+        """
+        Evalúa una configuración sobre los arrays compartidos (ver "`prepare`").
+
+        Outputs:
+        - "`result`" ("`dict`"): Parámetros, cantidad de señales (total, compras, ventas), PnL, "turnover" y
+            máxima posición neta absoluta por derivado.
+        """
+        sides = Alma.calc_sides(shared["rate_taker"], shared["rate_payer"], thr_rate_taker, thr_rate_payer)
+        is_buy, is_sell = (sides > 0), (sides < 0)
+        price = numpy.where(is_buy, shared["side_buy"], shared["side_sell"])
+        traded = (sides != 0)
+        notional = price * shared["contract"]
+        pnl = sides * (shared["mark"] - price) * shared["contract"]
+        # Posición neta acumulada por derivado (suma acumulada por grupos), para hallar su máximo absoluto.
+        position = numpy.cumsum(sides[shared["order"]], dtype = numpy.int64)
+        offset = numpy.concatenate([[0], position[shared["starts"][1 :] - 1]])
+        counts = numpy.diff(numpy.append(shared["starts"], len(position)))
+        position -= numpy.repeat(offset, counts)
+        position_max = numpy.abs(position).max() if position.size else 0.0
+        return {"thr_rate_taker": thr_rate_taker, "thr_rate_payer": thr_rate_payer, "n_signals": int(traded.sum()),
+            "n_buys": int(is_buy.sum()), "n_sells": int(is_sell.sum()),
+            "pnl": float(pnl[traded].sum()), "turnover": float(notional[traded].sum()),
+            "position_max": float(position_max)}
+
+    def run(self, configs: list, chunksize: int = 64):
+        """
+        Evalúa todas las configuraciones en el "pool" de procesos, en bloques de "`chunksize`" configuraciones
+        por tarea (para amortizar la comunicación entre procesos).
+
+        Inputs:
+        - "`configs`" ("`list[dict]`"): Configuraciones a evaluar (ver "`grid`").\n
+        Outputs:
+        - "`results`" ("`DataFrame`"): Una fila por configuración, ordenada por PnL descendente.
+        """
+        ts_start = Timestamp.utcnow()
+        chunks = [configs[n : n + chunksize] for n in range(0, len(configs), chunksize)]
+        if (self.n_workers <= 1): results = [self.evaluate(self.shared, **config) for config in configs]
+        else:
+            with ProcessPoolExecutor(self.n_workers, initializer = _init_worker,
+                                     initargs = (self.shared,)) as pool:
+                results = [result for chunk in pool.map(_run_chunk, chunks) for result in chunk]
+        verbose = {"n_configs": len(configs), "n_workers": self.n_workers,
+            "seconds": (Timestamp.utcnow() - ts_start).total_seconds()}
+        Log.success("Evaluated {n_configs} configs with {n_workers} workers in {seconds:.1f} s.", **verbose)
+        return DataFrame(results).sort_values("pnl", ascending = False, ignore_index = True)
+
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+if (__name__ == "__main__"):
+
+    from argparse import ArgumentParser
+
+    args = ArgumentParser(prog = "Alma parameter sweep",
+        description = "Evaluates a grid of Alma thresholds over recorded ticks, in parallel")
+    args.add_argument("ticks", type = str, help = "Recorded ticks file (.csv, .pkl, .parquet)")
+    args.add_argument("-u", "--unders", type = str, required = True,
+        help = "Underlying prices: CSV with 'underlying,last_price' rows, or a timestamp-indexed history")
+    args.add_argument("-rt", "--thr_rate_taker", type = str, default = "0:0.001:10", help = "Grid as start:stop:n")
+    args.add_argument("-rp", "--thr_rate_payer", type = str, default = "0:0.001:10", help = "Grid as start:stop:n")
+    args.add_argument("-w", "--workers", type = int, default = None, help = "Number of worker processes")
+    args.add_argument("-o", "--output", type = str, default = None, help = "CSV file to save results")
+    values = args.parse_args()
+
+    linspace = lambda text: numpy.linspace(*map(float, text.split(":")[: 2]), int(text.split(":")[2])).tolist()
+    unders = read_csv(values.unders, index_col = 0)
+    if "last_price" in unders.columns: unders = unders["last_price"]
+    else: unders.index = DatetimeIndex(unders.index, tz = "UTC")
+
+    specs_derivs = read_csv(PATH_FOLDER_DOCS + "specs.csv").set_index("symbol")
+    sweep = Sweep(Sweep.read_ticks(values.ticks), specs_derivs, unders, values.workers)
+    results = sweep.run(Sweep.grid(thr_rate_taker = linspace(values.thr_rate_taker),
+        thr_rate_payer = linspace(values.thr_rate_payer)))
+    print(results.head(20))
+    if values.output: results.to_csv(values.output)
@@ -0,0 +1,112 @@
+import os, sys, json
+sys.path.append("./")
+
+import threading
+from itertools import count
+from collections import deque
+from time import perf_counter_ns, time_ns
+
+from utils.constants import *
+
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+class Tracer:
+    """
+    Trazas por tick ("tick-to-trade"). Cada tick recibido obtiene un ID secuencial ("`id_tick`") que acompaña a su
+    procesamiento: formateo, ejecución de estrategias, señales generadas ("`Signal.id_tick`") y su envío. Para los
+    ticks muestreados, cada etapa ("hop") se registra como un intervalo con timestamps monotónicos en nanosegundos
+    ("`perf_counter_ns`"). Las trazas pueden exportarse en formato "Chrome trace" ("`export`"), para inspeccionarlas
+    en "chrome://tracing" o "https://ui.perfetto.dev".
+
+    Se muestrea 1 de cada "`1 / sample_rate`" ticks, de forma determinística (por "`id_tick`"), de modo que puede
+    mantenerse activo en producción con un costo acotado. Los ticks no muestreados solo cuestan el ID secuencial.
+
+    Inputs:
+    * "`sample_rate`" ("`float`"): Proporción de ticks a trazar, entre 0 (ninguno) y 1 (todos).
+    * "`size`" ("`int`"): Máxima cantidad de intervalos en memoria. Los mas antiguos se descartan.
+    """
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def __init__(self, sample_rate: float = 0.0, size: int = 100000):
+
+        self.ids = count(1)
+        self.spans = deque(maxlen = size)
+        self.sample_rate = sample_rate
+        # Diferencia entre el reloj de pared y el monotónico, para ubicar las trazas en el tiempo.
+        self.offset = time_ns() - perf_counter_ns()
+
+    @property
+    def sample_rate(self) -> float:
+        return self._sample_rate
+
+    @sample_rate.setter
+    def sample_rate(self, value: float):
+        self._sample_rate = min(max(value, 0.0), 1.0)
+        # Se traza un tick cada "step" ("0" = ninguno).
+        self.step = round(1 / self._sample_rate) if self._sample_rate else 0
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def begin(self):
+        """
+        Asigna el ID del próximo tick. Devuelve "`(id_tick, is_traced)`".
+        """
+        id_tick, step = next(self.ids), self.step
+        return id_tick, (step > 0) and (id_tick % step == 0)
+
+    def span(self, id_tick: int, name: str, t0: int, t1: int = None, **args):
+        """
+        Registra el intervalo "`name`" del tick "`id_tick`", entre "`t0`" y "`t1`" ("`perf_counter_ns`"; por
+        defecto, el instante actual). "`args`" se adjuntan a la traza (ej: derivado, estrategia, ID de señal).
+        Devuelve "`t1`", para encadenar etapas consecutivas.
+        """
+        t1 = t1 or perf_counter_ns()
+        self.spans.append((id_tick, name, t0, t1, threading.get_ident(), args))
+        return t1
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def events(self, id_tick: int = None) -> list:
+        """
+        Intervalos registrados en formato "Chrome trace" (eventos completos, "`ph = X`", en microsegundos).
+        Con "`id_tick`", solo los de dicho tick.
+        """
+        events, pid = list(), os.getpid()
+        for tick, name, t0, t1, tid, args in [*self.spans]:
+            if (id_tick is not None) and (tick != id_tick): continue
+            events.append({"name": name, "cat": "tick", "ph": "X", "pid": pid, "tid": tid,
+                "ts": (t0 + self.offset) / 1000, "dur": (t1 - t0) / 1000, "args": {"id_tick": tick, **args}})
+        return events
+
+    def export(self, path: str = None, id_tick: int = None):
+        """
+        Escribe las trazas en "`path`" en formato JSON de "Chrome trace". Por defecto, en "`logs/`".
+        """
+        path = path or os.path.join(PATH_FOLDER_LOGS, f"trace_{time_ns() // 1000000000}.json")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok = True)
+        events = self.events(id_tick)
+        with open(path, "w") as handle:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ns"}, handle, default = str)
+        Log.info(f"Exported {len(events)} trace events to \"{path}\"")
+        return path
+
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+if (__name__ == "__main__"):
+
+    from time import perf_counter, sleep
+
+    tracer, n = Tracer(sample_rate = 0.01), 1000000
+    t = perf_counter()
+    for _ in range(n): id_tick, is_traced = tracer.begin()
+    print(f"begin(): {(perf_counter() - t) / n * 1e9:.0f} ns per tick")
+
+    tracer.sample_rate = 1.0
+    id_tick, is_traced = tracer.begin()
+    t_tick = t0 = perf_counter_ns()
+    sleep(0.001); t0 = tracer.span(id_tick, "parse", t0, symbol = "GGAL/DIC23")
+    sleep(0.003); t0 = tracer.span(id_tick, "on_tick", t0, strategy = "Alma_test")
+    sleep(0.020); t0 = tracer.span(id_tick, "execute", t0, id_signal = "A3F0002B")
+    tracer.span(id_tick, "tick", t_tick)
+    print(json.dumps(tracer.events(id_tick), indent = 1)[: 600])
@@ -0,0 +1,178 @@
+import os, sys, json
+sys.path.append("./")
+
+import select, threading, ssl
+from queue import LifoQueue, Empty
+from http.client import HTTPConnection, HTTPSConnection, HTTPException
+from urllib.parse import urlsplit, quote
+from time import perf_counter_ns
+from pandas import DataFrame
+from pyRofex.components import urls
+from pyRofex import OrderType, TimeInForce, Market
+
+from utils.constants import *
+
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+class Transport:
+    """
+    Transporte propio para los pedidos REST de órdenes ("`send_order`", "`cancel_order`"), en lugar del cliente
+    global de "`pyRofex`" (que abre conexiones a criterio de "`requests`"). Mantiene un "pool" de "`size`" conexiones
+    HTTP persistentes ("keep-alive"), abiertas de antemano ("`warm`"), de modo que ningún pedido paga el "handshake"
+    TCP/TLS. Cada pedido toma una conexión libre (la usada mas recientemente), con lo cual nunca hay mas de "`size`"
+    pedidos en curso: el resto espera, como máximo hasta su plazo ("`timeout`"). Antes de usar una conexión, se
+    comprueba que el servidor no la haya cerrado por inactividad; si lo hizo, se reabre (sin reenviar pedidos). Las
+    estadísticas por conexión ("`table`") se actualizan bajo un "lock", ya que los pedidos llegan de varios threads.
+
+    Inputs:
+    * "`url`" ("`str`"): URL base de la API (ej: "`https://api.remarkets.primary.com.ar/`").
+    * "`token`" ("`str`"): Token de autenticación ("`X-Auth-Token`").
+    * "`size`" ("`int`"): Cantidad de conexiones del "pool".
+    * "`timeout`" ("`float`"): Plazo por defecto de cada pedido (espera de conexión libre incluida), en segundos.
+    * "`refresh`" ("`callable`"): Función sin argumentos que renueva y devuelve el token, ante una respuesta 401.
+    * "`context`" ("`ssl.SSLContext`"): Contexto TLS de las conexiones "`https`". Por defecto, el del sistema.
+    """
+    COLUMNS = ["requests", "mean_ms", "max_ms", "errors", "connects"]
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def __init__(self, url: str, token: str = None, size: int = 4, timeout: float = 2.0, refresh = None,
+                 context: ssl.SSLContext = None):
+
+        parts = urlsplit(url)
+        is_https = (parts.scheme == "https")
+        self.connection_class = HTTPSConnection if is_https else HTTPConnection
+        self.host, self.port, self.base = parts.hostname, parts.port, parts.path.rstrip("/") + "/"
+        self.token, self.refresh, self.timeout = token, refresh, timeout
+        self.pool = LifoQueue()
+        # Estadísticas por conexión: "[pedidos, total en ns, máximo en ns, errores, conexiones abiertas]".
+        self.stats, self.lock = dict(), threading.Lock()
+        kwargs = {"context": context} if is_https else dict()
+        for n in range(size):
+            connection = self.connection_class(self.host, self.port, timeout = timeout, **kwargs)
+            connection.n = n; self.stats[n] = [0, 0, 0, 0, 0]
+            self.pool.put(connection)
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def _connect(self, connection: HTTPConnection, timeout: float = None):
+        """
+        (Re)abre la conexión, con plazo "`timeout`" (por defecto, el del "pool") para el "handshake" TCP/TLS.
+        """
+        connection.close()
+        connection.timeout = self.timeout if (timeout is None) else timeout
+        connection.connect()
+        with self.lock: self.stats[connection.n][4] += 1
+
+    @staticmethod
+    def _is_stale(connection: HTTPConnection):
+        """
+        "`True`" si la conexión está cerrada. Una conexión "keep-alive" inactiva no tiene datos para leer: si el
+        "socket" figura como legible, se lee sin bloquear. Con TLS 1.3, el servidor envía registros sin datos tras el
+        "handshake" ("session tickets"): se procesan al leer y, si no había nada más, la conexión sigue abierta. Si
+        hay datos, o el servidor la cerró ("`b""`"), está vencida.
+        """
+        sock = connection.sock
+        if sock is None: return True
+        try:
+            if not select.select([sock], [], [], 0)[0]: return False
+            sock.setblocking(False)
+            try: sock.recv(1); return True
+            except (BlockingIOError, ssl.SSLWantReadError): return False
+            finally: sock.settimeout(connection.timeout)
+        except (OSError, ValueError): return True
+
+    def warm(self):
+        """
+        Abre todas las conexiones del "pool" de antemano. Devuelve la cantidad de conexiones abiertas.
+        """
+        connections, n_open = list(), 0
+        while True:
+            try: connections.append(self.pool.get_nowait())
+            except Empty: break
+        for connection in connections:
+            try: self._connect(connection); n_open += 1
+            except OSError as EXC: Log.warning(f"Order connection {connection.n} not opened: {repr(EXC)}")
+            self.pool.put(connection)
+        Log.info(f"Opened {n_open} of {len(connections)} order connections to \"{self.host}\"")
+        return n_open
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def request(self, path: str, timeout: float = None, retry: bool = True) -> dict:
+        """
+        Pedido "`GET`" a "`path`" (relativo a la URL base) por una conexión del "pool". Devuelve la respuesta JSON.
+        Sin conexión libre dentro del plazo, lanza "`TimeoutError`". Ante una respuesta 401, renueva el token
+        ("`refresh`") y reintenta una única vez.
+        """
+        t0, timeout = perf_counter_ns(), timeout or self.timeout
+        remaining = lambda: max(timeout - (perf_counter_ns() - t0) / 1e9, 0.001)
+        try: connection = self.pool.get(timeout = timeout)
+        except Empty: raise TimeoutError(f"No free order connection in {timeout} s")
+        stats, is_error = self.stats[connection.n], False
+        try:
+            # Reabrir dentro del plazo restante, y usar el resto para el envío y la respuesta.
+            if self._is_stale(connection): self._connect(connection, remaining())
+            connection.sock.settimeout(remaining())
+            headers = {"X-Auth-Token": self.token or "", "Connection": "keep-alive"}
+            connection.request("GET", self.base + quote(path, safe = "/?&=,:"), headers = headers)
+            response = connection.getresponse()
+            body = response.read()
+        except (OSError, HTTPException):
+            is_error = True; connection.close(); raise
+        finally:
+            self.pool.put(connection)
+            dt = perf_counter_ns() - t0
+            with self.lock:
+                stats[0] += 1; stats[1] += dt; stats[3] += is_error
+                if (dt > stats[2]): stats[2] = dt
+        if (response.status == 401) and retry and self.refresh:
+            self.token = self.refresh()
+            return self.request(path, timeout, retry = False)
+        return json.loads(body)
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    def send_order(self, ticker: str, size: float, order_type: OrderType, side, account: str, price: float = None,
+                   time_in_force: TimeInForce = TimeInForce.DAY, market: Market = Market.ROFEX, timeout: float = None):
+        """
+        Envía una nueva órden, con los mismos parámetros y respuesta que "`pyRofex.send_order`" (ver "`Signal.form`").
+        """
+        path = urls.new_order
+        if order_type is OrderType.LIMIT: path += urls.limit_order
+        path = path.format(market = market.value, ticker = ticker, size = size, type = order_type.value,
+            side = side.value, time_force = time_in_force.value, account = account, price = price,
+            cancel_previous = False)
+        return self.request(path, timeout)
+
+    def cancel_order(self, client_order_id: str, proprietary: str, timeout: float = None):
+        """
+        Cancela una órden, con los mismos parámetros y respuesta que "`pyRofex.cancel_order`".
+        """
+        return self.request(urls.cancel_order.format(id = client_order_id, p = proprietary), timeout)
+
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    @property
+    def table(self) -> DataFrame:
+        """
+        Latencia de los pedidos (espera de conexión libre incluida), errores y aperturas, por conexión.
+        """
+        with self.lock: stats = {n: [*values] for n, values in self.stats.items()}
+        rows = {n: {"requests": count, "mean_ms": total / count / 1e6 if count else 0.0, "max_ms": peak / 1e6,
+            "errors": errors, "connects": connects} for n, (count, total, peak, errors, connects) in stats.items()}
+        return DataFrame.from_dict(rows, orient = "index", columns = self.COLUMNS).rename_axis("connection")
+
+    def close(self):
+        """
+        Cierra todas las conexiones del "pool" (pueden volver a abrirse en el próximo pedido).
+        """
+        for connection in [*self.pool.queue]: connection.close()
+
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+#███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+if (__name__ == "__main__"):
+
+    # Pruebas contra un servidor local que imita a la API de órdenes (HTTP y HTTPS con TLS 1.3).
+    import unittest
+    tests = unittest.defaultTestLoader.discover("test", pattern = "test_transport.py", top_level_dir = "test")
+    unittest.TextTestRunner(verbosity = 2).run(tests)
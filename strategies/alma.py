@@ -2,8 +2,8 @@ import os, sys
 sys.path.append("./")
 
 import numpy, pyRofex
-from pandas import Series, DataFrame, merge
-from pandas import Timestamp, DatetimeIndex
+from collections import deque
+from pandas import Series, DataFrame, Timestamp
 from models.strategy import *
 
 #███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
@@ -27,34 +27,103 @@ class Alma(Strategy):
     - "`thr_spread_deriv`" ("`float`"): Mínimo de spread permisible. Cuando la diferencia bid-ask del futuro es mayor,
         se omite la operación.
     - "`risk_percentage`" ("`float`"): Porcentaje de riesgo a tomar. Por defecto, 1% del valor futuro. (en desuso actualmente).
+    - "`max_position`" ("`float`"): Máxima posición neta absoluta por derivado (ver "`Ledger`"). Por defecto, 1
+        contrato: sin límite, cada tick con tasa favorable volvería a comprar/vender. "`None`" = sin límite.
+    - "`cooldown`" ("`float`"): Segundos mínimos entre señales de un mismo derivado y sentido (ver "`Ledger`"). Por
+        defecto, 1 segundo (ej: tras un rechazo). "`0`" = sin cooldown.
+    - "`shadows`" ("`dict[str, dict]`"): Configuraciones adicionales de umbrales, por nombre (ver "`add_shadow`").
+        Ej: "`{"wide": {"thr_rate_payer": 0.0002}, "fast": {"thr_rate_taker": 0.00005, "live": True}}`".
+
+    Todas las configuraciones comparten un único cálculo de tasas por tick: sus umbrales se comparan contra
+    los datos en una sola operación de "`numpy`" (configuraciones x derivados), con lo cual agregar una configuración
+    "sombra" tiene un costo casi nulo. Solo las configuraciones en vivo ("`live`") generan órdenes; las demás registran
+    sus señales hipotéticas en "`shadow_table`", para compararlas con las reales. Si varias configuraciones en vivo
+    dan señal en un mismo derivado y tick, solo se envía la de la primera; las demás quedan como hipotéticas.
     """
     # Renombrado de columnas de BBO ("Best bid and offer": bid y ask L1).
     COLUMNS_BBO = dict(price_ask_l1 = "deriv_ask", price_bid_l1 = "deriv_bid")
-    # Columnas de variables requeridas para la operación.
-    COLUMNS_CALC = ["maturity", "deriv_ask", "deriv_bid", "under_ask", "under_bid"]
+    # Solo usa el último BBO de cada derivado, y los precios de sus subyacentes (ver "Strategy.FIELDS").
+    FIELDS, DEPTH, UNDERLYING = [*COLUMNS_BBO], 1, True
     # Valores a incluir en formato JSON, dentro del "comment" de la señal.
     COLUMNS_COMMENT = dict(deriv_ask = "da", deriv_bid = "db", under_ask = "ua",
           rate_payer = "rp", rate_taker = "rt", profit = "pft", exp_days = "exp")
+    # Columnas del registro de señales hipotéticas, y su máximo de filas (las mas antiguas se descartan).
+    COLUMNS_SHADOW = ["time", "config", "symbol", "side", "price", "rate_taker", "rate_payer"]
+    SHADOW_SIZE = 100000
 
     def __init__(self, name: str, symbols: list,
                  thr_rate_taker: float = 0.0001,
                  thr_rate_payer: float = 0.0001,
                  thr_spread_deriv: float = 0.005,
-                 risk_percentage: float = 0.01):
+                 risk_percentage: float = 0.01,
+                 max_position: float = 1.0,
+                 cooldown: float = 1.0,
+                 shadows: dict = dict()):
 
-        super().__init__(name, symbols)
+        super().__init__(name, symbols, max_position = max_position, cooldown = cooldown)
         self.thr_rate_taker = thr_rate_taker
         self.thr_rate_payer = thr_rate_payer
         self.thr_spread_deriv = thr_spread_deriv
         self.risk_percentage = risk_percentage
+        # Umbrales de tasas de todas las configuraciones: una fila por umbral, una columna por configuración.
+        self.thresholds = numpy.array([[thr_rate_taker], [thr_rate_payer]])
+        self.config_names = numpy.array([name], dtype = object)
+        self.is_shadow = numpy.array([False])
+        self.shadow_signals = deque(maxlen = self.SHADOW_SIZE)
+        for config, thresholds in shadows.items(): self.add_shadow(config, **thresholds)
         # No hay "on_init" necesario...
 
+    def add_shadow(self, name: str, thr_rate_taker: float = None, thr_rate_payer: float = None,
+                   live: bool = False):
+        """
+        Registra una configuración adicional de umbrales. Los umbrales no provistos toman los de la instancia.
+
+        Inputs:
+        - "`name`" ("`str`"): Nombre de la configuración. Reemplaza a una existente con el mismo nombre.
+        - "`thr_rate_taker`", "`thr_rate_payer`" ("`float`"): Ver docstring de la clase.
+        - "`live`" ("`bool`"): Si "`True`", sus señales se envían como órdenes. Si no, solo se registran.
+        """
+        assert (name != self.name), "Shadow config can't be named as its strategy."
+        self.remove_shadow(name)
+        thresholds = [[self.thr_rate_taker if (thr_rate_taker is None) else thr_rate_taker],
+                      [self.thr_rate_payer if (thr_rate_payer is None) else thr_rate_payer]]
+        self.thresholds = numpy.hstack([self.thresholds, thresholds])
+        self.config_names = numpy.append(self.config_names, numpy.array([name], dtype = object))
+        self.is_shadow = numpy.append(self.is_shadow, not live)
+
+    def remove_shadow(self, name: str):
+        """
+        Quita una configuración adicional de umbrales, si existe. Sus señales registradas se conservan.
+        """
+        keep = (self.config_names != name)
+        keep[0] = True # La configuración propia no puede quitarse.
+        self.thresholds = self.thresholds[:, keep]
+        self.config_names = self.config_names[keep]
+        self.is_shadow = self.is_shadow[keep]
+
+    def _record_shadow(self, data: DataFrame, names: numpy.ndarray, sides: numpy.ndarray):
+        """
+        Registra las señales hipotéticas de las configuraciones "sombra" (o las repetidas de las configuraciones en vivo,
+        ver "`on_tick`"): una fila por par configuración/derivado.
+        """
+        price = numpy.where(sides > 0, data["deriv_ask"].values, data["deriv_bid"].values)
+        side = numpy.where(sides > 0, OrderSide.BUY.name, OrderSide.SELL.name)
+        self.shadow_signals.extend(zip([self.clock.ts] * len(names), names, data.index,
+            side, price, data["rate_taker"].values, data["rate_payer"].values))
+
+    @property
+    def shadow_table(self) -> DataFrame:
+        """
+        Tabla de señales hipotéticas de las configuraciones "sombra", en orden de registro.
+        """
+        return DataFrame([*self.shadow_signals], columns = self.COLUMNS_SHADOW)
+
 #███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
         
     @staticmethod
     def calc_daily_rates(maturity: Timestamp,
             deriv_ask: float, deriv_bid: float,
-            under_ask: float, under_bid: float):
+            under_ask: float, under_bid: float, clock: Clock = None):
         """
         Calcula la tasa de interés "payer" o "taker" de un determinado arbitraje spot/futuro. Se calcula con
         proyección "diaria". Es decir: proyectando que durante el día, dicha tasa se mantendrá constante. Las
@@ -67,6 +136,8 @@ class Alma(Strategy):
         - "`deriv_bid`" ("`float`"): Precio bid (L1) mas reciente del futuro.
         - "`under_ask`" ("`float`"): Precio ask (L1) mas reciente del subyacente.
         - "`under_bid`" ("`float`"): Precio bid (L1) mas reciente del subyacente.
+        - "`clock`" ("`Clock`"): Reloj cuya lectura del ciclo en curso se usa como "ahora". Por defecto, uno nuevo
+            (la hora actual).
         Outputs:
         - "rates" ("`DataFrame`"): Tabla con la siguiente estructura:
 
@@ -75,9 +146,8 @@ class Alma(Strategy):
         rate   | ... ... | ... ... | => rate: es la tasa de cada caso
         profit | ... ... | ... ... | => profit: es el movimiento esperado del futuro hacia el subyacente (TP)
         """
-        remaining = maturity - Timestamp.utcnow()
         # Días restantes hasta la fecha de expiración dada.
-        remaining_days = remaining.total_seconds() / 86400
+        remaining_days = (clock or Clock()).days_to(maturity)
         # Formulas 2A y 2B del archivo "spot/rate_arb.md".
         rate_taker = numpy.log(under_bid / deriv_ask) / remaining_days
         rate_payer = numpy.log(deriv_bid / under_ask) / remaining_days
@@ -93,79 +163,131 @@ class Alma(Strategy):
             "taker": {"rate": rate_taker, "profit": pft_taker},
         })
 
+    #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
+    @staticmethod
+    def calc_rates(exp_days, deriv_ask, deriv_bid, under_ask, under_bid):
+        """
+        Versión vectorizada de "`calc_daily_rates`": mismas fórmulas, pero cada input puede ser un array (ej: una
+        fila por tick o por derivado) y los días restantes ("`exp_days`") se proveen ya calculados.
+
+        Outputs:
+        - "`rates`" ("`dict[str, array]`"): "`rate_taker`", "`rate_payer`", "`profit_taker`" y "`profit_payer`".
+        """
+        # Formulas 2A y 2B del archivo "spot/rate_arb.md".
+        rate_taker = numpy.log(under_bid / deriv_ask) / exp_days
+        rate_payer = numpy.log(deriv_bid / under_ask) / exp_days
+        # Bid-ask spreads.
+        under_spread = under_ask - under_bid
+        deriv_spread = deriv_ask - deriv_bid
+        return {"rate_taker": rate_taker, "rate_payer": rate_payer,
+            "profit_taker": deriv_spread * rate_taker - under_spread,
+            "profit_payer": deriv_spread * rate_payer - under_spread}
+
+    @staticmethod
+    def calc_sides(rate_taker, rate_payer, thr_rate_taker, thr_rate_payer):
+        """
+        Regla de decisión de la estrategia, vectorizada. Los umbrales pueden ser escalares o arrays que se combinan
+        por "broadcasting" con los de datos (ej: umbrales en columnas "`(n, 1)`" contra datos "`(1, m)`" evalúan "`n`"
+        configuraciones sobre "`m`" filas de una sola vez).
+        - Compra (+1): tasa "taker" mayor a su umbral, y tasa "payer" negativa.
+        - Venta (-1): tasa "payer" mayor a su umbral, y tasa "taker" negativa.
+        - Ninguna (0): si no se cumple ninguna.
+
+        Outputs:
+        - "`sides`" ("`numpy.ndarray[int8]`"): Sentido de la señal para cada elemento.
+        """
+        rate_taker, rate_payer = numpy.asarray(rate_taker), numpy.asarray(rate_payer)
+        is_buy = (rate_taker > thr_rate_taker) & (rate_payer < 0)
+        is_sell = (rate_payer > thr_rate_payer) & (rate_taker < 0)
+        return numpy.where(is_sell, -1, is_buy).astype(numpy.int8)
+
     #▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬▬
 
     def on_tick(self, data_deriv: DataFrame, data_under: DataFrame) -> list:
         """
         Función de ejecución de estrategia. Esquema heredado de "`Strategy.on_tick`".
         """
-        # Función auxiliar para convertir la tabla de "rates" en un dict, para
-        # poder añadir como filas a cada derivado dentro de los DataFrames de datos.
-        def calc_daily_rates(row):
-            # Calcular tabla y apilar valores.
-            df = self.calc_daily_rates(**row).stack()
-            # Unir keys como "{index}_{column}".
-            df.index = df.index.map("_".join)
-            return df.to_dict() # Devolver como dict.
-
         # Conservar solo los BBO (bid/ask L1) de cada derivado asociado.
         columns = [*self.COLUMNS_BBO.keys(), "symbol"]
         data = data_deriv[columns].groupby("symbol").last()
         data = data.rename(columns = self.COLUMNS_BBO)
         
-        # Reordenar la tabla de "specs" en base a la de datos bid/ask.
-        data_deriv = self.specs_derivs.loc[data.index].copy()
-        # Hallar los tickers de los subyacentes ("underlying") para cada derivado.
-        # También se requieren las fechas de vencimiento ("maturity").
-        data_deriv = data_deriv[["contract", "underlying", "maturity"]]
-        data_under = merge(left = data_deriv, right = data_under,
-                          left_on = "underlying", right_index = True)
+        # Posición de cada derivado en la disposición precompilada de la estrategia (ver "`Strategy.compile`"),
+        # y de su subyacente en "data_under". Descartar los que no tienen especificaciones ni subyacente.
+        layout = self.layout
+        n_deriv = layout["index"].get_indexer(data.index)
+        n_under = data_under.index.get_indexer(layout["unders"])
+        n_under = numpy.where(n_deriv >= 0, n_under[layout["under_pos"][n_deriv]], -1)
+        is_valid = (n_under >= 0)
+        if not is_valid.all(): data, n_deriv, n_under = data.loc[is_valid], n_deriv[is_valid], n_under[is_valid]
+
         # Variable auxiliar, por si la escala de los precios de los derivados difieren de
         # los de sus subyacentes por una cuestión de tamaño de contrato (no es este caso).
-        ctr_price = data_under["last_price"] * 1.0 # data_under["contract"]
-        # Suponer "bid" y "ask" iguales (spread nulo) para los precios del subyacente.
-        # Al menos hasta que se cuente con algo "mejor" que Yahoo Finance.
-        data_under["under_ask"] = data_under["under_bid"] = ctr_price
-        # Convertir fechas de vencimiento en "`Timestamp`" para futuros cálculos.
-        data_under["maturity"] = DatetimeIndex(data_under["maturity"], tz = "UTC")
-        # Unir tabla de especificaciones con datos de mercado, en base a los tickers.
-        data = merge(data, data_under, left_index = True, right_index = True)
-
-        # Conservar solamente las columnas útiles para los cálculos de tasas.
-        data = data[self.COLUMNS_CALC].sort_index()
-        # Convertir cada fila del DataFrame en un dict, para poder desarmar
-        # (unpack) dentro de la función "calc_daily_rates" a modo de argumentos.
-        rates = data.apply(dict, axis = "columns")
-        rates = rates.map(calc_daily_rates).apply(Series)
-        # Unir tabla de datos de mercado con la de tasas y profits resultantes.
-        data = merge(data, rates, left_index = True, right_index = True)
-
-        # Conservar el número de dias restantes de la fecha de vencimiento.
-        # Útil para el "comment", para tener memoria de cada operación.
-        data["exp_days"] = data["maturity"] - Timestamp.utcnow()
-        data["exp_days"] = data["exp_days"].dt.total_seconds() / 86400
-
-        # Crear columnas para las señales.
-        data["profit"] = numpy.nan
-        order_columns = ["side", "price", "SL", "TP"]
-        # Ancho de tabla original = numero de columna adonde empiezan las
-        original_width = data.shape[1] # columnas con datos de las señales
-        data[order_columns] = numpy.nan
-
-        # Cálculo de las señales para cada fila dependiendo del signo y valor de la tasa.
-        is_deriv_buy = data["rate_taker"].gt(self.thr_rate_taker) & data["rate_payer"].lt(0)
-        data.loc[is_deriv_buy, "side"] = OrderSide.BUY 
-        data.loc[is_deriv_buy, "price"] = data["deriv_ask"] # Se entra comprando en "ask".
-        data.loc[is_deriv_buy, "SL"] = data["deriv_bid"] # Y se sale vendiendo en "bid".
-        # Se prevee que el valor actual subirá en proporción a la tasa "taker".
-        data.loc[is_deriv_buy, "TP"] = data.eval("price * (1 + rate_taker)").round(6)
-
-        is_deriv_sell = data["rate_payer"].gt(self.thr_rate_payer) & data["rate_taker"].lt(0)
-        data.loc[is_deriv_sell, "side"] = OrderSide.SELL
-        data.loc[is_deriv_sell, "price"] = data["deriv_bid"] # Se entra vendiendo en "bid".
-        data.loc[is_deriv_sell, "SL"] = data["deriv_ask"] # Y se sale comprando en "ask".
-        # Se prevee que el valor actual bajará en proporción a la tasa "payer".
-        data.loc[is_deriv_sell, "TP"] = data.eval("price * (1 - rate_payer)").round(6)
+        ctr_price = data_under["last_price"].values[n_under] * 1.0 # layout["contract"][n_deriv]
+        # Usar el BBO "spot" de ReMarkets cuando el "Manager" lo provee ("under_bid/ask", ver
+        # "Manager.get_data_unders"). En su defecto, suponer "bid" y "ask" iguales (spread
+        # nulo) al último precio de Yahoo Finance.
+        for column in ("under_ask", "under_bid"):
+            if column not in data_under: data[column] = ctr_price; continue
+            values = data_under[column].values[n_under].astype(float)
+            data[column] = numpy.where(numpy.isnan(values), ctr_price, values)
+        # Conservar el número de dias restantes de la fecha de vencimiento (una resta contra la lectura de
+        # la hora del ciclo, ver "Clock"). Útil para el "comment", para tener memoria de cada operación.
+        data["exp_days"] = self.clock.days_to(layout["maturity"][n_deriv])
+        # Calcular tasas y profits de todos los derivados de una sola vez (vectorizado).
+        rates = self.calc_rates(data["exp_days"].values, data["deriv_ask"].values,
+            data["deriv_bid"].values, data["under_ask"].values, data["under_bid"].values)
+        for column, values in rates.items(): data[column] = values
+
+        # Cálculo de las señales de todas las configuraciones (filas) para todos los derivados
+        # (columnas) en una sola comparación. La fila 0 es la configuración propia de la instancia.
+        self.thresholds[:, 0] = self.thr_rate_taker, self.thr_rate_payer
+        sides = self.calc_sides(data["rate_taker"].values, data["rate_payer"].values,
+            *(thresholds[:, None] for thresholds in self.thresholds))
+        if not sides.any(): return list()
+
+        # Las configuraciones "sombra" solo registran sus señales hipotéticas.
+        n_config, n_symbol = numpy.nonzero(sides[self.is_shadow])
+        if len(n_config):
+            names = self.config_names[self.is_shadow][n_config]
+            self._record_shadow(data.iloc[n_symbol], names, sides[self.is_shadow][n_config, n_symbol])
+
+        # Configuraciones en vivo: a lo sumo una orden por derivado y tick. La primera (en orden de registro, la
+        # propia primero) con señal en un derivado lo toma; las señales de las demás en ese derivado se registran
+        # como hipotéticas, en lugar de duplicar la orden.
+        n_live = numpy.flatnonzero(~self.is_shadow)
+        sides_live = sides[n_live]
+        is_signal = (sides_live != 0)
+        is_repeated = is_signal & (numpy.cumsum(is_signal, axis = 0) > 1)
+        n_config, n_symbol = numpy.nonzero(is_repeated)
+        if len(n_config):
+            names = self.config_names[n_live][n_config]
+            self._record_shadow(data.iloc[n_symbol], names, sides_live[n_config, n_symbol])
+        sides_live = numpy.where(is_repeated, 0, sides_live)
+
+        signals = list()
+        for n, sides_config in zip(n_live, sides_live):
+            if not sides_config.any(): continue
+            name = self.config_names[n] if n else None
+            signals.extend(self._make_signals(data, sides_config, name))
+        return signals
+
+    def _make_signals(self, data: DataFrame, sides: numpy.ndarray, name: str = None) -> list:
+        """
+        Crea las señales de una configuración a partir de los datos por derivado y de sus sentidos (+1/-1/0, ver
+        "`calc_sides`"). Las configuraciones en vivo adicionales llevan su nombre en el "comment".
+        """
+        data = data.loc[sides != 0].copy()
+        is_deriv_buy = (sides[sides != 0] > 0)
+
+        # Compra: se entra comprando en "ask" y se sale vendiendo en "bid". Se prevee que el valor
+        # actual subirá en proporción a la tasa "taker". Venta: se entra vendiendo en "bid", y se sale
+        # comprando en "ask". Se prevee que el valor actual bajará en proporción a la tasa "payer".
+        data["side"] = numpy.where(is_deriv_buy, OrderSide.BUY, OrderSide.SELL)
+        data["price"] = numpy.where(is_deriv_buy, data["deriv_ask"], data["deriv_bid"])
+        data["SL"] = numpy.where(is_deriv_buy, data["deriv_bid"], data["deriv_ask"])
+        data["TP"] = numpy.where(is_deriv_buy, data.eval("price * (1 + rate_taker)"),
+                                               data.eval("price * (1 - rate_payer)")).round(6)
 
         # Para calcular la ganancia proyectada.
         data["profit"] = (data["TP"] - data["price"]).abs()
@@ -176,12 +298,6 @@ class Alma(Strategy):
         #data["size"] /= (data["price"] - data["SL"]).abs()
         #data["size"] = data["size"].astype(int)        
         data["size"] = 1.0
-
-        # Serán órdenes de ejecución inmediata.
-        data["type"] = OrderType.MARKET
-        data["oper"] = Signal.Action.ORDER
-        data["symbol"] = data.index.copy()
-        data = data.dropna(subset = "side")
         
         # Se unen las columnas conservadas para el comment, para crear
         # un dict de cada fila. Ej: "bid: 123, ask: 124, und: 120, etc"
@@ -189,15 +305,13 @@ class Alma(Strategy):
         comment = comment.rename(columns = self.COLUMNS_COMMENT)
         comment = comment.apply(dict, axis = "columns").astype(str)
         comment = comment.str.replace("(\"|'|{|})", "", regex = True)
-        # Descartar columnas que no pertenecen al bloque de "señales"
-        data = data.iloc[:, original_width :]
-        data["comment"] = comment
+        if name: comment = f"cfg: {name}, " + comment
         
-        # Crear dict con datos de cada señal, y aplicar "Signal" a cada uno.
-        data["order"] = data.apply(dict, axis = "columns")
-        data["order"] = data["order"].apply(lambda row: Signal(**row))
-        # Devolver lista de objetos "Signal".
-        return data["order"].to_list()
+        # Crear los objetos "Signal" en bloque, a partir de las columnas de la tabla.
+        # Serán órdenes de ejecución inmediata.
+        return Signal.from_arrays(symbol = data.index.values, side = data["side"].values,
+            size = data["size"].values, price = data["price"].values, type = OrderType.MARKET,
+            SL = data["SL"].values, TP = data["TP"].values, comment = comment.values)
 
 #███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
 #███████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
@@ -216,4 +330,60 @@ if (__name__ == "__main__"):
     print(args)
     exp = Timestamp("2024/01/31 00:00:00", tz = "UTC")
     df = Alma.calc_daily_rates(**args, maturity = exp)
-    print(df)
\ No newline at end of file
+    print(df)
+    # Benchmark del universo completo: todos los derivados de "docs/specs.csv" (600+, ver "Manager.get_universe"),
+    # en una sola instancia de "Alma". Un productor ("parse": "parse_data_market" y "TickStore.append") alimenta a
+    # la etapa "strategies" ("Stage", con la combinación de "Interface") a ritmo constante; ésta ejecuta "on_tick"
+    # sobre los derivados actualizados en cada ronda, como "Interface._run_strategies". Se compara contra combinar
+    # los ticks solo por derivado (la clave anterior): una ronda por derivado. Ej: "python strategies/alma.py 5000".
+    from time import sleep, time_ns, perf_counter_ns
+    from pandas import read_csv
+    from models.manager import Manager
+    from models.interface import Interface
+    from models.pipeline import Stage
+    from models.store import TickStore
+
+    rate = int(sys.argv[1]) if (len(sys.argv) > 1) else 5000 # Ticks por segundo.
+    specs = read_csv(Manager.PATH_FILE_SPECS).set_index("symbol")
+    symbols = Manager.get_universe(specs, cfi = None, maturity = None)
+    strat = Alma("universe", dict.fromkeys(symbols), thr_rate_taker = 10.0, thr_rate_payer = 10.0)
+    strat.specs_derivs = specs.loc[symbols]
+    data_under = DataFrame({"last_price": 1000.0}, index = strat.layout["unders"])
+    random, seconds, burst = numpy.random.default_rng(0), 10, 50
+    # BBO de 1000 pasos de precio de cada derivado, con 2 pasos de spread.
+    steps = specs["step_price"].to_dict()
+    ticks = [{"type": "Md", "timestamp": 0, "instrumentId": {"marketId": "ROFX", "symbol": symbol}, "marketData": {
+        "OF": [{"price": 1002 * steps[symbol], "size": 5}], "BI": [{"price": 1000 * steps[symbol], "size": 5}]}}
+        for symbol in random.choice(symbols, rate * seconds)]
+
+    results = dict()
+    for mode, key in (("merged", Interface._key_stage_strategies), ("per symbol", lambda item: item[1])):
+        store, runs = TickStore(specs), list()
+        def run(item: tuple):
+            _, symbols, _, _, t_put = item
+            t_start = perf_counter_ns(); strat.clock.tick()
+            strat.on_tick(store.frame(symbols, strat.FIELDS, strat.DEPTH), data_under)
+            runs.append((len(symbols), t_start - t_put, perf_counter_ns() - t_start))
+        merge = Interface._merge_stage_strategies if (mode == "merged") else None
+        stage = Stage("strategies", run, policy = "conflate", key = key, merge = merge)
+        stage.start(); t_begin = perf_counter_ns()
+        # Ráfagas de "burst" ticks, a ritmo de "rate" ticks por segundo en promedio.
+        for n, entry in enumerate(ticks):
+            if not (n % burst):
+                delay = t_begin + n * 1e9 / rate - perf_counter_ns()
+                if (delay > 0): sleep(delay / 1e9)
+            entry["timestamp"] = time_ns() // 1000000
+            tick = Interface.parse_data_market(entry)
+            symbol, ts = tick["symbol"], tick.pop("ts")
+            store.append(symbol, ts, tick)
+            stage.put(("tick", frozenset([symbol]), n, False, perf_counter_ns()))
+        seconds_feed = (perf_counter_ns() - t_begin) / 1e9
+        while stage.depth: sleep(0.01)
+        sleep(0.1); stage.stop()
+        n_symbols, wait, dt = numpy.array(runs).T / [[1], [1e6], [1e6]]
+        results[mode] = {"ticks/s": len(ticks) / seconds_feed, "rounds": len(runs), "symbols/round": n_symbols.mean(),
+            "round_p50_ms": numpy.percentile(dt, 50), "round_p99_ms": numpy.percentile(dt, 99),
+            "wait_p50_ms": numpy.percentile(wait, 50), "wait_p99_ms": numpy.percentile(wait, 99),
+            "backlog_s": (perf_counter_ns() - t_begin) / 1e9 - seconds_feed - 0.1}
+    print(f"{len(symbols)} symbols, {rate} ticks/s during {seconds} s")
+    print(DataFrame.from_dict(results, orient = "index").round(2).to_string())
@@ -0,0 +1,144 @@
+import os, sys
+sys.path.append("./")
+import unittest
+from pyRofex import Side
+from models.ledger import Ledger
+from models.strategy import Signal
+
+#██████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+def order(side: Side = Side.BUY, size: float = 1, symbol: str = "GGAL/DIC23") -> Signal:
+    """
+    Señal de nueva órden de "`size`" contratos.
+    """
+    return Signal(oper = Signal.Action.ORDER, symbol = symbol, side = side, size = size)
+
+def fill(ledger: Ledger, id_order: str, size: float, price: float, status: str = "FILLED"):
+    """
+    Aplica un "order report" con un "fill" de "`size`" contratos a "`price`".
+    """
+    return ledger.on_report({"clOrdId": id_order, "status": status, "lastQty": size, "lastPx": price})
+
+#██████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+class TestLedgerAllow(unittest.TestCase):
+
+    def test_no_limits_by_default(self):
+        ledger = Ledger()
+        for n in range(5):
+            self.assertTrue(ledger.allow(order(), now = 0.0))
+            ledger.on_send(order(), f"A{n}", "OK", now = 0.0)
+        self.assertEqual(ledger.exposure("GGAL/DIC23"), 5)
+
+    def test_cooldown(self):
+        ledger = Ledger(cooldown = 1.0)
+        self.assertTrue(ledger.allow(order(), now = 0.0)); ledger.on_send(order(), "A1", "OK", now = 0.0)
+        self.assertFalse(ledger.allow(order(), now = 0.5))
+        # Otro sentido u otro instrumento no comparten el "cooldown".
+        self.assertTrue(ledger.allow(order(Side.SELL), now = 0.5))
+        self.assertTrue(ledger.allow(order(symbol = "YPFD/DIC23"), now = 0.5))
+        self.assertTrue(ledger.allow(order(), now = 1.0))
+        self.assertEqual(ledger.dropped["cooldown"], 1)
+
+    def test_cooldown_after_rejection(self):
+        # El "cooldown" corre desde el envío, aunque la API lo rechace (sin cantidad pendiente).
+        ledger = Ledger(cooldown = 1.0)
+        ledger.on_send(order(), None, "ERROR", now = 0.0)
+        self.assertFalse(ledger.allow(order(), now = 0.5))
+        self.assertEqual(ledger.exposure("GGAL/DIC23"), 0)
+
+    def test_max_position(self):
+        ledger = Ledger(max_position = 2)
+        ledger.on_send(order(), "A1", "OK"); fill(ledger, "A1", 1, 1500.0)
+        self.assertTrue(ledger.allow(order())); ledger.on_send(order(), "A2", "OK")
+        # Posición 1 y pendiente 1: otra compra superaría el máximo, una venta lo reduce.
+        self.assertFalse(ledger.allow(order()))
+        self.assertTrue(ledger.allow(order(Side.SELL, 3)))
+        self.assertFalse(ledger.allow(order(Side.SELL, 5)))
+        self.assertEqual(ledger.dropped["max_position"], 2)
+
+    def test_limits_per_symbol(self):
+        ledger = Ledger(max_position = 1, limits = {"YPFD/DIC23": {"max_position": 3}, "PAMP/DIC23": None})
+        self.assertEqual(ledger.get_limit("YPFD/DIC23", "max_position"), 3)
+        self.assertEqual(ledger.get_limit("PAMP/DIC23", "max_position"), 1)
+        self.assertTrue(ledger.allow(order(size = 3, symbol = "YPFD/DIC23")))
+        self.assertFalse(ledger.allow(order(size = 3)))
+
+    def test_other_actions_allowed(self):
+        ledger = Ledger(max_position = 0, cooldown = 10.0)
+        signal = Signal(oper = Signal.Action.CANCEL, ID = "A1")
+        self.assertTrue(ledger.allow(signal, now = 0.0))
+
+#██████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+class TestLedgerFills(unittest.TestCase):
+
+    def setUp(self):
+        self.ledger = Ledger()
+        self.ledger.contracts = {"GGAL/DIC23": 100.0}
+
+    def test_partial_fills(self):
+        ledger = self.ledger
+        ledger.on_send(order(size = 3), "A1", "OK")
+        self.assertTrue(fill(ledger, "A1", 1, 1000.0, "PARTIALLY_FILLED"))
+        fill(ledger, "A1", 2, 1030.0, "PARTIALLY_FILLED")
+        self.assertEqual(ledger.positions["GGAL/DIC23"], 3)
+        self.assertAlmostEqual(ledger.prices["GGAL/DIC23"], 1020.0)
+        self.assertEqual(ledger.pending["GGAL/DIC23"], 0)
+        # Completada la cantidad original, la órden se cierra.
+        self.assertNotIn("A1", ledger.orders)
+
+    def test_close_releases_pending(self):
+        ledger = self.ledger
+        ledger.on_send(order(size = 3), "A1", "OK")
+        fill(ledger, "A1", 1, 1000.0, "PARTIALLY_FILLED")
+        ledger.on_report({"clOrdId": "A1", "status": "CANCELLED"})
+        self.assertEqual(ledger.positions["GGAL/DIC23"], 1)
+        self.assertEqual(ledger.pending["GGAL/DIC23"], 0)
+        self.assertFalse(ledger.on_report({"clOrdId": "A1", "status": "CANCELLED"}))
+
+    def test_pnl_on_reduce(self):
+        ledger = self.ledger
+        ledger.on_send(order(size = 2), "A1", "OK"); fill(ledger, "A1", 2, 1000.0)
+        ledger.on_send(order(Side.SELL), "A2", "OK"); fill(ledger, "A2", 1, 1010.0)
+        self.assertEqual(ledger.positions["GGAL/DIC23"], 1)
+        self.assertAlmostEqual(ledger.pnl_real["GGAL/DIC23"], 10.0 * 100.0)
+        self.assertAlmostEqual(ledger.prices["GGAL/DIC23"], 1000.0)
+
+    def test_pnl_on_reversal(self):
+        ledger = self.ledger
+        ledger.on_send(order(size = 2), "A1", "OK"); fill(ledger, "A1", 2, 1000.0)
+        # Vender 5 a 990: cierra 2 con pérdida, y el remanente (-3) entra al precio del "fill".
+        ledger.on_send(order(Side.SELL, 5), "A2", "OK"); fill(ledger, "A2", 5, 990.0)
+        self.assertEqual(ledger.positions["GGAL/DIC23"], -3)
+        self.assertAlmostEqual(ledger.pnl_real["GGAL/DIC23"], -2 * 10.0 * 100.0)
+        self.assertAlmostEqual(ledger.prices["GGAL/DIC23"], 990.0)
+        # Cerrar el corto a 980: ganancia.
+        ledger.on_send(order(Side.BUY, 3), "A3", "OK"); fill(ledger, "A3", 3, 980.0)
+        self.assertEqual(ledger.positions["GGAL/DIC23"], 0)
+        self.assertAlmostEqual(ledger.pnl_real["GGAL/DIC23"], (-20 + 30) * 100.0)
+        self.assertEqual(ledger.prices["GGAL/DIC23"], 0.0)
+
+    def test_reconcile(self):
+        ledger = self.ledger
+        ledger.on_send(order(size = 3), "A1", "OK")
+        fill(ledger, "A1", 1, 1000.0, "PARTIALLY_FILLED")
+        # Tras un reinicio, solo se aplica lo ejecutado que faltaba registrar.
+        ledger.reconcile({"clOrdId": "A1", "status": "FILLED", "cumQty": 3, "avgPx": 1000.0})
+        self.assertEqual(ledger.positions["GGAL/DIC23"], 3)
+        self.assertNotIn("A1", ledger.orders)
+
+    def test_state_round_trip(self):
+        ledger = self.ledger
+        ledger.on_send(order(size = 2), "A1", "OK"); fill(ledger, "A1", 1, 1000.0, "PARTIALLY_FILLED")
+        # Los multiplicadores de contrato no son parte del estado: los provee el "Manager".
+        restored = Ledger(); restored.load_state(ledger.state); restored.contracts = ledger.contracts
+        self.assertEqual(restored.state, ledger.state)
+        self.assertTrue(restored.table.equals(ledger.table))
+        self.assertEqual(restored.exposure("GGAL/DIC23"), 2)
+
+#██████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+if (__name__ == "__main__"):
+
+    unittest.main()
@@ -0,0 +1,60 @@
+import os, sys
+sys.path.append("./")
+import unittest
+from models.manager import Manager
+from models.store import TickStore
+
+#██████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+class Stub:
+    """
+    Estrategia mínima: solo su política de retención ("`Strategy.RETENTION`").
+    """
+    def __init__(self, retention: dict = None): self.RETENTION = retention
+
+class TestRetention(unittest.TestCase):
+
+    def setUp(self):
+        # "Manager" sin conexión: solo el estado que usa "_update_retention".
+        self.manager = manager = Manager.__new__(Manager)
+        manager.store = TickStore(retention = Manager.RETENTION_DEFAULT)
+        manager.strategies, manager.symbol_feeds, manager.retention_symbols = dict(), dict(), dict()
+
+    def retain(self, symbol: str, **strategies) -> tuple:
+        """
+        Registra a "`strategies`" ("`{name: RETENTION}`") en el feed de "`symbol`", y devuelve su retención.
+        """
+        for name, retention in strategies.items(): self.manager.strategies[name] = Stub(retention)
+        self.manager.symbol_feeds[symbol] = [*strategies]
+        self.manager._update_retention([symbol])
+        return self.manager.store.keep.get(symbol, self.manager.store.keep_default)
+
+    def test_default(self):
+        self.assertEqual(self.retain("X", a = None), (10000, None))
+        self.assertNotIn("X", self.manager.store.keep)
+
+    def test_mixed_with_default(self):
+        # Quien usa la retención por defecto conserva sus 10000 ticks, y quien pide 5 segundos los obtiene.
+        self.assertEqual(self.retain("X", a = None, b = {"seconds": 5}), (10000, 5 * 10 ** 9))
+
+    def test_most_demanding(self):
+        keep = self.retain("X", a = {"ticks": 500}, b = {"ticks": 2000, "seconds": 1}, c = {"seconds": 30})
+        self.assertEqual(keep, (2000, 30 * 10 ** 9))
+
+    def test_symbol_config(self):
+        self.manager.retention_symbols["X"] = {"seconds": 60}
+        self.assertEqual(self.retain("X", a = {"ticks": 100}), (100, 60 * 10 ** 9))
+        self.assertEqual(self.retain("X"), (None, 60 * 10 ** 9))
+
+    def test_removed_strategy(self):
+        self.retain("X", a = None, b = {"ticks": 50000})
+        # Sin la estrategia exigente, vuelve a la retención por defecto.
+        self.manager.strategies.pop("b")
+        self.manager._update_retention(["X"])
+        self.assertEqual(self.manager.store.keep.get("X", self.manager.store.keep_default), (10000, None))
+
+#██████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+if (__name__ == "__main__"):
+
+    unittest.main()
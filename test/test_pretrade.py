@@ -0,0 +1,43 @@
+import os, sys
+sys.path.append("./")
+import unittest
+from numpy import nan
+from pandas import read_csv
+from pyRofex import Side, OrderType
+from models.pretrade import PreTrade
+from models.strategy import Signal
+
+#██████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+class TestPreTrade(unittest.TestCase):
+
+    SYMBOL = "GGAL/DIC23/FEB24" # step 0.05, precio 300 a 800, volumen 1 a 1000, sin "MARKET" ni "FOK".
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pretrade = PreTrade(read_csv("docs/specs.csv").set_index("symbol"))
+
+    def test_limit_without_price(self):
+        # "from_arrays" conserva el tipo "LIMIT" con precio "NaN" (un "NaN" no es falso).
+        signals = Signal.from_arrays([self.SYMBOL] * 2, [Side.BUY, Side.SELL], [1, 1], [nan, 500.0], OrderType.LIMIT)
+        valid, rejected = self.pretrade.check(signals)
+        self.assertEqual(valid, signals[1 :])
+        self.assertEqual(rejected, [(signals[0], "price")])
+
+    def test_market_without_price(self):
+        signal = Signal(Signal.Action.ORDER, self.SYMBOL, 1, Side.BUY, OrderType.MARKET)
+        valid, rejected = self.pretrade.check([signal])
+        self.assertEqual((valid, rejected), ([signal], []))
+        self.assertIs(signal.type, OrderType.MARKET_TO_LIMIT)
+
+    def test_price_rounding(self):
+        buy = Signal(Signal.Action.ORDER, self.SYMBOL, 1, Side.BUY, OrderType.LIMIT, 500.123)
+        sell = Signal(Signal.Action.ORDER, self.SYMBOL, 1, Side.SELL, OrderType.LIMIT, 500.123)
+        valid, _ = self.pretrade.check([buy, sell])
+        self.assertEqual([signal.price for signal in valid], [500.10, 500.15])
+
+#██████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+if (__name__ == "__main__"):
+
+    unittest.main()
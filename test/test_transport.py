@@ -0,0 +1,128 @@
+import os, sys
+sys.path.append("./")
+import json, ssl, shutil, subprocess, threading, unittest
+from time import sleep
+from tempfile import mkdtemp
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import ThreadPoolExecutor
+from pyRofex import Side, OrderType
+from models.transport import Transport
+
+#██████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+class Handler(BaseHTTPRequestHandler):
+    """
+    Servidor local que imita a la API de órdenes: 1 ms de procesamiento por pedido y 401 si el token no es "`token`".
+    Los pedidos a "`/slow`" tardan 0.5 s.
+    """
+    protocol_version, disable_nagle_algorithm = "HTTP/1.1", True # "keep-alive", sin demoras de TCP.
+    def do_GET(self):
+        sleep(0.5 if self.path.startswith("/slow") else 0.001)
+        if (self.headers.get("X-Auth-Token") != "token"): body, code = b"{}", 401
+        else: body, code = json.dumps({"status": "OK", "order":
+            {"clientId": self.path.split("symbol=")[-1][: 10], "proprietary": "PBCP"}}).encode(), 200
+        try:
+            self.send_response(code); self.send_header("Content-Length", str(len(body)))
+            self.end_headers(); self.wfile.write(body)
+        except OSError: pass
+    def log_message(self, *args): pass
+
+def serve(context: ssl.SSLContext = None):
+    """
+    Inicia el servidor local en un puerto libre ("`https`" si se da "`context`").
+    Outputs:
+    - "`server`" ("`ThreadingHTTPServer`"): Servidor iniciado.
+    - "`url`" ("`str`"): Dirección base.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    if context: server.socket = context.wrap_socket(server.socket, server_side = True)
+    threading.Thread(target = server.serve_forever, daemon = True).start()
+    scheme = "https" if context else "http"
+    return server, f"{scheme}://127.0.0.1:{server.server_port}/"
+
+#██████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+class TestTransport(unittest.TestCase):
+
+    def setUp(self):
+        self.server, self.url = serve()
+        self.transport = Transport(self.url, token = "token", size = 4, timeout = 2.0)
+
+    def tearDown(self):
+        self.transport.close()
+        self.server.shutdown(); self.server.server_close()
+
+    def test_keep_alive(self):
+        self.transport.warm()
+        form = dict(ticker = "GGAL/FEB24", size = 1, order_type = OrderType.LIMIT, side = Side.BUY, price = 2000.5)
+        for _ in range(20):
+            response = self.transport.send_order(account = "REM1234", **form)
+            self.assertEqual(response["status"], "OK")
+        table = self.transport.table
+        self.assertEqual(table["requests"].sum(), 20)
+        self.assertTrue((table["connects"] == 1).all())
+        self.assertEqual(table["errors"].sum(), 0)
+
+    def test_refresh_token(self):
+        refreshed = []
+        self.transport.token = "expired"
+        self.transport.refresh = lambda: refreshed.append(1) or "token"
+        self.assertEqual(self.transport.cancel_order("ABC123", "PBCP")["status"], "OK")
+        self.assertEqual(len(refreshed), 1)
+        self.assertEqual(self.transport.token, "token")
+
+    def test_reconnect_closed(self):
+        self.transport.warm()
+        # El servidor (o un "proxy") cierra las conexiones inactivas: se reabren sin errores.
+        for connection in self.transport.pool.queue: connection.sock.close(); connection.sock = None
+        self.assertEqual(self.transport.request("rest/order/id?clOrdId=1")["status"], "OK")
+        self.assertEqual(self.transport.table["errors"].sum(), 0)
+
+    def test_timeout(self):
+        with self.assertRaises(OSError): self.transport.request("slow", timeout = 0.1)
+        self.assertEqual(self.transport.table["errors"].sum(), 1)
+        # La conexión fallida se reabre en el pedido siguiente.
+        self.assertEqual(self.transport.request("fast")["status"], "OK")
+
+    def test_concurrent_stats(self):
+        n = 200
+        with ThreadPoolExecutor(16) as executor:
+            [*executor.map(lambda _: self.transport.cancel_order("ABC123", "PBCP"), range(n))]
+        table = self.transport.table
+        self.assertEqual(table["requests"].sum(), n)
+        self.assertLessEqual(len(table), 4)
+
+#██████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+@unittest.skipIf(shutil.which("openssl") is None, "openssl not available")
+class TestTransportTLS(unittest.TestCase):
+
+    def setUp(self):
+        folder = mkdtemp(prefix = "transport_")
+        cert, key = os.path.join(folder, "cert.pem"), os.path.join(folder, "key.pem")
+        subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj",
+            "/CN=127.0.0.1", "-keyout", key, "-out", cert], check = True, capture_output = True)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert, key)
+        self.server, self.url = serve(context)
+        client = ssl.create_default_context(cafile = cert)
+        client.check_hostname = False
+        self.transport = Transport(self.url, token = "token", size = 2, context = client)
+
+    def tearDown(self):
+        self.transport.close()
+        self.server.shutdown(); self.server.server_close()
+
+    def test_session_tickets_not_stale(self):
+        # Con TLS 1.3 el servidor envía "session tickets" luego del "handshake": no indican una conexión cerrada.
+        self.transport.warm(); sleep(0.1)
+        self.assertFalse(any(Transport._is_stale(connection) for connection in self.transport.pool.queue))
+        for _ in range(4): self.assertEqual(self.transport.request("rest/order/id")["status"], "OK")
+        self.assertTrue((self.transport.table["connects"] == 1).all())
+
+#██████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████████
+
+if (__name__ == "__main__"):
+
+    unittest.main()
@@ -6,6 +6,8 @@ from loguru import logger as Log
 PATH_FOLDER_AUTH = "./auth/"
 PATH_FOLDER_DOCS = "./docs/"
 PATH_FOLDER_LOGS = "./logs/"
+PATH_FOLDER_SNAPSHOTS = "./snapshots/"
+PATH_FOLDER_HISTORY = "./history/"
 
 # Formato "timedeltas". Ejemplo: "2d, 12:43:39"
 TD_STR_FORMAT = "{0}d, {1:02d}:{2:02d}:{3:02d}"
\ No newline at end of file